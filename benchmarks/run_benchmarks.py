@@ -0,0 +1,526 @@
+"""
+bili_uid_crack的离线基准测试。
+
+使用stubs目录下的hashcat和john替身程序代替真实的破解程序，无须计算设备即可
+测量掩码生成、16位UID字典生成、uid_to_md5、OpenCL破解后端、破解计划等的吞吐量，
+MD5内核在CPU上相对于hashlib的加速比及设备仲裁的耗时，以及端到端
+破解时的破解程序启动次数和内存峰值，并验证占用索引及号段表去除候选UID后样本中的UID
+均能被破解。测试结果与baseline.json中的基线比较，
+若有指标劣化超过阈值则以返回码1退出。
+
+替身程序为Python脚本，需要在类Unix系统上运行。
+
+用法：
+    python benchmarks/run_benchmarks.py                    # 运行并与基线比较
+    python benchmarks/run_benchmarks.py --update-baseline  # 运行并更新基线
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from bili_uid_crack import *
+from bili_uid_crack import md5_kernel
+
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, 'stubs'))
+from _stub_common import expand_mask
+
+
+STUBS_DIR = os.path.join(BENCHMARKS_DIR, 'stubs')
+HASHCAT_STUB = os.path.join(STUBS_DIR, 'hashcat')
+JOHN_STUB = os.path.join(STUBS_DIR, 'john')
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+# 允许的劣化比例，例如0.3表示吞吐量下降或耗时、内存增加超过30%时视为性能回退
+DEFAULT_THRESHOLD = 0.3
+
+# 不在测试范围内的UID，用于测量遍历整个范围的耗时
+_MISSING_UID = 1
+
+# MD5内核相对于hashlib的加速比为同一轮中两者速度之比，多次运行的中位数波动约5%，
+# 但仍受两者在机器负载变化时受影响的程度不同的影响，因此使用比默认值更小的阈值
+_MD5_KERNEL_SPEEDUP_THRESHOLD = 0.2
+
+# 指标的比较方式：rate越大越好，time、memory越小越好，count为计数，增加即为回退
+HIGHER_IS_BETTER = 'rate'
+
+
+def metric(value: float, kind: str, unit: str, threshold: Optional[float] = None) -> Dict:
+    """返回一项指标，threshold为该指标允许的劣化比例，为None时使用--threshold参数的值。
+    """
+    result = {'value': value, 'kind': kind, 'unit': unit}
+    if threshold is not None:
+        result['threshold'] = threshold
+    return result
+
+
+def measure(func: Callable, repeat: int = 5) -> Tuple[float, int]:
+    """多次运行函数，返回最短耗时及内存峰值。
+
+    Returns:
+        Tuple[float, int]: 最短耗时（秒）和tracemalloc记录的内存峰值（字节）。
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def random_uid_ranges(count: int, seed: int = 20250101) -> List[UidRange]:
+    rng = random.Random(seed)
+    uid_ranges = []
+    for _ in range(count):
+        digits = rng.randint(2, 16)
+        start = rng.randint(10 ** (digits - 1), 10 ** digits - 1)
+        end = rng.randint(start, min(start * rng.randint(1, 20), 10 ** 16 - 1))
+        uid_ranges.append(UidRange(start, end))
+    return uid_ranges
+
+
+def bench_masks() -> Dict[str, Dict]:
+    uid_ranges = random_uid_ranges(2000)
+    results = {}
+    for is_standard_md5 in [True, False]:
+        name = 'standard' if is_standard_md5 else 'hex'
+        seconds, peak = measure(lambda: [BiliUidCrack.get_masks_and_charsets(is_standard_md5, x) for x in uid_ranges])
+        results[f'masks.{name}.rate'] = metric(len(uid_ranges) / seconds, 'rate', 'ranges/s')
+        results[f'masks.{name}.peak_memory'] = metric(peak, 'memory', 'B')
+    return results
+
+
+def bench_planner(plan_num: int = 200) -> Dict[str, Dict]:
+    results = {}
+    for is_standard_md5 in [True, False]:
+        name = 'standard' if is_standard_md5 else 'hex'
+        seconds, peak = measure(lambda: [BiliUidCrack.count_candidates(is_standard_md5, UID_RANGES_ALL) for _ in range(plan_num)])
+        results[f'planner.{name}.rate'] = metric(plan_num / seconds, 'rate', 'plans/s')
+        results[f'planner.{name}.peak_memory'] = metric(peak, 'memory', 'B')
+    return results
+
+
+def bench_uid16_wordlist(interval_num: int = 500) -> Dict[str, Dict]:
+    start = UID_20221029_20230304.start
+    end = start + interval_num * UID16_STEP
+    candidates = BiliUidCrack.get_uid16_segment_candidate_count(start, end)
+    results = {}
+    for is_standard_md5 in [True, False]:
+        name = 'standard' if is_standard_md5 else 'hex'
+        seconds, peak = measure(lambda: BiliUidCrack.get_uid16_wordlist(start, end, is_standard_md5))
+        results[f'uid16_wordlist.{name}.rate'] = metric(candidates / seconds, 'rate', 'candidates/s')
+        results[f'uid16_wordlist.{name}.peak_memory'] = metric(peak, 'memory', 'B')
+    return results
+
+
+def bench_uid_to_md5(count: int = 100_000) -> Dict[str, Dict]:
+    rng = random.Random(20250102)
+    uids = [rng.randint(1, UID_20230929_Now.end) for _ in range(count)]
+    results = {}
+    for is_standard_md5 in [True, False]:
+        name = 'standard' if is_standard_md5 else 'hex'
+        seconds, _ = measure(lambda: [uid_to_md5(x, is_standard_md5) for x in uids])
+        results[f'uid_to_md5.{name}.rate'] = metric(count / seconds, 'rate', 'hashes/s')
+    return results
+
+
+def bench_md5_kernel(count: int = 100_000, native_count: int = 1 << 22, repeat: int = 5) -> Dict[str, Dict]:
+    """验证MD5参考内核与uid_to_md5()一致，并测量原生内核在只有CPU的OpenCL设备上相对于hashlib的加速比。
+
+    参考内核为纯Python实现，只验证其正确性；原生内核即OpenCL破解后端的内核，没有pyopencl、
+    没有OpenCL设备或设备不是CPU（如PoCL）时跳过加速比的测量。加速比包含OpenCL设备使用
+    多个CPU核心带来的提升，hashlib只使用一个核心。
+    """
+    rng = random.Random(20250101)
+    for digits in range(1, 17):
+        for is_standard_md5 in [True, False]:
+            uid = rng.randrange(10 ** (digits - 1), 10 ** digits)
+            if md5_kernel.md5_block(md5_kernel.build_block(md5_kernel.encode_uid(uid, is_standard_md5))) != uid_to_md5(uid, is_standard_md5):
+                raise AssertionError(f'md5_block计算{uid}的MD5错误')
+            shard = UidRange(uid - uid % 10, uid - uid % 10 + 9) if digits > 1 else UidRange(1, 9)
+            if md5_kernel.crack_md5(uid_to_md5(uid, is_standard_md5), is_standard_md5, shard) != uid:
+                raise AssertionError(f'MD5内核未能破解{uid}')
+
+    from bili_uid_crack.opencl_backend import get_opencl_cracker, iter_range_batches
+
+    try:
+        cracker = get_opencl_cracker()
+    except OpenClNotAvailableException:
+        print('未找到可用的OpenCL设备，跳过加速比')
+        return {}
+    if not cracker.is_cpu:
+        print('OpenCL设备不是CPU，跳过加速比')
+        return {}
+
+    results = {}
+    # 16位UID占总候选数的绝大部分，其早期排除的步骤最少
+    uids = list(range(UID16_START, UID16_START + count))
+    uid_range = UidRange(UID16_START, UID16_START + native_count - 1)
+    for name, is_standard_md5 in [('standard', True), ('hex', False)]:
+        md5 = uid_to_md5(_MISSING_UID, is_standard_md5)
+        # 交替运行hashlib与原生内核，取每轮加速比的中位数，以减少机器负载变化的影响
+        speedups = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for uid in uids:
+                uid_to_md5(uid, is_standard_md5)
+            hashlib_rate = count / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for batch in iter_range_batches(uid_range):
+                cracker.crack_batch(md5, is_standard_md5, *batch)
+            speedups.append(native_count / (time.perf_counter() - start) / hashlib_rate)
+
+        results[f'md5_kernel.{name}.speedup'] = metric(statistics.median(speedups), 'rate', 'x', _MD5_KERNEL_SPEEDUP_THRESHOLD)
+    return results
+
+
+def bench_opencl(count: int = 1 << 24) -> Dict[str, Dict]:
+    """验证OpenCL破解后端的结果，并测量破解16位UID的速度，未安装pyopencl或没有OpenCL设备时跳过。
+    """
+    from bili_uid_crack.opencl_backend import get_opencl_cracker, iter_range_batches
+
+    try:
+        cracker = get_opencl_cracker()
+    except OpenClNotAvailableException:
+        print('未找到可用的OpenCL设备，跳过')
+        return {}
+
+    rng = random.Random(20250101)
+    for digits in range(1, 17):
+        for is_standard_md5 in [True, False]:
+            uid = rng.randrange(10 ** (digits - 1), 10 ** digits)
+            uid_range = UidRange(max(uid - 5_000, 10 ** (digits - 1)), min(uid + 5_000, 10 ** digits - 1))
+            found = [cracker.crack_batch(uid_to_md5(uid, is_standard_md5), is_standard_md5, *x) for x in iter_range_batches(uid_range)]
+            if uid not in found:
+                raise AssertionError(f'OpenCL破解后端未能破解{uid}')
+
+    results = {}
+    uid_range = UidRange(UID16_START, UID16_START + count - 1)
+    for name, is_standard_md5 in [('standard', True), ('hex', False)]:
+        md5 = uid_to_md5(_MISSING_UID, is_standard_md5)
+        seconds, _ = measure(lambda: [cracker.crack_batch(md5, is_standard_md5, *x) for x in iter_range_batches(uid_range)], repeat=3)
+        results[f'opencl.{name}.rate'] = metric(count / seconds, 'rate', 'hashes/s')
+    return results
+
+
+def bench_arbiter(count: int = 1_000, jobs: int = 4) -> Dict[str, Dict]:
+    """测量无其它任务排队时占用及释放计算设备的耗时，并验证多个任务同时排队时同一时间只有一个任务占用设备。
+    """
+    import threading
+
+    results = {}
+    with tempfile.TemporaryDirectory() as lock_dir:
+        arbiter = DeviceArbiter(lock_dir)
+        seconds, _ = measure(lambda: [arbiter.acquire('device').release() for _ in range(count)], repeat=3)
+        results['arbiter.acquire.seconds'] = metric(seconds / count, 'time', 's')
+
+        lock = threading.Lock()
+        state = {'active': 0, 'max_active': 0}
+
+        def run_job(priority: int):
+            with DeviceArbiter(lock_dir, priority=priority, poll_interval=0.01).acquire('device'):
+                with lock:
+                    state['active'] += 1
+                    state['max_active'] = max(state['max_active'], state['active'])
+                time.sleep(0.05)
+                with lock:
+                    state['active'] -= 1
+
+        threads = [threading.Thread(target=run_job, args=(x,)) for x in range(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['arbiter.max_concurrency'] = metric(state['max_active'], 'count', 'jobs')
+    return results
+
+
+def mask_matches(positions: List[List[bytes]], is_standard_md5: bool, uid: int) -> bool:
+    """判断expand_mask()展开的掩码是否生成UID对应的候选值。
+    """
+    digits = [x.encode('ascii') if is_standard_md5 else bytes([int(x)]) for x in str(uid)]
+    return len(positions) == len(digits) and all([x in y for x, y in zip(digits, positions)])
+
+
+def bench_pruning(range_num: int = 30) -> Dict[str, Dict]:
+    """验证占用索引及号段表去除候选UID后的正确性：样本中的UID均能被破解，掩码不生成有账号的
+    子范围之外的候选UID，样本中的错误数据及缺少16位UID时不影响索引。
+    """
+    rng = random.Random(20250101)
+    short_uids = [rng.randrange(1, UID_20090624_20201029.end + 1) for _ in range(3_000)]
+    era = UID_20230929_Now
+    first = (era.start - UID16_START + UID16_STEP - 1) // UID16_STEP
+    last = (era.end - UID16_START) // UID16_STEP - 1
+    uid16s = [UID16_START + rng.randrange(first, last) * UID16_STEP + rng.randrange(UID16_INTERVAL_LEN) for _ in range(300)]
+
+    missed = 0
+    excess = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 样本中的错误数据被忽略，不影响索引的大小
+        path = os.path.join(temp_dir, 'occupancy.idx')
+        stats = build_occupancy_index(short_uids + uid16s + [99999999999999999999, 9999999999999999], path)
+        if stats['ignored'] != 2 or os.path.getsize(path) > 16 * 1024 * 1024:
+            raise AssertionError(f'占用索引未忽略无效UID: {stats}')
+
+        with OccupancyIndex(path) as occupancy:
+            for _ in range(range_num):
+                start = rng.randrange(1, UID_20090624_20201029.end)
+                uid_range = UidRange(start, min(start + rng.randrange(10 ** rng.randrange(2, 9)), UID_20090624_20201029.end))
+                occupied = sum([x.end - x.start + 1 for x in occupancy.get_occupied_ranges(uid_range)])
+                for is_standard_md5 in [True, False]:
+                    masks_and_charsets = BiliUidCrack.get_occupied_masks_and_charsets(is_standard_md5, uid_range, occupancy)
+                    if any(['' in x for _, x in masks_and_charsets]):
+                        raise AssertionError(f'{uid_range}的掩码包含空的自定义字符集')
+                    excess += sum(BiliUidCrack.get_mask_candidate_counts(is_standard_md5, masks_and_charsets)) - occupied
+                    masks = [expand_mask(x, y, not is_standard_md5) for x, y in masks_and_charsets]
+                    for uid in short_uids:
+                        if uid_range.start <= uid <= uid_range.end and not any([mask_matches(x, is_standard_md5, uid) for x in masks]):
+                            missed += 1
+
+            candidates = 0
+            found = set()
+            for start, end in BiliUidCrack.get_uid16_segments(era, occupancy=occupancy):
+                wordlist = BiliUidCrack.get_uid16_wordlist(start, end, True, occupancy).split()
+                candidates += len(wordlist)
+                found.update([int(x) for x in wordlist])
+            missed += len([x for x in uid16s if x not in found])
+            excess += candidates - BiliUidCrack.count_candidates(True, [era], occupancy)
+
+        # 样本中没有16位UID时不去除任何16位UID
+        stats = build_occupancy_index(short_uids, path)
+        with OccupancyIndex(path) as occupancy:
+            if BiliUidCrack.count_candidates(True, [era], occupancy) != BiliUidCrack.count_candidates(True, [era]):
+                raise AssertionError('样本中没有16位UID时占用索引去除了16位UID')
+
+    # 拟合后的号段表仍包含样本中的所有UID
+    range_table, _ = fit_range_table(short_uids + uid16s)
+    for uid in short_uids + uid16s:
+        eras = [x for x in range_table.eras if x.uid_range.start <= uid <= x.uid_range.end]
+        model = eras[0].uid16_model if len(eras) > 0 else None
+        if len(eras) == 0 or (model is not None and not model.offset <= uid - model.get_interval_start(uid) < model.offset + model.interval_len):
+            missed += 1
+
+    return {
+        'pruning.missed_uids': metric(missed, 'count', 'uids'),
+        'pruning.excess_candidates': metric(excess, 'count', 'candidates'),
+    }
+
+
+def count_spawns(spawn_log: str) -> int:
+    """返回替身程序记录的启动次数。
+    """
+    if not os.path.exists(spawn_log):
+        return 0
+    with open(spawn_log, 'r', encoding='utf-8') as fp:
+        return len([x for x in fp.read().split('\n') if x != ''])
+
+
+def run_end_to_end(backend: str, is_standard_md5: bool, uid: int, uid_ranges: List[UidRange], spawn_log: str) -> Tuple[float, int, int]:
+    """使用替身程序破解已知UID的MD5。
+
+    Returns:
+        Tuple[float, int, int]: 耗时（秒，包括查找破解程序）、破解程序的启动次数和内存峰值。
+    """
+    if os.path.exists(spawn_log):
+        os.remove(spawn_log)
+
+    md5 = uid_to_md5(uid, is_standard_md5)
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        if backend == 'hashcat':
+            cracker = BiliUidCrack(hashcat=HASHCAT_STUB, john=os.path.join(STUBS_DIR, 'missing'))
+            result = cracker.hashcat_crack_md5(md5, is_standard_md5, uid_ranges)
+        else:
+            cracker = BiliUidCrack(hashcat=os.path.join(STUBS_DIR, 'missing'), john=JOHN_STUB)
+            result = cracker.john_crack_md5(md5, uid_ranges)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    if result != uid:
+        raise AssertionError(f'{backend}破解{md5}得到{result}，应为{uid}')
+
+    return seconds, count_spawns(spawn_log), peak
+
+
+def run_session(uids: List[int], uid_ranges: List[UidRange]) -> Tuple[float, Dict[str, int]]:
+    """在同一个破解会话中使用hashcat替身程序依次破解多个已知UID的标准MD5和非标准MD5。
+
+    Returns:
+        Tuple[float, Dict[str, int]]: 耗时（秒）和会话的缓存命中次数。
+    """
+    cracker = BiliUidCrack(hashcat=HASHCAT_STUB, john=os.path.join(STUBS_DIR, 'missing'))
+    with CrackSession() as session:
+        start = time.perf_counter()
+        for uid in uids:
+            for is_standard_md5 in [True, False]:
+                result = cracker.hashcat_crack_md5(uid_to_md5(uid, is_standard_md5), is_standard_md5, uid_ranges, session)
+                if result != uid:
+                    raise AssertionError(f'hashcat破解{uid}得到{result}')
+        return time.perf_counter() - start, session.get_stats()
+
+
+def bench_end_to_end(repeat: int = 3) -> Dict[str, Dict]:
+    spawn_log = os.path.join(BENCHMARKS_DIR, '.stub_spawns.log')
+    # 使用空的数据目录，避免本机的调优及校准结果影响测试结果，结束后恢复环境变量，以免之后的测试使用已删除的目录
+    data_dir = tempfile.TemporaryDirectory(prefix='bili_uid_crack_')
+    environ = mock.patch.dict(os.environ, {'BILI_UID_CRACK_STUB_LOG': spawn_log, 'BILI_UID_CRACK_HOME': data_dir.name})
+    environ.start()
+
+    uid16_start = UID_20221029_20230304.start
+    uid16_range = UidRange(uid16_start, uid16_start + 49 * UID16_STEP + UID16_INTERVAL_LEN - 1)
+    uid16 = uid16_start + 37 * UID16_STEP + 512
+
+    cases = [
+        ('hashcat.mask.standard', 'hashcat', True, 1_234_567, [UidRange(1_000_000, 1_300_000)]),
+        ('hashcat.mask.hex', 'hashcat', False, 1_234_567, [UidRange(1_000_000, 1_300_000)]),
+        ('hashcat.uid16.standard', 'hashcat', True, uid16, [uid16_range]),
+        ('hashcat.uid16.hex', 'hashcat', False, uid16, [uid16_range]),
+        ('hashcat.multi_range.standard', 'hashcat', True, 98_765, [UidRange(1, 99_999), UidRange(500_000, 599_999), uid16_range]),
+        ('john.mask.standard', 'john', True, 1_234_567, [UidRange(1_000_000, 1_300_000)]),
+        ('john.uid16.standard', 'john', True, uid16, [uid16_range]),
+    ]
+
+    results = {}
+    try:
+        # 首次创建实例时探测破解程序并缓存，之后创建实例时不应再启动破解程序
+        for name in ['cold', 'warm']:
+            if os.path.exists(spawn_log):
+                os.remove(spawn_log)
+            BiliUidCrack(hashcat=HASHCAT_STUB, john=JOHN_STUB)
+            results[f'e2e.startup.{name}.spawns'] = metric(count_spawns(spawn_log), 'count', 'processes')
+
+        for name, backend, is_standard_md5, uid, uid_ranges in cases:
+            runs = [run_end_to_end(backend, is_standard_md5, uid, uid_ranges, spawn_log) for _ in range(repeat)]
+            seconds = min([x[0] for x in runs])
+            spawns = max([x[1] for x in runs])
+            peak = max([x[2] for x in runs])
+            results[f'e2e.{name}.seconds'] = metric(seconds, 'time', 's')
+            results[f'e2e.{name}.spawns'] = metric(spawns, 'count', 'processes')
+            results[f'e2e.{name}.peak_memory'] = metric(peak, 'memory', 'B')
+
+        # 同一会话中的多次破解只在第一次生成掩码文件及UID段
+        seconds, stats = run_session([1_234, 98_765, uid16], [UidRange(1, 99_999), uid16_range])
+        results['e2e.session.seconds'] = metric(seconds, 'time', 's')
+        results['e2e.session.plan_misses'] = metric(stats['plan_misses'], 'count', 'plans')
+        results['e2e.session.file_misses'] = metric(stats['file_misses'], 'count', 'files')
+    finally:
+        if os.path.exists(spawn_log):
+            os.remove(spawn_log)
+        environ.stop()
+        data_dir.cleanup()
+    return results
+
+
+BENCHMARKS = {
+    'masks': bench_masks,
+    'planner': bench_planner,
+    'uid16_wordlist': bench_uid16_wordlist,
+    'uid_to_md5': bench_uid_to_md5,
+    'md5_kernel': bench_md5_kernel,
+    'opencl': bench_opencl,
+    'arbiter': bench_arbiter,
+    'pruning': bench_pruning,
+    'e2e': bench_end_to_end,
+}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """将测试结果与基线比较。
+
+    Returns:
+        List[str]: 性能回退的描述，无回退时为空列表。
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        base = baseline[name]['value']
+        value = result['value']
+        kind = result['kind']
+        # 基线中记录了阈值的指标使用各自的阈值
+        metric_threshold = baseline[name].get('threshold', threshold)
+        if kind == HIGHER_IS_BETTER:
+            regressed = value < base * (1 - metric_threshold)
+        elif kind == 'count':
+            regressed = value > base
+        else:
+            regressed = value > base * (1 + metric_threshold)
+
+        if regressed:
+            regressions.append(f'{name}: {value:.6g} {result["unit"]}，基线为 {base:.6g} {result["unit"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bili_uid_crack的离线基准测试。')
+    parser.add_argument('benchmarks', nargs='*', help=f'指定运行的基准测试，可选{", ".join(BENCHMARKS)}，缺省时运行全部。')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='基线文件的路径。')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='允许的劣化比例，默认为%(default)s。')
+    parser.add_argument('--update-baseline', action='store_true', help='将本次结果写入基线文件。')
+    parser.add_argument('-o', '--output', help='将本次结果保存为JSON文件。')
+    args = parser.parse_args()
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'未知的基准测试: {name}')
+
+    results = {}
+    for name in args.benchmarks or list(BENCHMARKS):
+        print(f'正在运行基准测试: {name}')
+        results.update(BENCHMARKS[name]())
+
+    for name, result in results.items():
+        print(f'{name:<45} {result["value"]:>16.6g} {result["unit"]}')
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as fp:
+            baseline = json.load(fp)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as fp:
+            json.dump(baseline, fp, indent=2, sort_keys=True)
+        print('已更新基线:', args.baseline)
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n性能回退（阈值{args.threshold:.0%}）：')
+        for regression in regressions:
+            print(regression)
+        return 1
+
+    print('\n未发现性能回退。')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
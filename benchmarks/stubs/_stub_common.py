@@ -0,0 +1,68 @@
+"""hashcat和john替身程序的公共函数。
+
+替身程序只实现本项目用到的参数，用于在没有hashcat、john及计算设备的环境下运行
+基准测试。每次启动替身程序时，若设置了环境变量BILI_UID_CRACK_STUB_LOG，则在该
+文件中追加一行启动记录，用于统计破解程序的启动次数。
+"""
+
+import os
+import sys
+import json
+import itertools
+from typing import List
+
+
+def log_spawn(name: str):
+    """记录一次替身程序的启动。
+    """
+    log_file = os.environ.get('BILI_UID_CRACK_STUB_LOG')
+    if log_file:
+        with open(log_file, 'a', encoding='utf-8') as fp:
+            fp.write(json.dumps([name] + sys.argv[1:]) + '\n')
+
+
+def expand_mask(mask: str, charsets: List[str], hex_charset: bool) -> List[List[bytes]]:
+    """将掩码展开为每个位置的候选字节列表。
+
+    Args:
+        mask (str): hashcat或john格式的掩码，支持?d和?1至?4。
+        charsets (List[str]): 自定义字符集。
+        hex_charset (bool): 自定义字符集及掩码中的固定字符是否为16进制格式。
+
+    Returns:
+        List[List[bytes]]: 每个位置的候选字节列表。
+    """
+    width = 2 if hex_charset else 1
+    positions = []
+    i = 0
+    while i < len(mask):
+        if mask[i] == '?':
+            placeholder = mask[i+1]
+            if placeholder == 'd':
+                positions.append([str(x).encode('ascii') for x in range(10)])
+            else:
+                charset = charsets[int(placeholder)-1]
+                positions.append([decode_chars(charset[j:j+width], hex_charset) for j in range(0, len(charset), width)])
+            i += 2
+        else:
+            positions.append([decode_chars(mask[i:i+width], hex_charset)])
+            i += width
+    return positions
+
+
+def decode_chars(chars: str, is_hex: bool) -> bytes:
+    return bytes.fromhex(chars) if is_hex else chars.encode('utf-8')
+
+
+def iter_candidates(positions: List[List[bytes]]):
+    """按hashcat的顺序遍历掩码的所有候选值。
+    """
+    for candidate in itertools.product(*positions):
+        yield b''.join(candidate)
+
+
+def count_candidates(positions: List[List[bytes]]) -> int:
+    count = 1
+    for position in positions:
+        count *= len(position)
+    return count
@@ -1,4 +1,12 @@
 from .constants import *
 from .utils import *
 from .uid_range import UidRange
+from .progress import CrackProgress
+from .tracing import Tracer
+from .planner import CrackPlan, RangePlan
+from .occupancy import OccupancyIndex, build_occupancy_index, read_uid_file
+from .session import CrackSession
+from .hedge import run_hedged
+from .arbiter import RESOURCES, DeviceArbiter, DeviceLease
+from .range_table import Uid16Model, UidEra, RangeTable, get_default_range_table, fit_range_table
 from .core import *
\ No newline at end of file
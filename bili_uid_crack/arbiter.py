@@ -0,0 +1,280 @@
+import os
+import time
+import itertools
+import threading
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from .exceptions import CrackCancelledException
+from .profile import get_host_lock_dir
+
+
+# 仲裁的资源，同时占用多种资源时按此顺序依次占用，避免多个任务各自占用一部分资源后互相等待
+RESOURCES = ('device', 'cpu')
+
+# 排队等待的时间每达到该秒数，排队时使用的优先级加1，以免低优先级的任务一直等待
+_AGING_SECONDS = 60.0
+
+# 排队凭证创建后至被其它进程视为失效前的最短时间，凭证在创建后才会被加锁
+_TICKET_GRACE_SECONDS = 2.0
+
+# 创建排队凭证时加锁失败后最多重试的次数
+_TICKET_ATTEMPTS = 10
+
+# 同一进程中的排队凭证的序号
+_ticket_counter = itertools.count()
+_ticket_counter_lock = threading.Lock()
+
+
+def _try_lock(fp) -> bool:
+    """尝试以非阻塞的方式对文件加排它锁，进程退出时锁会被操作系统释放。
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fp.seek(0)
+            msvcrt.locking(fp.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+    else:
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class DeviceLease:
+    """DeviceArbiter分配的一个资源槽位，在release()或进程退出前一直占用。
+    """
+
+    def __init__(self, resource: str, slot: int, fp):
+        self.__resource = resource
+        self.__slot = slot
+        self.__fp = fp
+
+    @property
+    def resource(self) -> str:
+        """资源的名称。
+        """
+        return self.__resource
+
+    @property
+    def slot(self) -> int:
+        """槽位的序号，从0开始。
+        """
+        return self.__slot
+
+    @property
+    def released(self) -> bool:
+        """槽位是否已释放。
+        """
+        return self.__fp is None
+
+    def release(self):
+        """释放槽位，重复调用时不做任何事情。
+        """
+        if self.__fp is None:
+            return
+        try:
+            _unlock(self.__fp)
+        finally:
+            self.__fp.close()
+            self.__fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __repr__(self):
+        return f'DeviceLease({self.__resource!r}, slot={self.__slot})'
+
+
+class DeviceArbiter:
+    """基于文件锁的本机计算设备仲裁器，使本机同时运行的多个破解任务排队使用计算设备。
+
+    资源分为device（GPU等计算设备，hashcat及非CPU的OpenCL设备使用）和cpu（john及
+    CPU上的OpenCL设备使用），每种资源有若干个槽位，每个槽位同一时间只分配给一个任务。
+    槽位由锁文件表示，持有槽位的进程退出或崩溃时锁由操作系统释放，不会残留。
+
+    等待槽位的任务在锁目录中创建排队凭证，按优先级从高到低依次分配槽位，优先级相同时
+    先到先得。排队每满_AGING_SECONDS秒，优先级加1，因此低优先级的任务最终也能分配到
+    槽位。凭证由其所属的进程加锁，崩溃的进程留下的凭证会被其它进程清除。
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, priority: int = 0, device_slots: int = 1, cpu_slots: int = 1,
+                 poll_interval: float = 0.1):
+        """
+        Args:
+            lock_dir (Optional[str], optional): 锁文件所在的目录，同一目录下的仲裁器互相排队，默认为数据目录中本机的锁目录。
+            priority (int, optional): 排队时的优先级，数值越大越优先。
+            device_slots (int, optional): device资源的槽位数量，即本机可同时分配的计算设备数量。
+            cpu_slots (int, optional): cpu资源的槽位数量。
+            poll_interval (float, optional): 排队时检查槽位的间隔（秒）。
+        """
+        self.__lock_dir = os.path.abspath(lock_dir) if lock_dir is not None else get_host_lock_dir()
+        self.__priority = priority
+        self.__slots = {'device': max(device_slots, 1), 'cpu': max(cpu_slots, 1)}
+        self.__poll_interval = poll_interval
+
+    @property
+    def lock_dir(self) -> str:
+        """锁文件所在的目录。
+        """
+        return self.__lock_dir
+
+    @property
+    def priority(self) -> int:
+        """排队时的优先级。
+        """
+        return self.__priority
+
+    def get_slots(self, resource: str) -> int:
+        """返回资源的槽位数量。
+
+        Args:
+            resource (str): 资源的名称，device或cpu。
+
+        Returns:
+            int: 槽位数量。
+        """
+        return self.__slots[resource]
+
+    def acquire(self, resource: str, is_cancelled: Optional[Callable[[], bool]] = None) -> DeviceLease:
+        """排队等待并占用资源的一个槽位。
+
+        Args:
+            resource (str): 资源的名称，device或cpu。
+            is_cancelled (Optional[Callable[[], bool]], optional): 排队时定期调用的函数，返回True时停止排队。
+
+        Returns:
+            DeviceLease: 占用的槽位，使用后应调用release()释放，也可作为上下文管理器使用。
+
+        Raises:
+            CrackCancelledException: is_cancelled返回True。
+            OSError: 无法创建或锁定锁文件。
+        """
+        slots = self.get_slots(resource)
+        os.makedirs(self.__lock_dir, exist_ok=True)
+
+        ticket = None
+        try:
+            while True:
+                waiting = self.__get_waiting(resource)
+                # 没有其它任务排队，或本任务排在最前时才尝试占用槽位
+                if (ticket is None and len(waiting) == 0) or (ticket is not None and len(waiting) > 0 and waiting[0] == ticket[0]):
+                    lease = self.__try_acquire_slot(resource, slots)
+                    if lease is not None:
+                        return lease
+
+                if ticket is None:
+                    ticket = self.__create_ticket(resource)
+                if is_cancelled is not None and is_cancelled():
+                    raise CrackCancelledException()
+                time.sleep(self.__poll_interval)
+
+        finally:
+            if ticket is not None:
+                path, fp = ticket
+                fp.close()
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __try_acquire_slot(self, resource: str, slots: int) -> Optional[DeviceLease]:
+        """尝试占用任意一个空闲的槽位。
+        """
+        for slot in range(slots):
+            fp = open(os.path.join(self.__lock_dir, f'{resource}.{slot}.lock'), 'a+')
+            if _try_lock(fp):
+                return DeviceLease(resource, slot, fp)
+            fp.close()
+        return None
+
+    def __create_ticket(self, resource: str) -> Tuple[str, object]:
+        """创建并锁定排队凭证，文件名包含资源名称、排队时间、优先级、进程ID及序号。
+
+        未加锁的凭证会被其它进程视为失效并删除，因此加锁失败时换用新的文件名重试。
+
+        Raises:
+            OSError: 多次重试后仍无法对凭证加锁，例如锁目录所在的文件系统不支持文件锁。
+        """
+        for _ in range(_TICKET_ATTEMPTS):
+            with _ticket_counter_lock:
+                number = next(_ticket_counter)
+            name = f'{resource}_{time.time():.6f}_{self.__priority}_{os.getpid()}_{number}.ticket'
+            path = os.path.join(self.__lock_dir, name)
+            fp = open(path, 'a+')
+            if _try_lock(fp):
+                return path, fp
+
+            fp.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise OSError(f'无法锁定排队凭证: {self.__lock_dir}')
+
+    def __get_waiting(self, resource: str) -> List[str]:
+        """返回按分配顺序排列的有效排队凭证的路径，并清除崩溃的进程留下的凭证。
+        """
+        now = time.time()
+        tickets = []
+        for name in os.listdir(self.__lock_dir):
+            if not name.endswith('.ticket'):
+                continue
+            parts = name[:-len('.ticket')].split('_')
+            if len(parts) != 5 or parts[0] != resource:
+                continue
+            try:
+                enqueue_time = float(parts[1])
+                priority = int(parts[2])
+            except ValueError:
+                continue
+
+            path = os.path.join(self.__lock_dir, name)
+            if now - enqueue_time > _TICKET_GRACE_SECONDS and self.__remove_if_stale(path):
+                continue
+            effective_priority = priority + max(now - enqueue_time, 0) / _AGING_SECONDS
+            tickets.append((-effective_priority, enqueue_time, name, path))
+
+        tickets.sort()
+        return [x[3] for x in tickets]
+
+    @staticmethod
+    def __remove_if_stale(path: str) -> bool:
+        """若排队凭证未被加锁，即所属的进程已退出，则删除凭证并返回True。
+        """
+        try:
+            fp = open(path, 'a+')
+        except OSError:
+            return True
+
+        try:
+            if not _try_lock(fp):
+                return False
+            _unlock(fp)
+        finally:
+            fp.close()
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return True
+
+    def __repr__(self):
+        return f'DeviceArbiter({self.__lock_dir!r}, priority={self.__priority})'
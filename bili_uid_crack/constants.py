@@ -21,6 +21,8 @@ UID16_INTERVAL_LEN = 1000
 # 字典文件中UID的数量越多，hashcat每次处理的UID数量就越多，hashcat总的启停次数就少，
 # 破解速度就越快，当然，生成字典文件时所占用的存储空间和内存也越多。John the Ripper
 # 的启停速度快，破解性能几乎不受字典大小及此参数的影响。
+#
+# 此为默认值，可使用BiliUidCrack.autotune()根据本机的启动耗时、破解速度及可用内存自动选取。
 UID16_MAX_INTERVAL_NUM = 20000
 
 # 根据不同UID号段的启用时间以及UID十进制位数划分的UID分布范围。
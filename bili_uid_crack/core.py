@@ -1,14 +1,62 @@
 import os
+import time
 import shlex
+import random
 import subprocess
-from tempfile import NamedTemporaryFile
-from typing import List, Dict, Tuple, Optional
+import threading
+from collections import deque
+from contextlib import contextmanager
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterator, List, Dict, Tuple, Optional, Union
 
 from packaging.version import Version
 
 from .constants import *
 from .utils import *
 from .uid_range import UidRange
+from .progress import CrackProgress, ProgressTracker, parse_hashcat_status, parse_john_status
+from .tracing import Tracer
+from .planner import CrackPlan, RangePlan, get_era_key, find_calibration, estimate_seconds
+from .profile import load_host_profile, update_host_profile
+from .occupancy import OccupancyIndex
+from .range_table import RangeTable, Uid16Model
+from .session import CrackSession
+from .arbiter import RESOURCES, DeviceArbiter
+from .opencl_backend import get_opencl_cracker, iter_range_batches, iter_interval_batches
+
+
+# 设定一个UID阈值，将UID范围分为两部分，用于在Windows下对hashcat参数进行针对性的调整以优化性能
+_HASHCAT_UID_THRESHOLD = 10_000_000_000
+
+# 校准时使用的目标MD5对应的UID，UID 0不在任何UID范围内，因而破解程序会遍历所有的候选UID
+_CALIBRATION_UID = 0
+
+# 预热hashcat时依次运行的破解任务，每项为(攻击模式, 是否为标准MD5)，-a 3为掩码，-a 0为字典，
+# 标准MD5优先，因为破解未知类型的MD5时先尝试标准MD5
+_PREWARM_JOBS = [(3, True), (0, True), (3, False), (0, False)]
+
+# 自动调优时测量掩码破解速度及16位UID字典破解速度所使用的UID号段
+_AUTOTUNE_MASK_ERA = UID_10_DIGITS
+_AUTOTUNE_UID16_ERA = UID_20230929_Now
+
+# 自动调优时依次尝试的hashcat负载模式（-w）
+_AUTOTUNE_WORKLOAD_PROFILES = [1, 2, 3, 4]
+
+# 自动调优时依次尝试的hashcat内核参数（-n和-u），None表示由hashcat自行调整
+_AUTOTUNE_KERNEL_PARAMS = [(None, None), (64, 256), (256, 512), (1024, 1024)]
+
+# 自动调优选取UID段大小时，破解程序的启动耗时占每个UID段破解耗时的比例上限
+_AUTOTUNE_MAX_STARTUP_RATIO = 0.05
+
+# 自动调优选取UID段大小时，生成字典最多使用的可用内存比例
+_AUTOTUNE_MAX_MEMORY_RATIO = 0.25
+
+# 自动调优选取的UID段最少包含的UID分布区间数量
+_AUTOTUNE_MIN_INTERVAL_NUM = 100
+
+# 生成一个UID分布区间的字典时占用内存的估计值（字节），包括候选UID字符串、字典文本及写入文件的缓冲，
+# 以占用内存较多的非标准MD5的16进制字典为准
+_UID16_WORDLIST_BYTES_PER_INTERVAL = UID16_INTERVAL_LEN * 128
 
 
 class BiliUidCrack:
@@ -18,7 +66,15 @@ class BiliUidCrack:
     def __init__(self, 
                  hashcat: Optional[str] = None,
                  john: Optional[str] = None,
-                 backend_ignore_cuda: bool = False):
+                 backend_ignore_cuda: bool = False,
+                 progress_callback: Optional[Callable[[CrackProgress], None]] = None,
+                 tracer: Optional[Tracer] = None,
+                 prewarm: bool = False,
+                 occupancy: Optional[OccupancyIndex] = None,
+                 range_table: Optional[RangeTable] = None,
+                 opencl: bool = False,
+                 arbiter: Optional[DeviceArbiter] = None,
+                 arbitrate: bool = True):
         self.__hashcat = None
         self.__hashcat_version = None
         try:
@@ -31,14 +87,50 @@ class BiliUidCrack:
         self.__john_version = None
         try:
             self.__john = get_john_executable(john)
-            self.get_hashcat_version()
+            self.get_john_version()
         except JohnNotFoundException:
             pass
 
-        if self.__hashcat is None and self.__john is None:
+        self.__backend_ignore_cuda = backend_ignore_cuda
+        self.__progress_callback = progress_callback
+        self.__occupancy = occupancy
+        self.__range_table = range_table
+        self.__arbiter = arbiter
+        if arbiter is None and arbitrate:
+            # 默认与本机的其它破解任务排队使用计算设备，数据目录不可写时无法排队，不影响破解
+            self.__arbiter = DeviceArbiter()
+            try:
+                os.makedirs(self.__arbiter.lock_dir, exist_ok=True)
+            except OSError:
+                self.__arbiter = None
+        self.__leases = {}
+        # 仲裁时需要hashcat的设备类型，与版本一样在创建实例时探测并缓存，避免破解时再启动hashcat
+        if self.__arbiter is not None and self.__hashcat is not None:
+            get_hashcat_device_types(self.__hashcat)
+        self.__tracer = Tracer() if tracer is None else tracer
+
+        # OpenCL内核在进程中首次使用时编译，之后创建的实例直接复用
+        self.__opencl = None
+        if opencl:
+            try:
+                with self.__tracer.span('startup', backend='opencl'):
+                    self.__opencl = get_opencl_cracker()
+            except OpenClNotAvailableException:
+                pass
+
+        if self.__hashcat is None and self.__john is None and self.__opencl is None:
             raise NoAvailableCrackerException()
 
-        self.__backend_ignore_cuda = backend_ignore_cuda
+        profile = load_host_profile()
+        self.__throughput = profile.get('throughput', {})
+        self.__tuning = BiliUidCrack.get_default_tuning()
+        self.set_tuning(profile.get('tuning', {}))
+
+        self.__prewarm_thread = None
+        self.__prewarm_md5_type = None
+        self.__crack_start_time = None
+        if prewarm:
+            self.start_prewarm()
 
     def get_hashcat(self) -> str:
         """返回hashcat的绝对路径。
@@ -55,7 +147,8 @@ class BiliUidCrack:
             hashcat (str): hashcatk程序的路径。
         """
         self.__hashcat = get_hashcat_executable(hashcat)
-        self.update_hashcat_version()
+        self.__hashcat_version = None
+        self.get_hashcat_version()
 
     def get_john_the_ripper(self) -> str:
         """返回john程序的绝对路径。
@@ -66,7 +159,148 @@ class BiliUidCrack:
         return self.__john
 
     def set_john_the_ripper(self, john: str):
+        """自定义john程序的路径。
+
+        Args:
+            john (str): john程序的路径。
+        """
         self.__john = get_john_executable(john)
+        self.__john_version = None
+        self.get_john_version()
+
+    def get_opencl_device(self) -> Optional[str]:
+        """返回OpenCL破解后端使用的计算设备的名称。
+
+        Returns:
+            Optional[str]: 计算设备的名称，未启用OpenCL破解后端或其不可用时为None。
+        """
+        return None if self.__opencl is None else self.__opencl.device_name
+
+    def set_progress_callback(self, progress_callback: Optional[Callable[[CrackProgress], None]]):
+        """设置破解进度的回调函数。
+
+        破解过程中会多次调用回调函数，传入的CrackProgress包含整个破解计划中已测试的
+        候选UID数量、候选UID总数、破解速度、当前的UID范围和UID段以及预计剩余时间。
+
+        Args:
+            progress_callback (Optional[Callable[[CrackProgress], None]]): 回调函数，为None时不报告进度。
+        """
+        self.__progress_callback = progress_callback
+
+    def get_tracer(self) -> Tracer:
+        """返回记录各个破解阶段耗时的追踪器。
+
+        Returns:
+            Tracer: 追踪器。
+        """
+        return self.__tracer
+
+    def set_tracer(self, tracer: Tracer):
+        """设置记录各个破解阶段耗时的追踪器。
+
+        Args:
+            tracer (Tracer): 追踪器。
+        """
+        self.__tracer = tracer
+
+    def get_arbiter(self) -> Optional[DeviceArbiter]:
+        """返回破解前排队使用计算设备的仲裁器。
+
+        Returns:
+            Optional[DeviceArbiter]: 仲裁器，未使用时为None。创建实例时未指定仲裁器且arbitrate为True时，
+                使用锁目录为数据目录中本机的锁目录的默认仲裁器。
+        """
+        return self.__arbiter
+
+    def set_arbiter(self, arbiter: Optional[DeviceArbiter]):
+        """设置破解前排队使用计算设备的仲裁器。
+
+        每次调用破解方法时从仲裁器占用所用破解后端需要的资源，直至破解方法返回才释放：hashcat占用device，
+        hashcat只有CPU设备时还占用cpu；john占用cpu；OpenCL破解后端按计算设备的类型占用device或cpu。
+        crack_from_md5()占用所有可用的破解后端需要的资源。本机的其它破解任务占用资源时排队等待，排队的
+        耗时记为queue阶段。预热不经过仲裁器。
+
+        Args:
+            arbiter (Optional[DeviceArbiter]): 仲裁器，为None时不排队，创建实例时也可通过arbitrate=False不排队。
+        """
+        self.__arbiter = arbiter
+
+    def get_occupancy(self) -> Optional[OccupancyIndex]:
+        """返回破解时使用的UID块占用索引。
+
+        Returns:
+            Optional[OccupancyIndex]: 占用索引，未使用时为None。
+        """
+        return self.__occupancy
+
+    def set_occupancy(self, occupancy: Optional[OccupancyIndex]):
+        """设置破解时使用的UID块占用索引，破解和计算破解计划时会去除索引中没有账号的UID块。
+
+        Args:
+            occupancy (Optional[OccupancyIndex]): 占用索引，为None时不使用。
+        """
+        self.__occupancy = occupancy
+
+    def get_range_table(self) -> Optional[RangeTable]:
+        """返回破解时使用的UID号段表。
+
+        Returns:
+            Optional[RangeTable]: UID号段表，未使用时为None。
+        """
+        return self.__range_table
+
+    def set_range_table(self, range_table: Optional[RangeTable]):
+        """设置破解时使用的UID号段表，破解16位UID时使用号段表中的16位UID分布规律代替默认值。
+
+        注意，号段表不会改变破解方法的默认UID范围，需要时可传入range_table.get_uid_ranges()。
+
+        Args:
+            range_table (Optional[RangeTable]): UID号段表，为None时不使用。
+        """
+        self.__range_table = range_table
+
+    def __get_uid16_model(self, uid_range: UidRange) -> Optional[Uid16Model]:
+        """返回破解16位UID范围时使用的分布规律，未使用号段表或号段表中没有相应号段时返回None。
+        """
+        if self.__range_table is None:
+            return None
+        return self.__range_table.get_uid16_model(uid_range)
+
+    @staticmethod
+    def get_default_tuning() -> Dict:
+        """返回未经自动调优时使用的破解参数。
+
+        Returns:
+            Dict: 破解参数，包含uid16_max_interval_num（每个UID段最多包含的UID分布区间数量）、
+                workload_profile（hashcat的-w参数，None表示按UID范围自动选择）、
+                optimized_kernel（是否使用hashcat的-O参数）、kernel_accel和kernel_loops
+                （hashcat的-n和-u参数，None表示由hashcat自行调整）。
+        """
+        return {
+            'uid16_max_interval_num': UID16_MAX_INTERVAL_NUM,
+            'workload_profile': None,
+            'optimized_kernel': True,
+            'kernel_accel': None,
+            'kernel_loops': None,
+        }
+
+    def get_tuning(self) -> Dict:
+        """返回当前使用的破解参数。
+
+        Returns:
+            Dict: 破解参数，结构见get_default_tuning()。
+        """
+        return dict(self.__tuning)
+
+    def set_tuning(self, tuning: Dict):
+        """设置破解参数，未知的参数会被忽略。
+
+        Args:
+            tuning (Dict): 破解参数，结构见get_default_tuning()，可只包含部分参数。
+        """
+        for key, value in tuning.items():
+            if key in self.__tuning:
+                self.__tuning[key] = value
 
     def get_hashcat_version(self) -> Version:
         """返回当前实例中的hashcat版本。
@@ -75,7 +309,7 @@ class BiliUidCrack:
             Version: hashcat的版本。
         """
         if self.__hashcat and self.__hashcat_version is None:
-            self.__hashcat_version = Version(os.popen(f'"{self.__hashcat}" --version').read().strip())
+            self.__hashcat_version = Version(probe_executable(self.__hashcat, '--version'))
 
         return self.__hashcat_version
 
@@ -86,7 +320,7 @@ class BiliUidCrack:
             Version: john的版本。
         """
         if self.__john and self.__john_version is None:
-            version_str = os.popen(f'"{self.__john}"').read().strip().split('\n')[0].split()[3]
+            version_str = probe_executable(self.__john).split()[3]
             self.__john_version = Version(version_str.split('-')[0])
         return self.__john_version
 
@@ -107,7 +341,8 @@ class BiliUidCrack:
         # 给起始UID从左补0直至和结尾UID等长，然后和结尾UID从左到右比较，两者首个不相同的字符称为边界字符，
         # 例如，起始UID和结尾UID分别为
         # 记录边界字符所在位置的索引值，这个值也是两者共同起始字符串的长度。
-        boundary_index = 0
+        # 起始UID和结尾UID相同时以最后一个字符为边界字符。
+        boundary_index = len(end_uid) - 1
         prefixed_start = '0' * (len(end_uid) - len(start_uid)) + start_uid
         for i, (c1, c2) in enumerate(zip(prefixed_start, end_uid)):
             if c1 != c2:
@@ -247,6 +482,253 @@ class BiliUidCrack:
         
         return masks_and_charsets
 
+    @staticmethod
+    def get_mask_candidate_counts(is_standard_md5: bool, masks_and_charsets: Union[Dict[str, List[str]], List[Tuple[str, List[str]]]]) -> List[int]:
+        """计算每个掩码生成的候选UID数量。
+
+        Args:
+            is_standard_md5 (bool): 是否为标准MD5，非标准MD5的自定义字符集为16进制字符集，每2个字符表示1个字符。
+            masks_and_charsets (Union[Dict[str, List[str]], List[Tuple[str, List[str]]]]): get_masks_and_charsets()
+                或get_occupied_masks_and_charsets()返回的掩码和自定义字符集。
+
+        Returns:
+            List[int]: 与掩码一一对应的候选UID数量。
+        """
+        charset_width = 1 if is_standard_md5 else 2
+        if isinstance(masks_and_charsets, dict):
+            masks_and_charsets = masks_and_charsets.items()
+        counts = []
+        for mask, charsets in masks_and_charsets:
+            count = 1
+            i = 0
+            while i < len(mask):
+                if mask[i] == '?':
+                    placeholder = mask[i+1]
+                    if placeholder == 'd':
+                        count *= 10
+                    else:
+                        count *= len(charsets[int(placeholder)-1]) // charset_width
+                    i += 2
+                else:
+                    i += 1
+            counts.append(count)
+        return counts
+
+    @staticmethod
+    def get_occupied_masks_and_charsets(is_standard_md5: bool, uid_range: UidRange, occupancy: Optional[OccupancyIndex] = None) -> List[Tuple[str, List[str]]]:
+        """去除占用索引中没有账号的UID块后，获取用于生成候选UID的掩码和自定义字符集。
+
+        不同子范围的掩码可能相同而自定义字符集不同，因此以列表而非字典返回。有账号的子范围由
+        UID块拼接而成，起止UID可以是任意值，因此先用__split_mask_range()拆分为掩码可以精确表示的
+        子范围，避免掩码生成子范围之外的候选UID。
+
+        Args:
+            is_standard_md5 (bool): 是否为标准MD5。
+            uid_range (UidRange): 指定破解的UID范围。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None时不去除任何UID。
+
+        Returns:
+            List[Tuple[str, List[str]]]: 掩码和自定义字符集的列表，UID范围内没有账号时为空列表。
+        """
+        if occupancy is None:
+            uid_ranges = [uid_range]
+        else:
+            uid_ranges = [y for x in occupancy.get_occupied_ranges(uid_range) for y in BiliUidCrack.__split_mask_range(x)]
+
+        masks_and_charsets = []
+        for sub_range in uid_ranges:
+            for mask, charsets in BiliUidCrack.get_masks_and_charsets(is_standard_md5, sub_range).items():
+                # 自定义字符集为空的掩码不生成任何候选UID
+                if all([x != '' for x in charsets]):
+                    masks_and_charsets.append((mask, charsets))
+        return masks_and_charsets
+
+    @staticmethod
+    def __split_mask_range(uid_range: UidRange) -> List[UidRange]:
+        """将UID范围拆分为可以用一个掩码精确表示的子范围。
+
+        每个子范围内的UID位数相同，且只有一位数字不同，该位右侧的数字在起始UID中均为0、在结尾UID中
+        均为9，例如[8990000, 9009999]拆分为[8990000, 8999999]和[9000000, 9009999]。
+
+        Args:
+            uid_range (UidRange): UID范围。
+
+        Returns:
+            List[UidRange]: 按顺序排列的子范围。
+        """
+        sub_ranges = []
+        start = max(uid_range.start, 1)
+        while start <= uid_range.end:
+            end = min(uid_range.end, 10 ** len(str(start)) - 1)
+
+            # 以start为起点且不超过end的最大的10的幂次对齐的块
+            block_size = 1
+            while start % (block_size * 10) == 0 and start + block_size * 10 - 1 <= end:
+                block_size *= 10
+
+            # 同一个更大的块内连续的块只有一位数字不同
+            block_num = min((end - start + 1) // block_size, 10 - start // block_size % 10)
+            sub_ranges.append(UidRange(start, start + block_num * block_size - 1))
+            start += block_num * block_size
+        return sub_ranges
+
+    @staticmethod
+    def is_uid16_range(uid_range: UidRange) -> bool:
+        """判断UID范围是否为16位UID范围，即是否可以利用16位UID的分布规律进行破解。
+
+        Args:
+            uid_range (UidRange): UID范围。
+
+        Returns:
+            bool: 起始UID和结尾UID均为16位且不小于UID16_START时返回True，否则返回False。
+        """
+        return (uid_range.start >= UID16_START
+                and len(str(uid_range.start)) == 16
+                and len(str(uid_range.end)) == 16)
+
+    @staticmethod
+    def get_uid16_segments(uid_range: UidRange, max_interval_num: int = UID16_MAX_INTERVAL_NUM, occupancy: Optional[OccupancyIndex] = None,
+                           model: Optional[Uid16Model] = None) -> List[Tuple[int, int]]:
+        """将16位UID范围分成多段UID，每段UID包含的UID分布区间数量不超过max_interval_num。
+
+        使用占用索引时，只计算有账号的UID分布区间，每段UID的起点和结尾为有账号的UID分布区间，
+        没有账号的UID分布区间不会单独成段。
+
+        Args:
+            uid_range (UidRange): 16位UID范围。
+            max_interval_num (int, optional): 每段UID最多包含的UID分布区间数量。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None或索引不包含该范围时不去除任何UID分布区间。
+            model (Optional[Uid16Model], optional): 16位UID的分布规律，默认为constants.py中的分布规律。
+
+        Returns:
+            List[Tuple[int, int]]: UID段的列表，每段UID为(start, end)，包含的UID分布区间的起点为range(start, end, model.step)。
+        """
+        model = Uid16Model() if model is None else model
+        step = model.step
+        # 指定UID范围内的第一个UID分布区间的起点
+        first_interval_start = model.get_interval_start(uid_range.start)
+        # 指定UID范围内的最后一个UID分布区间的起点
+        last_interval_start = model.get_interval_start(uid_range.end)
+        if BiliUidCrack.__is_occupancy_applicable(occupancy, model) and occupancy.covers_uid16(first_interval_start, last_interval_start + step):
+            segments = []
+            end_of_range = last_interval_start + step
+            start = occupancy.find_uid16_interval(first_interval_start, end_of_range)
+            while start is not None:
+                last = occupancy.find_uid16_interval(start, end_of_range, max_interval_num)
+                end = end_of_range if last is None else last + step
+                segments.append((start, end))
+                start = occupancy.find_uid16_interval(end, end_of_range) if end < end_of_range else None
+            return segments
+
+        # 指定UID范围内存在的UID分布区间数量
+        interval_count = (last_interval_start - first_interval_start) // step + 1
+        # 将指定UID范围分成多段UID进行处理，此为UID段的数量
+        segment_count = interval_count // max_interval_num + (0 if interval_count % max_interval_num == 0 else 1)
+        # 每个UID段的跨度
+        segment_span = step * max_interval_num
+
+        segments = []
+        for i in range(segment_count):
+            start = first_interval_start + i * segment_span
+            end = start + segment_span if (last_interval_start - start) // step + 1 >= max_interval_num else last_interval_start + step
+            segments.append((start, end))
+        return segments
+
+    @staticmethod
+    def get_uid16_segment_candidate_count(start: int, end: int, occupancy: Optional[OccupancyIndex] = None, model: Optional[Uid16Model] = None) -> int:
+        """计算一段16位UID的候选UID数量。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None时不去除任何UID分布区间。
+            model (Optional[Uid16Model], optional): 16位UID的分布规律，默认为constants.py中的分布规律。
+
+        Returns:
+            int: 候选UID数量。
+        """
+        model = Uid16Model() if model is None else model
+        if BiliUidCrack.__is_occupancy_applicable(occupancy, model):
+            return occupancy.count_uid16_intervals(start, end) * model.interval_len
+        return (end - start) // model.step * model.interval_len
+
+    @staticmethod
+    def get_uid16_interval_starts(start: int, end: int, occupancy: Optional[OccupancyIndex] = None, model: Optional[Uid16Model] = None) -> List[int]:
+        """返回一段16位UID中需要破解的UID分布区间中的第一个UID。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None时不去除任何UID分布区间。
+            model (Optional[Uid16Model], optional): 16位UID的分布规律，默认为constants.py中的分布规律。
+
+        Returns:
+            List[int]: 按顺序排列的UID分布区间的起点加上偏移量，每个区间包含model.interval_len个UID。
+        """
+        model = Uid16Model() if model is None else model
+        if BiliUidCrack.__is_occupancy_applicable(occupancy, model):
+            return [x + model.offset for x in occupancy.iter_uid16_intervals(start, end)]
+        return list(range(start + model.offset, end, model.step))
+
+    @staticmethod
+    def get_uid16_wordlist(start: int, end: int, is_standard_md5: bool, occupancy: Optional[OccupancyIndex] = None, model: Optional[Uid16Model] = None) -> str:
+        """生成一段16位UID的字典。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+            is_standard_md5 (bool): 是否为标准MD5，非标准MD5的字典为hashcat的16进制字典格式。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None时不去除任何UID分布区间。
+            model (Optional[Uid16Model], optional): 16位UID的分布规律，默认为constants.py中的分布规律。
+
+        Returns:
+            str: 每行一个候选UID的字典文本。
+        """
+        model = Uid16Model() if model is None else model
+        range_starts = BiliUidCrack.get_uid16_interval_starts(start, end, occupancy, model)
+        if is_standard_md5:
+            uid16_list = [str(range_start+i) for i in range(model.interval_len) for range_start in range_starts]
+        else:
+            uid16_list = ['0'+'0'.join(str(range_start+i)) for i in range(model.interval_len) for range_start in range_starts]
+        return '\n'.join(uid16_list)
+
+    @staticmethod
+    def __is_occupancy_applicable(occupancy: Optional[OccupancyIndex], model: Uid16Model) -> bool:
+        """判断占用索引能否用于16位UID的分布规律，占用索引的块与默认的UID分布区间一一对应。
+        """
+        return (occupancy is not None and model.step == UID16_STEP
+                and (model.start - UID16_START) % UID16_STEP == 0)
+
+    @staticmethod
+    def count_candidates(is_standard_md5: bool, uid_ranges: List[UidRange], occupancy: Optional[OccupancyIndex] = None,
+                         range_table: Optional[RangeTable] = None) -> int:
+        """计算破解指定UID范围时需要测试的候选UID总数。
+
+        Args:
+            is_standard_md5 (bool): 是否为标准MD5。
+            uid_ranges (List[UidRange]): 指定破解的UID范围。
+            occupancy (Optional[OccupancyIndex], optional): 占用索引，为None时不去除任何UID。
+            range_table (Optional[RangeTable], optional): UID号段表，为None时使用constants.py中的16位UID分布规律。
+
+        Returns:
+            int: 候选UID总数。
+        """
+        total = 0
+        for uid_range in uid_ranges:
+            if BiliUidCrack.is_uid16_range(uid_range):
+                model = None if range_table is None else range_table.get_uid16_model(uid_range)
+                if occupancy is None:
+                    total += sum([BiliUidCrack.get_uid16_segment_candidate_count(start, end, model=model)
+                                  for start, end in BiliUidCrack.get_uid16_segments(uid_range, model=model)])
+                else:
+                    # 候选UID总数与UID段的划分无关，将整个范围视为一段以减少查找
+                    total += sum([BiliUidCrack.get_uid16_segment_candidate_count(start, end, occupancy, model)
+                                  for start, end in BiliUidCrack.get_uid16_segments(uid_range, 2 ** 62, occupancy, model)])
+            else:
+                masks_and_charsets = BiliUidCrack.get_occupied_masks_and_charsets(is_standard_md5, uid_range, occupancy)
+                total += sum(BiliUidCrack.get_mask_candidate_counts(is_standard_md5, masks_and_charsets))
+        return total
+
     @staticmethod
     def __read_uid_from_hashcat_outfile(outfile: str) -> int:
         """从hashcat的输出文件中获取破解的UID值，若无破解的UID则返回-1。
@@ -287,80 +769,506 @@ class BiliUidCrack:
         else:
             return int(text.split(':')[-1])
 
-    def hashcat_crack_md5(self, md5: str, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL) -> int:
-        """使用hashcat破解MD5。
+    def __run_cracker(self, args: List[str], cwd: str, on_output: Callable[[str], bool], session: CrackSession) -> Tuple[int, str]:
+        """运行破解程序，并逐行处理破解程序的输出。
+
+        破解程序启动至输出首个状态行的耗时记为startup阶段，包括计算设备和内核的初始化，
+        其后至破解程序退出的耗时记为crack阶段。若为破解方法中首次运行破解程序，还会记录
+        从调用破解方法至输出首个状态行的first_candidate阶段。
+
+        Args:
+            args (List[str]): 破解程序的命令行参数。
+            cwd (str): 破解程序的工作目录。
+            on_output (Callable[[str], bool]): 处理一行输出的函数，当该行为状态行时返回True。
+            session (CrackSession): 破解会话，会话取消时结束破解程序。
+
+        Returns:
+            Tuple[int, str]: 破解程序的返回码，以及最后若干行非状态行的输出，用于在运行失败时提示错误信息。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
+        """
+        output_tail = deque(maxlen=20)
+        first_status_time = None
+        spawn_time = time.perf_counter()
+        process = subprocess.Popen(args, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   universal_newlines=True, encoding='utf-8', errors='replace')
+        session.add_process(process)
+        try:
+            for line in process.stdout:
+                if on_output(line):
+                    if first_status_time is None:
+                        first_status_time = time.perf_counter()
+                else:
+                    output_tail.append(line.rstrip())
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            session.remove_process(process)
+
+        exit_time = time.perf_counter()
+        if first_status_time is None:
+            first_status_time = exit_time
+        self.__tracer.record('startup', spawn_time, first_status_time - spawn_time)
+        self.__tracer.record('crack', first_status_time, exit_time - first_status_time)
+
+        # 从调用破解方法至首次运行的破解程序开始测试候选UID的耗时
+        if self.__crack_start_time is not None:
+            self.__tracer.record('first_candidate', self.__crack_start_time, first_status_time - self.__crack_start_time)
+            self.__crack_start_time = None
+
+        # 被取消的破解程序的返回码没有意义
+        if session.cancelled:
+            raise CrackCancelledException()
+
+        return returncode, '\n'.join([x for x in output_tail if x != ''])
+
+    def __get_resources(self, backends: List[str]) -> List[str]:
+        """返回破解后端需要从仲裁器占用的资源，按仲裁器的RESOURCES排序。
+        """
+        resources = set()
+        for backend in backends:
+            if backend == 'hashcat':
+                resources.add('device')
+                # hashcat没有GPU等其它设备时在CPU上破解
+                device_types = get_hashcat_device_types(self.__hashcat)
+                if len(device_types) > 0 and all([x.upper() == 'CPU' for x in device_types]):
+                    resources.add('cpu')
+            elif backend == 'john':
+                resources.add('cpu')
+            elif backend == 'opencl':
+                resources.add('cpu' if self.__opencl.is_cpu else 'device')
+        return [x for x in RESOURCES if x in resources]
+
+    def __is_claimed(self, backends: List[str]) -> bool:
+        """判断破解后端需要的资源是否均已占用，未设置仲裁器时返回True。
+        """
+        return self.__arbiter is None or all([x in self.__leases for x in self.__get_resources(backends)])
+
+    @contextmanager
+    def __claim(self, backends: List[str], session: Optional[CrackSession]):
+        """从仲裁器占用破解后端需要的资源直至退出上下文，已占用的资源不再重复占用。
+
+        按RESOURCES的顺序依次排队占用，每种资源排队的耗时记为queue阶段。
+
+        Args:
+            backends (List[str]): 破解后端，hashcat、john或opencl。
+            session (Optional[CrackSession]): 破解会话，会话取消时停止排队。
+
+        Raises:
+            CrackCancelledException: 排队时破解会话被取消。
+        """
+        claimed = []
+        try:
+            if self.__arbiter is not None:
+                for resource in self.__get_resources(backends):
+                    if resource in self.__leases:
+                        continue
+                    with self.__tracer.span('queue', resource=resource) as queue:
+                        lease = self.__arbiter.acquire(resource, lambda: session is not None and session.cancelled)
+                        queue.attrs['slot'] = lease.slot
+                    self.__leases[resource] = lease
+                    claimed.append(resource)
+            yield
+        finally:
+            for resource in claimed:
+                self.__leases.pop(resource).release()
+
+    def __run_hashcat(self, hashcat_cmd: str, out_file: str, tracker: ProgressTracker, session: CrackSession, mask_counts: Optional[List[int]] = None) -> int:
+        """运行一次hashcat，解析hashcat输出的状态并报告进度。
+
+        Args:
+            hashcat_cmd (str): hashcat命令。
+            out_file (str): hashcat的输出文件。
+            tracker (ProgressTracker): 破解进度。
+            session (CrackSession): 破解会话。
+            mask_counts (Optional[List[int]], optional): 使用掩码文件时每个掩码的候选UID数量。
+
+        Returns:
+            int: 已破解的UID，若未破解则返回-1。
+        """
+        def on_output(line: str) -> bool:
+            status = parse_hashcat_status(line)
+            if status is None:
+                return False
+
+            if mask_counts is None:
+                tracker.update(status['progress'], status['speed'])
+            else:
+                # hashcat报告的进度是当前掩码的进度，需要加上之前的掩码的候选UID数量
+                tested = sum(mask_counts[:status['mask_index']-1]) + status['progress']
+                tracker.update(tested, status['speed'], status['mask_index'], status['mask_count'])
+            return True
+
+        args = shlex.split(hashcat_cmd)
+        # 有多个计算设备时只使用分配到的设备，hashcat的设备序号从1开始
+        lease = self.__leases.get('device')
+        if lease is not None and self.__arbiter.get_slots('device') > 1:
+            args[1:1] = ['-d', str(lease.slot + 1)]
+
+        with self.__tracer.span('task', backend='hashcat', **BiliUidCrack.__get_task_attrs(tracker)) as task:
+            returncode, output = self.__run_cracker(args, os.path.split(self.__hashcat)[0], on_output, session)
+            if returncode not in [0, 1]:
+                raise FailedToRunHashcatException(f'错误码:{returncode}' + (f'\n{output}' if output else ''))
+
+            with self.__tracer.span('parse'):
+                uid = BiliUidCrack.__read_uid_from_hashcat_outfile(out_file)
+            task.attrs['tested'] = tracker.task_tested if uid > 0 else tracker.task_total
+
+        tracker.finish_task()
+        return uid
+
+    def __run_john(self, john_cmd: str, pot_file: str, tracker: ProgressTracker, session: CrackSession) -> int:
+        """运行一次john，解析john输出的状态并报告进度。
+
+        Args:
+            john_cmd (str): john命令。
+            pot_file (str): john的输出文件。
+            tracker (ProgressTracker): 破解进度。
+            session (CrackSession): 破解会话。
+
+        Returns:
+            int: 已破解的UID，若未破解则返回-1。
+        """
+        def on_output(line: str) -> bool:
+            status = parse_john_status(line)
+            if status is None:
+                return False
+
+            if status['fraction'] is not None:
+                tracker.update(int(status['fraction'] * tracker.task_total), status['speed'])
+            return True
+
+        with self.__tracer.span('task', backend='john', **BiliUidCrack.__get_task_attrs(tracker)) as task:
+            returncode, output = self.__run_cracker(shlex.split(john_cmd), os.path.split(self.__john)[0], on_output, session)
+            if returncode != 0:
+                raise FailedToRunJohnException(f'错误码:{returncode}' + (f'\n{output}' if output else ''))
+
+            with self.__tracer.span('parse'):
+                uid = BiliUidCrack.__read_uid_from_john_pot_file(pot_file)
+            task.attrs['tested'] = tracker.task_tested if uid > 0 else tracker.task_total
+
+        tracker.finish_task()
+        return uid
+
+    def __run_opencl(self, md5: str, is_standard_md5: bool, batches: Iterator[Tuple], tracker: ProgressTracker, session: CrackSession) -> int:
+        """在OpenCL设备上依次破解各批分片，每批结束后报告进度，破解后不再运行之后的批次。
+
+        每批的耗时记为crack阶段，若为破解方法中首次运行的批次，还会记录first_candidate阶段。
 
         Args:
             md5 (str): 16进制MD5值。
             is_standard_md5 (bool): 指定是否为标准的MD5值。
-            uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            batches (Iterator[Tuple]): opencl_backend.iter_range_batches()或iter_interval_batches()返回的批次。
+            tracker (ProgressTracker): 破解进度。
+            session (CrackSession): 破解会话，会话取消时不再运行之后的批次。
 
         Returns:
             int: 已破解的UID，若未破解则返回-1。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
         """
-        if self.__hashcat is None:
-            raise HashcatNotFoundException()
+        uid = -1
+        with self.__tracer.span('task', backend='opencl', **BiliUidCrack.__get_task_attrs(tracker)) as task:
+            tested = 0
+            for digits, bases, lows, highs in batches:
+                if session.cancelled:
+                    raise CrackCancelledException()
+
+                start = time.perf_counter()
+                if self.__crack_start_time is not None:
+                    self.__tracer.record('first_candidate', self.__crack_start_time, start - self.__crack_start_time)
+                    self.__crack_start_time = None
+
+                uid = self.__opencl.crack_batch(md5, is_standard_md5, digits, bases, lows, highs)
+                seconds = time.perf_counter() - start
+                self.__tracer.record('crack', start, seconds)
+
+                count = int(highs.sum()) - int(lows.sum()) + len(bases)
+                tested += count
+                tracker.update(tested, count / seconds if seconds > 0 else 0.0)
+                if uid > 0:
+                    break
+            task.attrs['tested'] = tracker.task_tested if uid > 0 else tracker.task_total
+
+        tracker.finish_task()
+        return uid
 
-        # 设定一个UID阈值，将UID范围分为两部分，用于在Windows下对hashcat参数进行针对性的调整以优化性能
-        uid_threshold = 10_000_000_000
+    @staticmethod
+    def __get_task_attrs(tracker: ProgressTracker) -> Dict:
+        """返回当前破解任务的UID范围、序号及候选UID数量，用于记录task阶段。
+        """
+        return {
+            'uid_range': [tracker.uid_range.start, tracker.uid_range.end],
+            'segment': tracker.segment,
+            'segment_count': tracker.segment_count,
+            'candidates': tracker.task_total,
+        }
 
+    @staticmethod
+    def __split_uid_ranges_for_hashcat(uid_ranges: List[UidRange]) -> List[UidRange]:
+        """将包含UID阈值_HASHCAT_UID_THRESHOLD的UID范围拆分为小于和大等于该阈值的范围。
+        """
         splited_uid_ranges = []
         for uid_range in uid_ranges:
-            if uid_range.start < uid_threshold and uid_range.end >= uid_threshold:
-                # 将包含UID阈值的范围拆分为小于和大等于该阈值的范围
-                splited_uid_ranges.append(UidRange(uid_range.start, uid_threshold-1))
-                splited_uid_ranges.append(UidRange(uid_threshold, uid_range.end))
+            if uid_range.start < _HASHCAT_UID_THRESHOLD and uid_range.end >= _HASHCAT_UID_THRESHOLD:
+                splited_uid_ranges.append(UidRange(uid_range.start, _HASHCAT_UID_THRESHOLD-1))
+                splited_uid_ranges.append(UidRange(_HASHCAT_UID_THRESHOLD, uid_range.end))
             else:
                 splited_uid_ranges.append(uid_range)
+        return splited_uid_ranges
+
+    def __get_hashcat_tuning_options(self, uid_range: UidRange, is_uid16: bool) -> str:
+        """根据破解参数返回hashcat的内核及负载相关的命令行参数。
+        """
+        options = []
+        if self.__tuning['optimized_kernel']:
+            options.append('-O')
+
+        workload_profile = self.__tuning['workload_profile']
+        if workload_profile is None and not is_uid16:
+            workload_profile = 4
+            if platform.system() == 'Windows' and uid_range.end < _HASHCAT_UID_THRESHOLD:
+                workload_profile = 1
+        if workload_profile is not None:
+            options.append(f'-w {workload_profile}')
+
+        if self.__tuning['kernel_accel'] is not None:
+            options.append(f"-n {self.__tuning['kernel_accel']}")
+        if self.__tuning['kernel_loops'] is not None:
+            options.append(f"-u {self.__tuning['kernel_loops']}")
+        return ' '.join(options)
+
+    @staticmethod
+    def __get_hashcat_maskfile_text(masks_and_charsets: List[Tuple[str, List[str]]]) -> str:
+        """生成hashcat掩码文件的内容，每行为逗号分隔的自定义字符集和掩码。
+        """
+        masks_and_charsets_str = ''
+        for mask, charsets in masks_and_charsets:
+            if len(charsets) > 0:
+                masks_and_charsets_str += ','.join(charsets) + ','
+            masks_and_charsets_str += mask + '\n'
+        return masks_and_charsets_str
+
+    def start_prewarm(self):
+        """在后台线程中预热hashcat。
+
+        依次使用掩码和字典两种攻击模式，对标准和非标准MD5各运行一次只包含极少候选UID的
+        破解，使hashcat提前完成计算设备的初始化并编译或加载内核缓存。之后的破解会先等待
+        预热结束，并跳过尚未开始的与所破解的MD5类型不同的预热任务。若hashcat不可用或
+        预热正在进行则不做任何事情。
+        """
+        if self.__hashcat is None or self.__prewarm_thread is not None:
+            return
+
+        self.__prewarm_md5_type = None
+        self.__prewarm_thread = threading.Thread(target=self.__prewarm, name='hashcat-prewarm', daemon=True)
+        self.__prewarm_thread.start()
+
+    def __prewarm(self):
+        """依次运行_PREWARM_JOBS中的预热任务，每个任务的耗时记为prewarm阶段。
+        """
+        with TemporaryDirectory(prefix='hashcat_prewarm_') as temp_dir:
+            out_file = os.path.join(temp_dir, 'outfile.txt')
+            attack_file = os.path.join(temp_dir, 'attack.txt')
+            for attack_mode, is_standard_md5 in _PREWARM_JOBS:
+                if self.__prewarm_md5_type is not None and self.__prewarm_md5_type != is_standard_md5:
+                    continue
+
+                if attack_mode == 3:
+                    uid_range = UidRange(10, 99)
+                    text = BiliUidCrack.__get_hashcat_maskfile_text(BiliUidCrack.get_occupied_masks_and_charsets(is_standard_md5, uid_range))
+                    hex_option = '' if is_standard_md5 else '--hex-charset'
+                else:
+                    uid_range = UidRange(UID16_START, UID16_START + UID16_INTERVAL_LEN - 1)
+                    text = BiliUidCrack.get_uid16_wordlist(UID16_START, UID16_START + UID16_STEP, is_standard_md5)
+                    hex_option = '' if is_standard_md5 else '--hex-wordlist'
+
+                start = time.perf_counter()
+                returncode = None
+                try:
+                    with open(attack_file, 'w', encoding='utf-8') as fp:
+                        fp.write(text)
+                    md5 = uid_to_md5(_CALIBRATION_UID, is_standard_md5)
+                    hashcat_cmd = f"\"{self.__hashcat}\" -m 0 -a {attack_mode} {hex_option} --outfile-format 2 --outfile \"{out_file}\" {'--backend-ignore-cuda' if self.__backend_ignore_cuda else ''} --potfile-disable --logfile-disable {self.__get_hashcat_tuning_options(uid_range, attack_mode == 0)} --hwmon-disable {md5} \"{attack_file}\""
+                    returncode = subprocess.run(shlex.split(hashcat_cmd), cwd=os.path.split(self.__hashcat)[0], stdin=subprocess.DEVNULL,
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+                except (OSError, subprocess.SubprocessError):
+                    # 预热失败不影响之后的破解
+                    pass
+                self.__tracer.record('prewarm', start, time.perf_counter() - start,
+                                     attack_mode=attack_mode, is_standard_md5=is_standard_md5, returncode=returncode)
+
+    def __wait_prewarm(self, is_standard_md5: bool):
+        """等待预热结束，尚未开始的与is_standard_md5不同类型的预热任务会被跳过。
+        """
+        if self.__prewarm_thread is None:
+            return
+
+        self.__prewarm_md5_type = is_standard_md5
+        with self.__tracer.span('prewarm_wait'):
+            self.__prewarm_thread.join()
+        self.__prewarm_thread = None
+
+    def __get_occupancy_key(self) -> Optional[str]:
+        """返回会话缓存的键中表示占用索引的部分。
+        """
+        return None if self.__occupancy is None else self.__occupancy.path
+
+    def __get_mask_plan(self, session: CrackSession, is_standard_md5: bool, uid_range: UidRange) -> Tuple[List[Tuple[str, List[str]]], List[int]]:
+        """返回UID范围的掩码和自定义字符集及每个掩码的候选UID数量，在会话中缓存。
+        """
+        def factory():
+            masks_and_charsets = BiliUidCrack.get_occupied_masks_and_charsets(is_standard_md5, uid_range, self.__occupancy)
+            return masks_and_charsets, BiliUidCrack.get_mask_candidate_counts(is_standard_md5, masks_and_charsets)
+
+        with self.__tracer.span('plan'):
+            return session.get_plan(('masks', is_standard_md5, uid_range, self.__get_occupancy_key()), factory)
+
+    def __get_uid16_plan(self, session: CrackSession, uid_range: UidRange) -> Tuple[Optional[Uid16Model], List[Tuple[int, int]], List[int]]:
+        """返回16位UID范围的分布规律、UID段及每段的候选UID数量，在会话中缓存。
+        """
+        model = self.__get_uid16_model(uid_range)
+        max_interval_num = self.__tuning['uid16_max_interval_num']
+
+        def factory():
+            segments = BiliUidCrack.get_uid16_segments(uid_range, max_interval_num, self.__occupancy, model)
+            return segments, [BiliUidCrack.get_uid16_segment_candidate_count(start, end, self.__occupancy, model) for start, end in segments]
+
+        with self.__tracer.span('plan'):
+            segments, counts = session.get_plan(('uid16', uid_range, max_interval_num, self.__get_occupancy_key(), model), factory)
+        return model, segments, counts
+
+    def __get_range_plan(self, session: CrackSession, uid_range: UidRange) -> List[UidRange]:
+        """返回UID范围去除没有账号的UID块后的子范围，在会话中缓存。
+        """
+        def factory():
+            return [uid_range] if self.__occupancy is None else self.__occupancy.get_occupied_ranges(uid_range)
+
+        with self.__tracer.span('plan'):
+            return session.get_plan(('ranges', uid_range, self.__get_occupancy_key()), factory)
+
+    def __count_backend_candidates(self, backend: str, is_standard_md5: bool, uid_ranges: List[UidRange], session: CrackSession) -> int:
+        """计算破解后端破解UID范围时需要测试的候选UID总数，使用会话中缓存的计划。
+        """
+        if backend == 'hashcat':
+            uid_ranges = BiliUidCrack.__split_uid_ranges_for_hashcat(uid_ranges)
+
+        total = 0
+        for uid_range in uid_ranges:
+            if BiliUidCrack.is_uid16_range(uid_range):
+                total += sum(self.__get_uid16_plan(session, uid_range)[2])
+            elif backend == 'opencl':
+                total += sum([x.end - x.start + 1 for x in self.__get_range_plan(session, uid_range)])
+            else:
+                total += sum(self.__get_mask_plan(session, is_standard_md5, uid_range)[1])
+        return total
 
-        # 创建必要的临时文件
-        temp_files = []
-        prefixes = ['hashcat_outfile_', 'hashcat_hash_', 'hashcat_wordlist_', 'hashcat_masks_']
-        for prefix in prefixes:
-            with NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', prefix=prefix, delete=False) as fp:
-                temp_files.append(fp.name)
-                if prefix == 'hashcat_hash_':
-                    fp.write(md5)
-        out_file, hash_file, wordlist_file, maskfile = temp_files
+    def __create_tracker(self, backend: str, total: int, session: CrackSession) -> ProgressTracker:
+        """创建本次破解的进度，进度换算为会话中整个破解计划的进度。
+        """
+        offset, plan_total = session.get_progress()
+        return ProgressTracker(backend, total, self.__progress_callback, offset, plan_total)
+
+    @staticmethod
+    def __finish_tracker(tracker: ProgressTracker, total: int, session: CrackSession, is_success: bool):
+        """在会话中记录本次破解已测试的候选UID数量。
+
+        破解失败时，已测试的候选UID会由下一个破解后端重新测试，因此同时计入整个计划的总数，
+        使进度不会倒退。
+        """
+        if is_success:
+            session.add_progress(total)
+        else:
+            session.add_progress(tracker.tested, tracker.tested)
+
+    def count_crack_candidates(self, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
+        """计算crack_from_md5()破解指定UID范围时需要测试的候选UID总数。
+
+        按crack_from_md5()优先使用的破解后端计算，不同破解后端的候选UID数量可能不同，
+        例如OpenCL破解后端直接测试UID范围而不使用掩码。
+
+        Args:
+            is_standard_md5 (bool): 指定是否为标准的MD5值。
+            uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，计算时生成的计划缓存在会话中供之后的破解复用。
+
+        Returns:
+            int: 候选UID总数。
+        """
+        if session is None:
+            with CrackSession() as session:
+                return self.count_crack_candidates(is_standard_md5, uid_ranges, session)
+
+        if self.__hashcat:
+            backend = 'hashcat'
+        elif self.__opencl:
+            backend = 'opencl'
+        else:
+            backend = 'john'
+        return self.__count_backend_candidates(backend, is_standard_md5, uid_ranges, session)
+
+    def hashcat_crack_md5(self, md5: str, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
+        """使用hashcat破解MD5。
+
+        Args:
+            md5 (str): 16进制MD5值。
+            is_standard_md5 (bool): 指定是否为标准的MD5值。
+            uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，多次破解时复用其中的工作目录、
+                掩码文件及UID段，为None时使用仅用于本次破解的会话。
+
+        Returns:
+            int: 已破解的UID，若未破解则返回-1。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
+        """
+        if self.__hashcat is None:
+            raise HashcatNotFoundException()
+
+        if session is None:
+            with CrackSession() as session:
+                return self.hashcat_crack_md5(md5, is_standard_md5, uid_ranges, session)
+
+        if not self.__is_claimed(['hashcat']):
+            with self.__claim(['hashcat'], session):
+                return self.hashcat_crack_md5(md5, is_standard_md5, uid_ranges, session)
+
+        self.__crack_start_time = time.perf_counter()
+        self.__wait_prewarm(is_standard_md5)
+
+        splited_uid_ranges = BiliUidCrack.__split_uid_ranges_for_hashcat(uid_ranges)
+
+        # 在会话的工作目录中创建本次破解的临时文件，掩码文件由会话缓存
+        out_file = session.create_file('hashcat_outfile_')
+        hash_file = session.create_file('hashcat_hash_', md5)
+        wordlist_file = session.create_file('hashcat_wordlist_')
+
+        total = self.__count_backend_candidates('hashcat', is_standard_md5, uid_ranges, session)
+        tracker = self.__create_tracker('hashcat', total, session)
 
         uid = -1
+        is_success = False
         try:
             for uid_range in splited_uid_ranges:
                 # 当遇到16位UID时利用16位UID的分布规律进行破解
-                if (uid_range.start >= UID16_START
-                        and len(str(uid_range.start)) == 16
-                        and len(str(uid_range.end)) == 16):
-                    # 指定UID范围内的第一个UID分布区间的起点
-                    first_interval_start = UID16_START + (uid_range.start - UID16_START) // UID16_STEP * UID16_STEP
-                    # 指定UID范围内的最后一个UID分布区间的起点
-                    last_interval_start = UID16_START + (uid_range.end - UID16_START) // UID16_STEP * UID16_STEP
-                    # 指定UID范围内存在的UID分布区间数量
-                    interval_count = (last_interval_start - first_interval_start) / UID16_STEP + 1
-                    # 将指定UID范围分成多段UID进行处理，此为UID段的数量
-                    segment_count = int(interval_count / UID16_MAX_INTERVAL_NUM) + (0 if interval_count % UID16_MAX_INTERVAL_NUM == 0 else 1)
-                    # 每个UID段的跨度
-                    segment_span = UID16_STEP * UID16_MAX_INTERVAL_NUM
-
-                    for i in range(segment_count):
-                        start = first_interval_start + i * segment_span
-                        end = start + segment_span if (last_interval_start - start) / UID16_STEP + 1 >= UID16_MAX_INTERVAL_NUM else last_interval_start + UID16_STEP
-
-                        if is_standard_md5:
-                            uid16_list = [str(range_start+i) for i in range(UID16_INTERVAL_LEN) for range_start in range(start, end, UID16_STEP)]
-                        else:
-                            uid16_list = ['0'+'0'.join(str(range_start+i)) for i in range(UID16_INTERVAL_LEN) for range_start in range(start, end, UID16_STEP)]
-                        uid16_wordlist = '\n'.join(uid16_list)
-
-                        with open(wordlist_file, 'w', encoding='utf-8') as fp:
-                            fp.write(uid16_wordlist)
-
-                        hashcat_cmd = f"\"{self.__hashcat}\" -m 0 -a 0 {'' if is_standard_md5 else '--hex-wordlist'} --outfile-format 2 --outfile \"{out_file}\" {'--backend-ignore-cuda' if self.__backend_ignore_cuda else ''} --potfile-disable --logfile-disable -O --hwmon-disable \"{hash_file}\" \"{wordlist_file}\""
-                        process = subprocess.run(shlex.split(hashcat_cmd), cwd=os.path.split(self.__hashcat)[0])
-
-                        if process.returncode not in [0, 1]:
-                            raise FailedToRunHashcatException(f'错误码:{process.returncode}')
-
-                        uid = BiliUidCrack.__read_uid_from_hashcat_outfile(out_file)
+                if BiliUidCrack.is_uid16_range(uid_range):
+                    model, segments, segment_counts = self.__get_uid16_plan(session, uid_range)
+                    for i, (start, end) in enumerate(segments):
+                        with self.__tracer.span('generate'):
+                            uid16_wordlist = BiliUidCrack.get_uid16_wordlist(start, end, is_standard_md5, self.__occupancy, model)
+                        with self.__tracer.span('write'):
+                            with open(wordlist_file, 'w', encoding='utf-8') as fp:
+                                fp.write(uid16_wordlist)
+
+                        tracker.start_task(uid_range, i + 1, len(segments), segment_counts[i])
+                        hashcat_cmd = f"\"{self.__hashcat}\" -m 0 -a 0 {'' if is_standard_md5 else '--hex-wordlist'} --outfile-format 2 --outfile \"{out_file}\" {'--backend-ignore-cuda' if self.__backend_ignore_cuda else ''} --potfile-disable --logfile-disable {self.__get_hashcat_tuning_options(uid_range, True)} --hwmon-disable --status --status-json --status-timer 1 \"{hash_file}\" \"{wordlist_file}\""
+                        uid = self.__run_hashcat(hashcat_cmd, out_file, tracker, session)
                         if uid > 0:
                             break
                         
@@ -368,93 +1276,82 @@ class BiliUidCrack:
                         break
 
                 else:
-                    masks_and_charsets = BiliUidCrack.get_masks_and_charsets(is_standard_md5, uid_range)
-                    workload_profile = 4
-                    if platform.system() == 'Windows' and uid_range.end < uid_threshold:
-                        workload_profile = 1
-
-                    masks_and_charsets_str = ''
-                    for mask, charsets in masks_and_charsets.items():
-                        if len(charsets) > 0:
-                            masks_and_charsets_str += ','.join(charsets) + ','
-                        masks_and_charsets_str += mask + '\n'
-
-                    with open(maskfile, 'w', encoding='utf-8') as fp:
-                        fp.write(masks_and_charsets_str)
-
-                    hashcat_cmd = f"\"{self.__hashcat}\" -m 0 -a 3 {'' if is_standard_md5 else '--hex-charset'} --outfile-format 2 --outfile \"{out_file}\" {'--backend-ignore-cuda' if self.__backend_ignore_cuda else ''} --potfile-disable --logfile-disable -O -w {workload_profile} --hwmon-disable {md5} \"{maskfile}\""
-                    process = subprocess.run(shlex.split(hashcat_cmd), cwd=os.path.split(self.__hashcat)[0])
+                    masks_and_charsets, mask_counts = self.__get_mask_plan(session, is_standard_md5, uid_range)
+                    if len(masks_and_charsets) == 0:
+                        continue
 
-                    if process.returncode not in [0, 1]:
-                        raise FailedToRunHashcatException(f'错误码:{process.returncode}')
+                    with self.__tracer.span('write'):
+                        maskfile = session.get_file(('maskfile', is_standard_md5, uid_range, self.__get_occupancy_key()), 'hashcat_masks_',
+                                                    lambda: BiliUidCrack.__get_hashcat_maskfile_text(masks_and_charsets))
 
-                    uid = BiliUidCrack.__read_uid_from_hashcat_outfile(out_file)
+                    tracker.start_task(uid_range, 1, len(masks_and_charsets), sum(mask_counts))
+                    hashcat_cmd = f"\"{self.__hashcat}\" -m 0 -a 3 {'' if is_standard_md5 else '--hex-charset'} --outfile-format 2 --outfile \"{out_file}\" {'--backend-ignore-cuda' if self.__backend_ignore_cuda else ''} --potfile-disable --logfile-disable {self.__get_hashcat_tuning_options(uid_range, False)} --hwmon-disable --status --status-json --status-timer 1 {md5} \"{maskfile}\""
+                    uid = self.__run_hashcat(hashcat_cmd, out_file, tracker, session, mask_counts)
                     if uid > 0:
                         break
 
+            is_success = True
         finally:
-            for file in temp_files:
-                if os.path.exists(file):
-                    os.remove(file)
+            BiliUidCrack.__finish_tracker(tracker, total, session, is_success)
+            for file in [out_file, hash_file, wordlist_file]:
+                session.remove_file(file)
 
         return uid
 
-    def john_crack_md5(self, md5: str, uid_ranges: List[UidRange] = UID_RANGES_ALL) -> int:
+    def john_crack_md5(self, md5: str, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
         """使用John the Ripper破解MD5。
 
         Args:
             md5 (str): 16进制MD5值。
             uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，多次破解时复用其中的工作目录、
+                掩码及UID段，为None时使用仅用于本次破解的会话。
 
         Returns:
             int: 已破解的UID，若未破解则返回-1。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
         """
         if self.__john is None:
             raise JohnNotFoundException()
 
-        temp_files = []
-        prefixes = ['john_pot_', 'john_wordlist_', 'john_hash_']
-        for prefix in prefixes:
-            with NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', prefix=prefix, delete=False) as fp:
-                temp_files.append(fp.name)
-                if prefix == 'john_hash_':
-                    fp.write(md5)
-        pot_file, wordlist_file, hash_file = temp_files
+        if session is None:
+            with CrackSession() as session:
+                return self.john_crack_md5(md5, uid_ranges, session)
+
+        if not self.__is_claimed(['john']):
+            with self.__claim(['john'], session):
+                return self.john_crack_md5(md5, uid_ranges, session)
+
+        # john不使用hashcat的内核，但与预热的hashcat共用计算设备，因此也需等待预热结束
+        self.__crack_start_time = time.perf_counter()
+        self.__wait_prewarm(True)
+
+        pot_file = session.create_file('john_pot_')
+        wordlist_file = session.create_file('john_wordlist_')
+        hash_file = session.create_file('john_hash_', md5)
+
+        total = self.__count_backend_candidates('john', True, uid_ranges, session)
+        tracker = self.__create_tracker('john', total, session)
 
         uid = -1
+        is_success = False
         try:
             for uid_range in uid_ranges:
                 # 当遇到16位UID时利用16位UID的分布规律进行破解
-                if (uid_range.start >= UID16_START
-                        and len(str(uid_range.start)) == 16
-                        and len(str(uid_range.end)) == 16):
-                    # 指定UID范围内的第一个UID分布区间的起点
-                    first_interval_start = UID16_START + (uid_range.start - UID16_START) // UID16_STEP * UID16_STEP
-                    # 指定UID范围内的最后一个UID分布区间的起点
-                    last_interval_start = UID16_START + (uid_range.end - UID16_START) // UID16_STEP * UID16_STEP
-                    # 指定UID范围内存在的UID分布区间数量
-                    interval_count = (last_interval_start - first_interval_start) / UID16_STEP + 1
-                    # 将指定UID范围分成多段UID进行处理，此为UID段的数量
-                    segment_count = int(interval_count / UID16_MAX_INTERVAL_NUM) + (0 if interval_count % UID16_MAX_INTERVAL_NUM == 0 else 1)
-                    # 每个UID段的跨度
-                    segment_span = UID16_STEP * UID16_MAX_INTERVAL_NUM
-
-                    for i in range(segment_count):
-                        start = first_interval_start + i * segment_span
-                        end = start + segment_span if (last_interval_start - start) / UID16_STEP + 1 >= UID16_MAX_INTERVAL_NUM else last_interval_start + UID16_STEP
-
-                        uid16_list = [str(range_start+i) for i in range(UID16_INTERVAL_LEN) for range_start in range(start, end, UID16_STEP)]
-                        uid16_wordlist = '\n'.join(uid16_list)
-                        with open(wordlist_file, 'w', encoding='utf-8') as fp:
-                            fp.write(uid16_wordlist)
-
-                        john_cmd = f'"{self.__john}" --format=raw-md5 --wordlist="{wordlist_file}" --pot="{pot_file}" "{hash_file}"'
-                        process = subprocess.run(shlex.split(john_cmd), cwd=os.path.split(self.__john)[0])
-
-                        if process.returncode != 0:
-                            raise FailedToRunJohnException(f'错误码:{process.returncode}')
-
-                        uid = BiliUidCrack.__read_uid_from_john_pot_file(pot_file)
+                if BiliUidCrack.is_uid16_range(uid_range):
+                    model, segments, segment_counts = self.__get_uid16_plan(session, uid_range)
+                    for i, (start, end) in enumerate(segments):
+                        with self.__tracer.span('generate'):
+                            uid16_wordlist = BiliUidCrack.get_uid16_wordlist(start, end, True, self.__occupancy, model)
+                        with self.__tracer.span('write'):
+                            with open(wordlist_file, 'w', encoding='utf-8') as fp:
+                                fp.write(uid16_wordlist)
+
+                        tracker.start_task(uid_range, i + 1, len(segments), segment_counts[i])
+                        john_cmd = f'"{self.__john}" --format=raw-md5 --wordlist="{wordlist_file}" --pot="{pot_file}" --progress-every=1 "{hash_file}"'
+                        uid = self.__run_john(john_cmd, pot_file, tracker, session)
                         if uid > 0:
                             break
                         
@@ -462,34 +1359,378 @@ class BiliUidCrack:
                         break
 
                 else:
-                    masks_and_charsets = BiliUidCrack.get_masks_and_charsets(True, uid_range)
-                    for mask, charsets in masks_and_charsets.items():
+                    masks_and_charsets, mask_counts = self.__get_mask_plan(session, True, uid_range)
+                    for i, (mask, charsets) in enumerate(masks_and_charsets):
+                        tracker.start_task(uid_range, i + 1, len(masks_and_charsets), mask_counts[i])
                         charsets_str = ' '.join([f'-{i+1}=\"{charset}\"' for i, charset in enumerate(charsets)])
-                        john_cmd = f'"{self.__john}" --format=raw-md5 {charsets_str} --mask="{mask}" --pot="{pot_file}" "{hash_file}"'
-                        process = subprocess.run(shlex.split(john_cmd), cwd=os.path.split(self.__john)[0])
-
-                        if process.returncode != 0:
-                            raise FailedToRunJohnException(f'错误码:{process.returncode}')
-
-                        uid = BiliUidCrack.__read_uid_from_john_pot_file(pot_file)
+                        john_cmd = f'"{self.__john}" --format=raw-md5 {charsets_str} --mask="{mask}" --pot="{pot_file}" --progress-every=1 "{hash_file}"'
+                        uid = self.__run_john(john_cmd, pot_file, tracker, session)
                         if uid > 0:
                             break
 
                     if uid > 0:
                         break
 
+            is_success = True
         finally:
-            for file in temp_files:
-                if os.path.exists(file):
-                    os.remove(file)
+            BiliUidCrack.__finish_tracker(tracker, total, session, is_success)
+            for file in [pot_file, wordlist_file, hash_file]:
+                session.remove_file(file)
 
         return uid
 
-    def crack_from_md5(self, md5: str, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL) -> int:
+    def opencl_crack_md5(self, md5: str, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
+        """使用内置的MD5内核在OpenCL设备上破解MD5，需要在创建实例时启用OpenCL破解后端。
+
+        内核在进程中只编译一次，破解时不需要启动破解程序。16位UID范围按16位UID的分布规律
+        破解，其它UID范围按md5_kernel模块的分片破解，均支持占用索引，支持标准和非标准MD5。
+
+        Args:
+            md5 (str): 16进制MD5值。
+            is_standard_md5 (bool): 指定是否为标准的MD5值。
+            uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，多次破解时复用其中的UID子范围
+                及UID段，为None时使用仅用于本次破解的会话。
+
+        Returns:
+            int: 已破解的UID，若未破解则返回-1。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
+        """
+        if self.__opencl is None:
+            raise OpenClNotAvailableException()
+
+        if session is None:
+            with CrackSession() as session:
+                return self.opencl_crack_md5(md5, is_standard_md5, uid_ranges, session)
+
+        if not self.__is_claimed(['opencl']):
+            with self.__claim(['opencl'], session):
+                return self.opencl_crack_md5(md5, is_standard_md5, uid_ranges, session)
+
+        # OpenCL设备可能与预热的hashcat相同，因此也需等待预热结束
+        self.__crack_start_time = time.perf_counter()
+        self.__wait_prewarm(is_standard_md5)
+
+        total = self.__count_backend_candidates('opencl', is_standard_md5, uid_ranges, session)
+        tracker = self.__create_tracker('opencl', total, session)
+
+        uid = -1
+        is_success = False
+        try:
+            for uid_range in uid_ranges:
+                # 当遇到16位UID时利用16位UID的分布规律进行破解
+                if BiliUidCrack.is_uid16_range(uid_range):
+                    model, segments, segment_counts = self.__get_uid16_plan(session, uid_range)
+                    model = Uid16Model() if model is None else model
+                    for i, (start, end) in enumerate(segments):
+                        with self.__tracer.span('generate'):
+                            interval_starts = BiliUidCrack.get_uid16_interval_starts(start, end, self.__occupancy, model)
+
+                        tracker.start_task(uid_range, i + 1, len(segments), segment_counts[i])
+                        uid = self.__run_opencl(md5, is_standard_md5, iter_interval_batches(interval_starts, model.interval_len), tracker, session)
+                        if uid > 0:
+                            break
+
+                else:
+                    sub_ranges = self.__get_range_plan(session, uid_range)
+                    for i, sub_range in enumerate(sub_ranges):
+                        tracker.start_task(uid_range, i + 1, len(sub_ranges), sub_range.end - sub_range.start + 1)
+                        uid = self.__run_opencl(md5, is_standard_md5, iter_range_batches(sub_range), tracker, session)
+                        if uid > 0:
+                            break
+
+                if uid > 0:
+                    break
+
+            is_success = True
+        finally:
+            BiliUidCrack.__finish_tracker(tracker, total, session, is_success)
+
+        return uid
+
+    def __plan_backend(self, backend: str, is_standard_md5: bool, uid_ranges: List[UidRange]) -> CrackPlan:
+        """计算使用指定的破解后端破解UID范围的计划。
+        """
+        if backend == 'hashcat':
+            uid_ranges = BiliUidCrack.__split_uid_ranges_for_hashcat(uid_ranges)
+
+        calibrations = self.__throughput.get(backend, {}).get('standard' if is_standard_md5 else 'non-standard', {})
+        range_plans = []
+        for uid_range in uid_ranges:
+            is_uid16 = BiliUidCrack.is_uid16_range(uid_range)
+            if is_uid16:
+                model = self.__get_uid16_model(uid_range)
+                segments = BiliUidCrack.get_uid16_segments(uid_range, self.__tuning['uid16_max_interval_num'], self.__occupancy, model)
+                candidates = sum([BiliUidCrack.get_uid16_segment_candidate_count(start, end, self.__occupancy, model) for start, end in segments])
+                startups = len(segments)
+            else:
+                masks_and_charsets = BiliUidCrack.get_occupied_masks_and_charsets(is_standard_md5, uid_range, self.__occupancy)
+                candidates = sum(BiliUidCrack.get_mask_candidate_counts(is_standard_md5, masks_and_charsets))
+                # hashcat使用掩码文件一次破解所有掩码，john需要为每个掩码启动一次
+                startups = min(len(masks_and_charsets), 1) if backend == 'hashcat' else len(masks_and_charsets)
+
+            # OpenCL内核在进程中只编译一次，破解时不启动破解程序
+            if backend == 'opencl':
+                startups = 0
+
+            seconds = estimate_seconds(find_calibration(calibrations, uid_range, is_uid16), candidates, startups)
+            range_plans.append(RangePlan(uid_range, is_uid16, candidates, startups, seconds))
+
+        return CrackPlan(backend, is_standard_md5, range_plans)
+
+    def plan_crack(self, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL) -> List[CrackPlan]:
+        """计算破解计划而不进行破解。
+
+        对每个可用且支持该MD5类型的破解后端，计算每个UID范围需要测试的候选UID数量及
+        破解程序的启动次数，若已运行calibrate()校准，还会预计每个UID范围的耗时。
+
+        Args:
+            is_standard_md5 (bool): 指定是否为标准的MD5值。
+            uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+
+        Returns:
+            List[CrackPlan]: 每个破解后端的破解计划，按破解后端的优先顺序排列。
+        """
+        plans = []
+        if self.__hashcat:
+            plans.append(self.__plan_backend('hashcat', is_standard_md5, uid_ranges))
+        if self.__opencl:
+            plans.append(self.__plan_backend('opencl', is_standard_md5, uid_ranges))
+        if self.__john and is_standard_md5:
+            plans.append(self.__plan_backend('john', is_standard_md5, uid_ranges))
+        return plans
+
+    def get_throughput_profile(self) -> Dict:
+        """返回本机的校准结果。
+
+        Returns:
+            Dict: 校准结果，结构为{破解后端: {MD5类型: {UID号段: 校准结果}}}，MD5类型为
+                standard或non-standard，UID号段为"起始UID-结尾UID"，校准结果包含
+                startup_seconds（每次启动破解程序的耗时）、hashes_per_second（破解速度）
+                和is_uid16（是否为16位UID号段）。
+        """
+        return self.__throughput
+
+    def __time_crack(self, backend: str, is_standard_md5: bool, uid_range: UidRange) -> Tuple[float, int]:
+        """破解不在UID范围内的UID的MD5，返回遍历整个UID范围的耗时及候选UID数量。
+
+        测量时不使用占用索引和号段表，以免去除的UID块或改变的分布规律影响测得的破解速度。
+        """
+        md5 = uid_to_md5(_CALIBRATION_UID, is_standard_md5)
+        occupancy, range_table = self.__occupancy, self.__range_table
+        self.__occupancy, self.__range_table = None, None
+        try:
+            start = time.perf_counter()
+            if backend == 'hashcat':
+                self.hashcat_crack_md5(md5, is_standard_md5, [uid_range])
+            elif backend == 'opencl':
+                self.opencl_crack_md5(md5, is_standard_md5, [uid_range])
+            else:
+                self.john_crack_md5(md5, [uid_range])
+            seconds = time.perf_counter() - start
+        finally:
+            self.__occupancy, self.__range_table = occupancy, range_table
+        return seconds, BiliUidCrack.count_candidates(is_standard_md5, [uid_range])
+
+    def __calibrate_era(self, backend: str, is_standard_md5: bool, era: UidRange, rng: random.Random, max_seconds: float) -> Dict:
+        """在UID号段中随机选取子范围进行破解，测量破解程序的启动耗时及破解速度。
+        """
+        is_uid16 = BiliUidCrack.is_uid16_range(era)
+
+        if is_uid16:
+            # 16位UID以UID分布区间为单位选取子范围，最多使用一个UID段，以免多次启动破解程序
+            first_interval_start = UID16_START + (era.start - UID16_START) // UID16_STEP * UID16_STEP
+            interval_count = (era.end - first_interval_start) // UID16_STEP + 1
+
+            def get_sub_range(size):
+                size = min(size, interval_count, self.__tuning['uid16_max_interval_num'])
+                start = first_interval_start + rng.randrange(interval_count - size + 1) * UID16_STEP
+                return UidRange(start, start + (size - 1) * UID16_STEP + UID16_INTERVAL_LEN - 1), size
+
+            limit = min(interval_count, self.__tuning['uid16_max_interval_num'])
+            size = min(100, limit)
+        else:
+            era_size = era.end - era.start + 1
+
+            def get_sub_range(size):
+                size = min(size, era_size)
+                start = era.start + rng.randrange(era_size - size + 1)
+                return UidRange(start, start + size - 1), size
+
+            limit = era_size
+            size = min(10 ** 6, limit)
+
+        # 只包含极少候选UID的破解的耗时近似为破解程序的启动耗时
+        startup_seconds, startup_candidates = self.__time_crack(backend, is_standard_md5, get_sub_range(1 if is_uid16 else 10)[0])
+
+        # 逐步增大子范围，直至单次破解的耗时达到max_seconds的一半或子范围达到上限
+        while True:
+            sub_range, size = get_sub_range(size)
+            seconds, candidates = self.__time_crack(backend, is_standard_md5, sub_range)
+            work_seconds = seconds - startup_seconds
+            if work_seconds > 0:
+                hashes_per_second = (candidates - startup_candidates) / work_seconds
+            else:
+                hashes_per_second = 0
+
+            if seconds >= max_seconds / 2 or size >= limit:
+                break
+
+            next_size = size * 2
+            if hashes_per_second > 0:
+                next_size = max(next_size, int(size * (max_seconds / 2 - startup_seconds) / work_seconds))
+            size = min(next_size, size * 100, limit)
+
+        return {
+            'startup_seconds': startup_seconds,
+            'hashes_per_second': hashes_per_second if hashes_per_second > 0 else candidates / seconds,
+            'is_uid16': is_uid16,
+        }
+
+    def calibrate(self, eras: List[UidRange] = UID_RANGES_ALL, max_seconds: float = 10.0, seed: Optional[int] = None) -> Dict:
+        """校准本机的破解速度，用于预计破解耗时。
+
+        对每个可用的破解后端、每种支持的MD5类型及每个UID号段，在号段中随机选取子范围
+        进行短时的破解，测量破解程序的启动耗时及破解速度。校准结果保存在本机配置中，
+        之后创建的BiliUidCrack实例会自动读取。
+
+        Args:
+            eras (List[UidRange], optional): 需要校准的UID号段，默认为所有UID号段。
+            max_seconds (float, optional): 每个UID号段单次破解的最长耗时的参考值，越大越准确。
+            seed (Optional[int], optional): 选取子范围的随机数种子。
+
+        Returns:
+            Dict: 校准结果，结构见get_throughput_profile()。
+        """
+        rng = random.Random(seed)
+        backends = []
+        if self.__hashcat:
+            backends.append(('hashcat', [True, False]))
+        if self.__opencl:
+            backends.append(('opencl', [True, False]))
+        if self.__john:
+            backends.append(('john', [True]))
+
+        # 只保存本次校准的结果，与其它进程同时保存的校准结果合并
+        calibrated = {}
+        for backend, md5_types in backends:
+            for is_standard_md5 in md5_types:
+                calibrations = calibrated.setdefault(backend, {}).setdefault('standard' if is_standard_md5 else 'non-standard', {})
+                for era in eras:
+                    calibrations[get_era_key(era)] = self.__calibrate_era(backend, is_standard_md5, era, rng, max_seconds)
+
+        throughput = update_host_profile('throughput', calibrated).get('throughput', {})
+        self.__throughput = throughput
+        return throughput
+
+    def autotune(self, max_seconds: float = 10.0, seed: Optional[int] = None) -> Dict:
+        """根据本机的情况自动选取hashcat的破解参数。
+
+        先以默认参数测量hashcat的启动耗时及掩码破解速度，再在同一个UID子范围上依次比较
+        各个负载模式（-w）、是否使用优化内核（-O）及若干组内核参数（-n和-u）的耗时，
+        选取耗时最短的参数。最后测量16位UID字典的启动耗时及破解速度，结合本机的可用内存
+        选取UID段的大小，使启动耗时占每个UID段破解耗时的比例不超过_AUTOTUNE_MAX_STARTUP_RATIO，
+        且生成字典占用的内存不超过可用内存的_AUTOTUNE_MAX_MEMORY_RATIO。
+
+        调优结果保存在本机配置中，之后创建的BiliUidCrack实例会自动读取。调优会改变破解
+        速度，调优后应重新运行calibrate()。
+
+        Args:
+            max_seconds (float, optional): 单次破解的最长耗时的参考值，越大越准确。
+            seed (Optional[int], optional): 选取UID子范围的随机数种子。
+
+        Returns:
+            Dict: 调优结果，包括get_default_tuning()中的破解参数，以及测量得到的启动耗时、
+                破解速度、可用内存和每组参数的耗时。
+        """
+        if self.__hashcat is None:
+            raise HashcatNotFoundException()
+
+        rng = random.Random(seed)
+        previous_tuning = self.__tuning
+        self.__tuning = BiliUidCrack.get_default_tuning()
+        try:
+            # 以默认参数测量掩码破解速度，据此选取单次破解耗时约为max_seconds一半的UID子范围
+            calibration = self.__calibrate_era('hashcat', True, _AUTOTUNE_MASK_ERA, rng, max_seconds)
+            era_size = _AUTOTUNE_MASK_ERA.end - _AUTOTUNE_MASK_ERA.start + 1
+            size = min(max(int(calibration['hashes_per_second'] * max_seconds / 2), 10 ** 6), era_size)
+            start = _AUTOTUNE_MASK_ERA.start + rng.randrange(era_size - size + 1)
+            sub_range = UidRange(start, start + size - 1)
+
+            trials = []
+
+            def try_tuning(**params) -> float:
+                self.__tuning.update(params)
+                seconds, candidates = self.__time_crack('hashcat', True, sub_range)
+                trial = {key: self.__tuning[key] for key in ['workload_profile', 'optimized_kernel', 'kernel_accel', 'kernel_loops']}
+                trial['seconds'] = seconds
+                trial['hashes_per_second'] = candidates / seconds
+                trials.append(trial)
+                return seconds
+
+            # 依次选取负载模式、是否使用优化内核及内核参数，每一步都保留之前选取的参数
+            best_seconds = None
+            best_workload_profile = None
+            for workload_profile in _AUTOTUNE_WORKLOAD_PROFILES:
+                seconds = try_tuning(workload_profile=workload_profile)
+                if best_seconds is None or seconds < best_seconds:
+                    best_seconds = seconds
+                    best_workload_profile = workload_profile
+            self.__tuning['workload_profile'] = best_workload_profile
+
+            seconds = try_tuning(optimized_kernel=False)
+            if seconds < best_seconds:
+                best_seconds = seconds
+            else:
+                self.__tuning['optimized_kernel'] = True
+
+            best_kernel_params = _AUTOTUNE_KERNEL_PARAMS[0]
+            for kernel_accel, kernel_loops in _AUTOTUNE_KERNEL_PARAMS[1:]:
+                seconds = try_tuning(kernel_accel=kernel_accel, kernel_loops=kernel_loops)
+                if seconds < best_seconds:
+                    best_seconds = seconds
+                    best_kernel_params = (kernel_accel, kernel_loops)
+            self.__tuning['kernel_accel'], self.__tuning['kernel_loops'] = best_kernel_params
+
+            # 以选取的参数测量16位UID字典的启动耗时及破解速度，破解速度包括生成和写入字典的耗时
+            uid16_calibration = self.__calibrate_era('hashcat', True, _AUTOTUNE_UID16_ERA, rng, max_seconds)
+            intervals_per_second = uid16_calibration['hashes_per_second'] / UID16_INTERVAL_LEN
+            startup_ratio = (1 - _AUTOTUNE_MAX_STARTUP_RATIO) / _AUTOTUNE_MAX_STARTUP_RATIO
+            interval_num = max(int(uid16_calibration['startup_seconds'] * startup_ratio * intervals_per_second) + 1,
+                               _AUTOTUNE_MIN_INTERVAL_NUM)
+
+            available_memory = get_available_memory()
+            if available_memory is None:
+                max_interval_num = UID16_MAX_INTERVAL_NUM
+            else:
+                max_interval_num = int(available_memory * _AUTOTUNE_MAX_MEMORY_RATIO) // _UID16_WORDLIST_BYTES_PER_INTERVAL
+            self.__tuning['uid16_max_interval_num'] = max(min(interval_num, max_interval_num), 1)
+
+        except:
+            self.__tuning = previous_tuning
+            raise
+
+        result = self.get_tuning()
+        result.update({
+            'hashcat': self.__hashcat,
+            'hashcat_version': str(self.get_hashcat_version()),
+            'startup_seconds': calibration['startup_seconds'],
+            'hashes_per_second': BiliUidCrack.count_candidates(True, [sub_range]) / best_seconds,
+            'uid16_startup_seconds': uid16_calibration['startup_seconds'],
+            'uid16_hashes_per_second': uid16_calibration['hashes_per_second'],
+            'available_memory': available_memory,
+            'trials': trials,
+        })
+        update_host_profile('tuning', result, merge=False)
+        return result
+
+    def crack_from_md5(self, md5: str, is_standard_md5: bool, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
         """根据MD5破解UID。
 
-        若hashcat不可用则尝试john进行破解，反之，若john不可用时则尝试hashcat，当两者
-        均不可用时抛出异常NoAvailableCrackerException。
+        依次尝试hashcat、OpenCL破解后端（需在创建实例时启用）和john进行破解，前一个
+        破解后端不可用或运行失败时使用下一个，均不可用时抛出异常NoAvailableCrackerException。
 
         因为john不支持破解非标准MD5，所以如果使用john并且is_standard_md5为False时，
         抛出异常JohnCrackNonStandardMd5Exception。
@@ -498,40 +1739,65 @@ class BiliUidCrack:
             md5 (str): 16进制MD5值。
             is_standard_md5 (bool): 指定是否为标准的MD5值。
             uid_ranges (List[UidRange], optional): 指定破解的UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，为None时每次破解使用各自的会话。
 
         Returns:
             int: 已破解的UID，若未破解则返回-1。
+
+        Raises:
+            CrackCancelledException: 破解会话已被取消。
         """
+        # 在整个破解过程中占用所有可能用到的资源，避免在UID范围或破解后端之间释放资源后被其它任务占用
+        backends = [name for name, available in [('hashcat', self.__hashcat), ('opencl', self.__opencl), ('john', self.__john and is_standard_md5)] if available]
+        if not self.__is_claimed(backends):
+            with self.__claim(backends, session):
+                return self.crack_from_md5(md5, is_standard_md5, uid_ranges, session)
+
         uid = -1
         is_hashcat_success = False
+        is_opencl_success = False
         is_john_success = False
         if self.__hashcat:
             try:
-                uid = self.hashcat_crack_md5(md5, is_standard_md5, uid_ranges)
+                uid = self.hashcat_crack_md5(md5, is_standard_md5, uid_ranges, session)
                 is_hashcat_success = True
+            except CrackCancelledException:
+                raise
+            except:
+                pass
+
+        if self.__opencl and not is_hashcat_success:
+            try:
+                uid = self.opencl_crack_md5(md5, is_standard_md5, uid_ranges, session)
+                is_opencl_success = True
+            except CrackCancelledException:
+                raise
             except:
                 pass
 
-        if self.__john and not is_hashcat_success:
+        if self.__john and not is_hashcat_success and not is_opencl_success:
             if not is_standard_md5:
                 raise JohnCrackNonStandardMd5Exception()
             try:
-                uid = self.john_crack_md5(md5, uid_ranges)
+                uid = self.john_crack_md5(md5, uid_ranges, session)
                 is_john_success = True
+            except CrackCancelledException:
+                raise
             except:
                 pass
 
-        if not is_hashcat_success and not is_john_success:
+        if not is_hashcat_success and not is_opencl_success and not is_john_success:
             raise NoAvailableCrackerException()
 
         return uid
 
-    def crack_from_url(self, url: str, uid_ranges: List[UidRange] = UID_RANGES_ALL) -> int:
+    def crack_from_url(self, url: str, uid_ranges: List[UidRange] = UID_RANGES_ALL, session: Optional[CrackSession] = None) -> int:
         """根据B站网页端视频链接或视频分享链接破解UID。
 
         Args:
             url (str): 在用户已登录B站网页端的情况下得到的视频链接或视频分享链接。
             uid_ranges (List[UidRange], optional): 指定UID范围，默认为所有可能的UID。
+            session (Optional[CrackSession], optional): 破解会话，为None时每次破解使用各自的会话。
 
         Returns:
             int: 已破解的UID，若未破解则返回-1。
@@ -541,4 +1807,4 @@ class BiliUidCrack:
 
         md5 = get_vd_source_from_url(url)
         is_standard_md5 = check_is_url_shared_from_web(url)
-        return self.crack_from_md5(md5, is_standard_md5, uid_ranges)
+        return self.crack_from_md5(md5, is_standard_md5, uid_ranges, session)
@@ -28,5 +28,38 @@ class JohnCrackNonStandardMd5Exception(Exception):
 class NoAvailableCrackerException(Exception):
     """没有可用的破解程序。
     """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class InvalidOccupancyIndexException(Exception):
+    """占用索引文件的格式无效。
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class InvalidRangeTableException(Exception):
+    """UID号段表的格式或内容无效。
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class OpenClNotAvailableException(Exception):
+    """没有可用的PyOpenCL或OpenCL设备。
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class FailedToRunOpenClException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class CrackCancelledException(Exception):
+    """破解会话已被取消。
+    """
     def __init__(self, *args):
         super().__init__(*args)
\ No newline at end of file
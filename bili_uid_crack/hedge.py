@@ -0,0 +1,93 @@
+import time
+import threading
+from typing import Callable, Optional, Tuple
+
+from .exceptions import CrackCancelledException
+from .session import CrackSession
+from .tracing import Tracer
+
+
+def run_hedged(query: Callable[[], int],
+               crack: Callable[[CrackSession], int],
+               session: CrackSession,
+               tracer: Optional[Tracer] = None,
+               on_query: Optional[Callable[[int, Optional[Exception]], None]] = None,
+               timeout: Optional[float] = None) -> Tuple[int, Optional[str]]:
+    """同时查询和本地破解，使用先得到的UID。
+
+    查询在后台守护线程中运行，本地破解在当前线程中运行。查询先得到UID时取消破解会话，
+    正在运行的破解程序会被结束；本地破解先得到UID时立即返回，不等待查询线程结束，之后
+    结束的查询不再调用on_query。查询没有结果或查询出错时本地破解继续进行，本地破解结束时
+    若仍未得到UID，则最多等待timeout秒查询的结果。
+
+    Args:
+        query (Callable[[], int]): 查询UID的函数，例如调用query_uid_with_md5()，无结果时返回-1。
+        crack (Callable[[CrackSession], int]): 使用传入的会话进行本地破解的函数，未破解时返回-1。
+        session (CrackSession): 本地破解使用的会话，查询先得到UID时会被取消。
+        tracer (Optional[Tracer], optional): 追踪器，查询的耗时记为query阶段。
+        on_query (Optional[Callable[[int, Optional[Exception]], None]], optional): 查询结束时
+            在后台线程中调用的函数，传入查询得到的UID及查询出错时的异常。
+        timeout (Optional[float], optional): 本地破解结束后等待查询结果的最长时间（秒），为None时
+            一直等待，超时后视为查询没有结果。
+
+    Returns:
+        Tuple[int, Optional[str]]: UID及其来源，来源为query或crack，均未得到UID时返回(-1, None)。
+    """
+    done = threading.Event()
+    lock = threading.Lock()
+    result = {'uid': -1, 'finished': False}
+
+    def run_query():
+        start = time.perf_counter()
+        uid = -1
+        error = None
+        try:
+            uid = query()
+        except Exception as e:
+            error = e
+        if tracer is not None:
+            tracer.record('query', start, time.perf_counter() - start, uid=uid, error=None if error is None else str(error))
+
+        try:
+            # 已返回结果后结束的查询不再影响会话，也不再报告
+            with lock:
+                if result['finished']:
+                    return
+                result['uid'] = uid
+                if uid > 0:
+                    session.cancel()
+            if on_query is not None:
+                on_query(uid, error)
+        finally:
+            done.set()
+
+    def finish(wait: bool) -> int:
+        if wait:
+            done.wait(timeout)
+        with lock:
+            result['finished'] = True
+            return result['uid']
+
+    # 查询线程为守护线程，本地破解先得到UID时不必等待网络请求结束
+    thread = threading.Thread(target=run_query, name='hedged-query', daemon=True)
+    thread.start()
+
+    try:
+        uid = crack(session)
+    except CrackCancelledException:
+        return finish(True), 'query'
+    except Exception:
+        # 本地破解失败时仍可使用查询的结果
+        query_uid = finish(True)
+        if query_uid > 0:
+            return query_uid, 'query'
+        raise
+
+    if uid > 0:
+        finish(False)
+        return uid, 'crack'
+
+    query_uid = finish(True)
+    if query_uid > 0:
+        return query_uid, 'query'
+    return -1, None
@@ -0,0 +1,345 @@
+"""
+专用于UID的MD5破解内核的参考实现。
+
+UID的消息只有一个分组（16位UID的标准MD5也只有16字节），将位数相同、只有最后
+1至4位数字不同的UID划分为一个分片，分片内只有最后一个消息字（记为w[j]）不同：
+
+    1. 前缀预计算：MD5第1轮的前j步只使用w[0]至w[j-1]，对整个分片是常量，只需计算一次。
+    2. 目标摘要逆推：w[j]在第4轮中只使用一次（第L步），第L步之后的步骤只使用常量消息字，
+       因此可以从目标摘要减去初始值后逐步逆推至第L步之前的状态。第L步的加法中再减去w[j]
+       后可以得到第L-4步的结果，即每个候选UID只需计算至第L-4步并比较一个32位字，绝大部分
+       候选UID在此被排除，匹配时再计算剩余的步骤确认。
+
+此模块为纯Python的参考实现，定义分片、内核参数及逆推的计算方法，并用于验证原生内核的
+正确性，其速度远低于hashlib，不用于实际破解。实际破解时上述内核由OpenCL破解后端
+（opencl_backend模块）在计算设备上运行，只有CPU的主机可以使用PoCL运行该内核。
+"""
+
+import math
+import struct
+from typing import Dict, Iterator, List, Tuple
+
+from .uid_range import UidRange
+
+
+# 32位消息字及状态字的掩码
+WORD_MASK = 0xffffffff
+
+# MD5的初始状态
+MD5_IV = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476)
+
+# 每一步的常量及循环左移的位数，原生内核使用相同的常量
+MD5_K = [int(abs(math.sin(i + 1)) * 2 ** 32) & WORD_MASK for i in range(64)]
+MD5_S = [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4
+
+
+def _get_word_index(step: int) -> int:
+    """返回第step步（从0开始）使用的消息字的序号。
+    """
+    if step < 16:
+        return step
+    if step < 32:
+        return (1 + 5 * step) % 16
+    if step < 48:
+        return (5 + 3 * step) % 16
+    return (7 * step) % 16
+
+
+# 每一步使用的消息字的序号
+MD5_G = [_get_word_index(i) for i in range(64)]
+
+
+def _f(step: int, b: int, c: int, d: int) -> int:
+    if step < 16:
+        return (b & c) | (~b & d)
+    if step < 32:
+        return (d & b) | (~d & c)
+    if step < 48:
+        return b ^ c ^ d
+    return c ^ (b | (~d & WORD_MASK))
+
+
+def _rotl(x: int, s: int) -> int:
+    x &= WORD_MASK
+    return ((x << s) | (x >> (32 - s))) & WORD_MASK
+
+
+def _rotr(x: int, s: int) -> int:
+    x &= WORD_MASK
+    return ((x >> s) | (x << (32 - s))) & WORD_MASK
+
+
+def _step(step: int, state: Tuple[int, int, int, int], words: List[int]) -> Tuple[int, int, int, int]:
+    """计算MD5的一步，状态为(a, b, c, d)，返回下一步的状态。
+    """
+    a, b, c, d = state
+    b_new = (b + _rotl(a + _f(step, b, c, d) + MD5_K[step] + words[MD5_G[step]], MD5_S[step])) & WORD_MASK
+    return d, b_new, b, c
+
+
+def _step_reverse(step: int, state: Tuple[int, int, int, int], words: List[int]) -> Tuple[int, int, int, int]:
+    """由第step步之后的状态逆推第step步之前的状态，要求第step步使用的消息字已知。
+    """
+    a, b_new, b, c = state
+    d = a
+    a = (_rotr(b_new - b, MD5_S[step]) - _f(step, b, c, d) - MD5_K[step] - words[MD5_G[step]]) & WORD_MASK
+    return a, b, c, d
+
+
+def encode_uid(uid: int, is_standard_md5: bool) -> bytes:
+    """将UID转为计算MD5的消息，与uid_to_md5()一致。
+
+    Args:
+        uid (int): 用户ID。
+        is_standard_md5 (bool): 是否为标准MD5，标准MD5的消息为UID的ASCII字符，否则为UID的每一位数字。
+
+    Returns:
+        bytes: 消息。
+    """
+    if is_standard_md5:
+        return str(uid).encode('ascii')
+    return bytes([int(x) for x in str(uid)])
+
+
+def build_block(message: bytes) -> List[int]:
+    """将不超过55字节的消息填充为MD5的一个分组。
+
+    Args:
+        message (bytes): 消息。
+
+    Returns:
+        List[int]: 分组的16个小端序32位消息字。
+    """
+    if len(message) > 55:
+        raise ValueError('消息长度超过一个分组')
+    block = message + b'\x80' + b'\x00' * (55 - len(message)) + struct.pack('<Q', len(message) * 8)
+    return list(struct.unpack('<16I', block))
+
+
+def md5_block(words: List[int]) -> str:
+    """计算只有一个分组的消息的16进制MD5值，即完整的64步，用于与内核比较。
+
+    Args:
+        words (List[int]): build_block()返回的消息字。
+
+    Returns:
+        str: 16进制MD5值。
+    """
+    state = MD5_IV
+    for step in range(64):
+        state = _step(step, state, words)
+    a, b, c, d = state
+    digest = [(x + y) & WORD_MASK for x, y in zip((a, b, c, d), MD5_IV)]
+    return struct.pack('<4I', *digest).hex()
+
+
+def get_target_state(md5: str) -> Tuple[int, int, int, int]:
+    """返回目标摘要减去初始状态后的值，即MD5第64步之后的状态，逆推从此开始。
+
+    Args:
+        md5 (str): 16进制MD5值。
+
+    Returns:
+        Tuple[int, int, int, int]: 状态(a, b, c, d)。
+    """
+    digest = struct.unpack('<4I', bytes.fromhex(md5))
+    return tuple([(x - y) & WORD_MASK for x, y in zip(digest, MD5_IV)])
+
+
+def get_shard_span(digits: int) -> int:
+    """返回位数为digits的UID的分片大小，即分片内不同的最后一个消息字中的数字的组合数。
+
+    Args:
+        digits (int): UID的位数，1至16。
+
+    Returns:
+        int: 分片包含的UID数量。
+    """
+    return 10 ** (digits - (digits - 1) // 4 * 4)
+
+
+def get_last_use_step(word_index: int) -> int:
+    """返回第4轮中使用第word_index个消息字的步骤，该步骤之后的步骤均不使用此消息字。
+
+    Args:
+        word_index (int): 消息字的序号，0至15。
+
+    Returns:
+        int: 步骤的序号，48至63。
+    """
+    return [x for x in range(48, 64) if MD5_G[x] == word_index][0]
+
+
+def iter_shards(uid_range: UidRange) -> Iterator[UidRange]:
+    """将UID范围划分为分片，每个分片内的UID位数相同且只有最后一个消息字不同。
+
+    Args:
+        uid_range (UidRange): UID范围，UID为1至16位的正整数。
+
+    Returns:
+        Iterator[UidRange]: 按顺序排列的分片，首尾的分片可能不完整。
+    """
+    start = max(uid_range.start, 1)
+    while start <= uid_range.end:
+        digits = len(str(start))
+        span = get_shard_span(digits)
+        end = min(start // span * span + span - 1, uid_range.end, 10 ** digits - 1)
+        yield UidRange(start, end)
+        start = end + 1
+
+
+class Md5ShardKernel:
+    """破解一个UID分片的MD5的内核。
+
+    分片内的UID位数相同（记为n），前n-v位数字相同，v=n-(n-1)//4*4为最后一个消息字w[j]
+    （j=(n-1)//4）中的数字个数。内核预计算前j步，并将目标摘要逆推至第reject_step步，
+    每个候选UID只需计算第j步至第reject_step步，比较一个32位字即可排除。
+    """
+
+    def __init__(self, md5: str, is_standard_md5: bool, shard: UidRange):
+        """
+        Args:
+            md5 (str): 16进制MD5值。
+            is_standard_md5 (bool): 是否为标准MD5。
+            shard (UidRange): iter_shards()返回的分片。
+        """
+        digits = len(str(shard.start))
+        span = get_shard_span(digits)
+        if len(str(shard.end)) != digits or shard.start // span != shard.end // span:
+            raise ValueError(f'UID范围不是一个分片: {shard!r}')
+
+        self.__md5 = md5.lower()
+        self.__is_standard_md5 = is_standard_md5
+        self.__shard = shard
+        self.__word_index = (digits - 1) // 4
+        self.__words = build_block(encode_uid(shard.start, is_standard_md5))
+
+        # w[j]中分片内不同的数字个数，及清除这些数字后的w[j]
+        self.__span = span
+        self.__varying_digits = digits - self.__word_index * 4
+        self.__word_base = self.__words[self.__word_index] & ~((1 << 8 * self.__varying_digits) - 1) & WORD_MASK
+
+        # w[j]在第4轮中被使用的步骤，之后的步骤均可逆推
+        self.__last_use = get_last_use_step(self.__word_index)
+
+        # 前缀预计算：前j步只使用常量消息字
+        state = MD5_IV
+        for step in range(self.__word_index):
+            state = _step(step, state, self.__words)
+        self.__prefix_state = state
+
+        # 目标摘要逆推至第last_use步之后的状态
+        state = get_target_state(self.__md5)
+        for step in range(63, self.__last_use, -1):
+            state = _step_reverse(step, state, self.__words)
+        self.__target_state = state
+
+        # 第last_use步：rotr(b_new - b, s) - F(b, c, d) - K = a + w[j]，其中a为第last_use-4步的结果
+        a, b_new, b, c = state
+        d = a
+        self.__target_sum = (_rotr(b_new - b, MD5_S[self.__last_use]) - _f(self.__last_use, b, c, d) - MD5_K[self.__last_use]) & WORD_MASK
+
+    @property
+    def word_index(self) -> int:
+        """分片内不同的消息字的序号j。
+        """
+        return self.__word_index
+
+    @property
+    def reject_step(self) -> int:
+        """比较32位字以排除候选UID的步骤，即最后一次使用w[j]的步骤减4。
+        """
+        return self.__last_use - 4
+
+    def get_word(self, uid: int) -> int:
+        """返回UID的第j个消息字。
+
+        Args:
+            uid (int): 分片内的UID。
+
+        Returns:
+            int: 小端序的32位消息字。
+        """
+        low = uid % self.__span
+        word = self.__word_base
+        for i in range(self.__varying_digits - 1, -1, -1):
+            low, digit = divmod(low, 10)
+            word |= (digit + 0x30 if self.__is_standard_md5 else digit) << 8 * i
+        return word
+
+    def test(self, uid: int) -> bool:
+        """判断UID的MD5是否为目标MD5。
+
+        Args:
+            uid (int): 分片内的UID。
+
+        Returns:
+            bool: 匹配时返回True。
+        """
+        word = self.get_word(uid)
+        words = list(self.__words)
+        words[self.__word_index] = word
+
+        state = self.__prefix_state
+        for step in range(self.__word_index, self.reject_step + 1):
+            state = _step(step, state, words)
+        # 早期排除：只比较第reject_step步的结果
+        if state[1] != (self.__target_sum - word) & WORD_MASK:
+            return False
+
+        for step in range(self.reject_step + 1, self.__last_use + 1):
+            state = _step(step, state, words)
+        return state == self.__target_state
+
+    def crack(self) -> int:
+        """遍历分片中的所有UID。
+
+        Returns:
+            int: MD5对应的UID，若不在分片中则返回-1。
+        """
+        for uid in range(self.__shard.start, self.__shard.end + 1):
+            if self.test(uid):
+                return uid
+        return -1
+
+    def get_parameters(self) -> Dict:
+        """返回原生破解后端所需的内核参数。
+
+        Returns:
+            Dict: 包含words（分片第一个UID的16个消息字）、word_index、word_base（清除分片内
+                不同的数字后的w[j]）、varying_digits（w[j]中分片内不同的数字个数）、prefix_state
+                （前word_index步之后的状态）、reject_step、last_use（最后一次使用w[j]的步骤）、
+                target_sum（第reject_step步的结果加w[j]应等于的值）及target_state（第last_use步之后的状态）。
+        """
+        return {
+            'words': list(self.__words),
+            'word_index': self.__word_index,
+            'word_base': self.__word_base,
+            'varying_digits': self.__varying_digits,
+            'prefix_state': list(self.__prefix_state),
+            'reject_step': self.reject_step,
+            'last_use': self.__last_use,
+            'target_sum': self.__target_sum,
+            'target_state': list(self.__target_state),
+        }
+
+    def __repr__(self):
+        return f'Md5ShardKernel({self.__md5!r}, is_standard_md5={self.__is_standard_md5}, shard={self.__shard!r})'
+
+
+def crack_md5(md5: str, is_standard_md5: bool, uid_range: UidRange) -> int:
+    """使用参考内核遍历UID范围破解MD5。
+
+    Args:
+        md5 (str): 16进制MD5值。
+        is_standard_md5 (bool): 是否为标准MD5。
+        uid_range (UidRange): UID范围。
+
+    Returns:
+        int: MD5对应的UID，若无则返回-1。
+    """
+    for shard in iter_shards(uid_range):
+        uid = Md5ShardKernel(md5, is_standard_md5, shard).crack()
+        if uid > 0:
+            return uid
+    return -1
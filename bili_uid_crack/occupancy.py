@@ -0,0 +1,415 @@
+import os
+import re
+import mmap
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .constants import *
+from .exceptions import InvalidOccupancyIndexException
+from .uid_range import UidRange
+
+
+# 索引文件的格式：
+#     文件头: 魔数b'BUOI'、格式版本(uint32)、分区数量(uint32)
+#     分区表: 每个分区为起始UID(uint64)、块大小(uint64)、块数量(uint64)、位图在文件中的偏移(uint64)
+#     位图: 每个块占1位，第i块对应第i//8字节的第i%8位（低位在前），为1表示块中有已注册的账号
+# 所有整数均为小端序。
+_MAGIC = b'BUOI'
+_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_SECTION = struct.Struct('<QQQQ')
+
+# 统计和查找时每次读取的位数
+_CHUNK_BITS = 1 << 15
+
+# 每个字节中为1的位数
+_POPCOUNT = bytes([bin(x).count('1') for x in range(256)])
+
+# 匹配非零字节，用于跳过位图中的空白部分
+_NONZERO_BYTE = re.compile(b'[^\\x00]')
+
+# 16位UID分区的结尾最多超出UID_RANGES_16_DIGITS的UID数量，约4800万个块（位图约6MB），
+# 超出的UID视为无效UID，避免样本中的个别错误数据使位图过大
+_UID16_MAX_OVERSHOOT = 10 ** 14
+
+
+class OccupancySection:
+    """占用索引的一个分区，将从start开始的连续UID划分为block_count个大小为block_size的块。
+
+    Attributes:
+        start (int): 第一个块的起始UID。
+        block_size (int): 每个块包含的UID数量。
+        block_count (int): 块的数量。
+        offset (int): 分区的位图在索引文件中的偏移。
+    """
+
+    def __init__(self, start: int, block_size: int, block_count: int, offset: int = 0):
+        self.start = start
+        self.block_size = block_size
+        self.block_count = block_count
+        self.offset = offset
+
+    @property
+    def end(self) -> int:
+        """分区的最后一个UID。
+        """
+        return self.start + self.block_size * self.block_count - 1
+
+    def __repr__(self):
+        return f'OccupancySection(start={self.start}, block_size={self.block_size}, block_count={self.block_count})'
+
+
+class OccupancyIndex:
+    """UID块的占用索引，记录每个UID块中是否有已注册的账号，用于在破解前去除没有账号的UID。
+
+    索引文件通过内存映射读取，无须将整个文件读入内存。不在任何分区内的UID视为有账号。
+
+    对于16位UID，分区的块大小为UID16_STEP且与UID16_START对齐，每个块对应一个UID分布区间；
+    对于其它UID，分区的块大小为10的幂且与其对齐，使得去除空块后的UID范围可以用简洁的掩码表示。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 索引文件的路径，由build_occupancy_index()生成。
+
+        Raises:
+            InvalidOccupancyIndexException: 索引文件的格式无效。
+        """
+        self.__path = os.path.abspath(path)
+        self.__fp = open(self.__path, 'rb')
+        try:
+            self.__mm = mmap.mmap(self.__fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__fp.close()
+            raise InvalidOccupancyIndexException(f'索引文件为空: {self.__path}')
+
+        try:
+            self.__sections = self.__read_sections()
+        except:
+            self.close()
+            raise
+
+    def __read_sections(self) -> List[OccupancySection]:
+        if len(self.__mm) < _HEADER.size:
+            raise InvalidOccupancyIndexException(f'索引文件过短: {self.__path}')
+
+        magic, version, section_count = _HEADER.unpack_from(self.__mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise InvalidOccupancyIndexException(f'不是有效的索引文件: {self.__path}')
+
+        sections = []
+        for i in range(section_count):
+            position = _HEADER.size + i * _SECTION.size
+            if position + _SECTION.size > len(self.__mm):
+                raise InvalidOccupancyIndexException(f'索引文件的分区表不完整: {self.__path}')
+            section = OccupancySection(*_SECTION.unpack_from(self.__mm, position))
+            if section.block_size < 1 or section.offset + (section.block_count + 7) // 8 > len(self.__mm):
+                raise InvalidOccupancyIndexException(f'索引文件的分区无效: {section!r}')
+            sections.append(section)
+
+        sections.sort(key=lambda x: x.start)
+        for previous, section in zip(sections, sections[1:]):
+            if section.start <= previous.end:
+                raise InvalidOccupancyIndexException(f'索引文件的分区重叠: {previous!r}, {section!r}')
+        return sections
+
+    @property
+    def path(self) -> str:
+        """索引文件的绝对路径。
+        """
+        return self.__path
+
+    @property
+    def sections(self) -> List[OccupancySection]:
+        """按起始UID排列的分区。
+        """
+        return list(self.__sections)
+
+    def close(self):
+        """关闭索引文件。
+        """
+        self.__mm.close()
+        self.__fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __read_bits(self, section: OccupancySection, first: int, last: int) -> int:
+        """读取分区中第first至第last块的位，返回的整数的第0位对应第first块。
+        """
+        data = self.__mm[section.offset + first // 8:section.offset + last // 8 + 1]
+        return (int.from_bytes(data, 'little') >> (first % 8)) & ((1 << (last - first + 1)) - 1)
+
+    def __count(self, section: OccupancySection, first: int, last: int) -> int:
+        """统计分区中第first至第last块中有账号的块的数量。
+        """
+        count = 0
+        for chunk_first in range(first, last + 1, _CHUNK_BITS):
+            chunk_last = min(chunk_first + _CHUNK_BITS - 1, last)
+            count += bin(self.__read_bits(section, chunk_first, chunk_last)).count('1')
+        return count
+
+    def __find_nth(self, section: OccupancySection, first: int, last: int, n: int) -> Optional[int]:
+        """查找分区中第first至第last块中第n个有账号的块，若不足n个则返回None。
+        """
+        for chunk_first in range(first, last + 1, _CHUNK_BITS):
+            chunk_last = min(chunk_first + _CHUNK_BITS - 1, last)
+            value = self.__read_bits(section, chunk_first, chunk_last)
+            count = bin(value).count('1')
+            if count < n:
+                n -= count
+                continue
+
+            data = value.to_bytes((chunk_last - chunk_first) // 8 + 1, 'little')
+            for i, byte in enumerate(data):
+                if _POPCOUNT[byte] < n:
+                    n -= _POPCOUNT[byte]
+                    continue
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        n -= 1
+                        if n == 0:
+                            return chunk_first + i * 8 + bit
+        return None
+
+    def __iter_blocks(self, section: OccupancySection, first: int, last: int) -> Iterator[int]:
+        """按顺序返回分区中第first至第last块中有账号的块的序号。
+        """
+        for chunk_first in range(first, last + 1, _CHUNK_BITS):
+            chunk_last = min(chunk_first + _CHUNK_BITS - 1, last)
+            data = self.__read_bits(section, chunk_first, chunk_last).to_bytes((chunk_last - chunk_first) // 8 + 1, 'little')
+            for match in _NONZERO_BYTE.finditer(data):
+                byte = data[match.start()]
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield chunk_first + match.start() * 8 + bit
+
+    def __find_uid16_section(self, start: int, end: int) -> Optional[OccupancySection]:
+        """查找完整包含一段16位UID的分布区间的分区，分区的块须与UID分布区间一一对应。
+        """
+        for section in self.__sections:
+            if (section.block_size == UID16_STEP
+                    and (section.start - UID16_START) % UID16_STEP == 0
+                    and section.start <= start and end - 1 <= section.end):
+                return section
+        return None
+
+    def covers_uid16(self, start: int, end: int) -> bool:
+        """判断索引是否包含一段16位UID的所有UID分布区间。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+
+        Returns:
+            bool: 存在一个分区完整包含range(start, end, UID16_STEP)中所有UID分布区间时返回True。
+        """
+        return self.__find_uid16_section(start, end) is not None
+
+    def count_uid16_intervals(self, start: int, end: int) -> int:
+        """统计一段16位UID中有账号的UID分布区间的数量。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+
+        Returns:
+            int: 有账号的UID分布区间的数量，索引不包含这段UID时返回所有UID分布区间的数量。
+        """
+        section = self.__find_uid16_section(start, end)
+        if section is None or end <= start:
+            return max((end - start) // UID16_STEP, 0)
+        first = (start - section.start) // UID16_STEP
+        return self.__count(section, first, first + (end - start) // UID16_STEP - 1)
+
+    def find_uid16_interval(self, start: int, end: int, n: int = 1) -> Optional[int]:
+        """查找一段16位UID中第n个有账号的UID分布区间。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+            n (int, optional): 从1开始的序号。
+
+        Returns:
+            Optional[int]: UID分布区间的起点，若不足n个则返回None。
+        """
+        section = self.__find_uid16_section(start, end)
+        if section is None:
+            interval_start = start + (n - 1) * UID16_STEP
+            return interval_start if interval_start < end else None
+        if end <= start:
+            return None
+        first = (start - section.start) // UID16_STEP
+        block = self.__find_nth(section, first, first + (end - start) // UID16_STEP - 1, n)
+        return None if block is None else section.start + block * UID16_STEP
+
+    def iter_uid16_intervals(self, start: int, end: int) -> Iterator[int]:
+        """按顺序返回一段16位UID中有账号的UID分布区间的起点。
+
+        Args:
+            start (int): UID段的第一个UID分布区间的起点。
+            end (int): UID段的结尾，不包含在UID段中。
+
+        Returns:
+            Iterator[int]: UID分布区间的起点，索引不包含这段UID时返回所有UID分布区间的起点。
+        """
+        section = self.__find_uid16_section(start, end)
+        if section is None:
+            return iter(range(start, end, UID16_STEP))
+        if end <= start:
+            return iter([])
+        first = (start - section.start) // UID16_STEP
+        return (section.start + x * UID16_STEP for x in self.__iter_blocks(section, first, first + (end - start) // UID16_STEP - 1))
+
+    def get_occupied_ranges(self, uid_range: UidRange, max_ranges: Optional[int] = 64) -> List[UidRange]:
+        """去除UID范围中没有账号的块，返回剩余的UID范围。
+
+        相邻的有账号的块合并为一个UID范围。当UID范围的数量超过max_ranges时，从最短的间隔
+        开始合并相邻的UID范围，以免破解程序启动次数或掩码数量过多。
+
+        Args:
+            uid_range (UidRange): UID范围。
+            max_ranges (Optional[int], optional): 返回的UID范围的最大数量，为None时不限制。
+
+        Returns:
+            List[UidRange]: 按顺序排列的UID范围，UID范围内的所有块都没有账号时返回空列表。
+        """
+        runs = []
+
+        def append(start, end):
+            if runs and runs[-1][1] + 1 >= start:
+                runs[-1][1] = max(runs[-1][1], end)
+            else:
+                runs.append([start, end])
+
+        position = uid_range.start
+        for section in self.__sections:
+            if position > uid_range.end:
+                break
+            if section.end < position or section.start > uid_range.end:
+                continue
+
+            # 不在分区内的UID视为有账号
+            if section.start > position:
+                append(position, section.start - 1)
+                position = section.start
+
+            section_end = min(section.end, uid_range.end)
+            first = (position - section.start) // section.block_size
+            last = (section_end - section.start) // section.block_size
+            for block in self.__iter_blocks(section, first, last):
+                block_start = section.start + block * section.block_size
+                append(max(block_start, position), min(block_start + section.block_size - 1, section_end))
+            position = section_end + 1
+
+        if position <= uid_range.end:
+            append(position, uid_range.end)
+
+        if max_ranges is not None and len(runs) > max_ranges:
+            # 保留最长的max_ranges-1个间隔，合并其余的间隔
+            gaps = sorted(range(len(runs) - 1), key=lambda i: runs[i+1][0] - runs[i][1], reverse=True)
+            kept_gaps = set(gaps[:max(max_ranges - 1, 0)])
+            merged = []
+            start = runs[0][0]
+            for i, (_, end) in enumerate(runs):
+                if i in kept_gaps or i == len(runs) - 1:
+                    merged.append([start, end])
+                    if i + 1 < len(runs):
+                        start = runs[i+1][0]
+            runs = merged
+
+        return [UidRange(start, end) for start, end in runs]
+
+    def __repr__(self):
+        return f'OccupancyIndex({self.__path!r}, sections={self.__sections!r})'
+
+
+def read_uid_file(path: str) -> Iterator[int]:
+    """逐行读取UID文件，每行一个UID，忽略空行及不是正整数的行。
+
+    Args:
+        path (str): UID文件的路径。
+
+    Returns:
+        Iterator[int]: 文件中的UID。
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as fp:
+        for line in fp:
+            line = line.strip()
+            if line.isdigit() and int(line) > 0:
+                yield int(line)
+
+
+def build_occupancy_index(uids: Iterable[int], path: str, block_exponent: int = 4) -> Dict:
+    """根据已注册账号的UID生成占用索引文件。
+
+    索引最多包含两个分区：1至9999999999的UID划分为大小为10的block_exponent次幂的块；
+    16位UID自UID16_START起划分为大小为UID16_STEP的块，每个块对应一个UID分布区间，
+    分区的结尾为UID_RANGES_16_DIGITS和所给16位UID中的最大值。只有所给UID中有属于该分区
+    的UID时才生成分区，没有分区的UID在使用索引时视为有账号。其它UID，包括超出
+    UID_RANGES_16_DIGITS过多的16位UID，被视为无效UID并被忽略。
+
+    注意，所给UID之外的账号所在的块会被标记为没有账号，使用索引破解时将无法破解这些UID，
+    因此所给的UID应尽可能完整。
+
+    Args:
+        uids (Iterable[int]): 已注册账号的UID。
+        path (str): 索引文件的保存路径。
+        block_exponent (int, optional): 非16位UID的块大小为10的block_exponent次幂。
+
+    Returns:
+        Dict: 统计信息，包含uids（UID数量）、ignored（被忽略的UID数量）及sections（每个分区的
+            起止UID、块大小、块数量和有账号的块数量）。
+    """
+    uids = list(uids)
+    uid16_max = UID_RANGES_16_DIGITS[-1].end + _UID16_MAX_OVERSHOOT
+    short_uids = [x for x in uids if 0 < x < 10 ** 10]
+    uid16s = [x for x in uids if x >= UID16_START and len(str(x)) == 16 and x <= uid16_max]
+
+    sections = []
+    if len(short_uids) > 0:
+        short_block_size = 10 ** block_exponent
+        sections.append(OccupancySection(0, short_block_size, 10 ** 10 // short_block_size))
+    if len(uid16s) > 0:
+        uid16_end = max([x.end for x in UID_RANGES_16_DIGITS] + uid16s)
+        sections.append(OccupancySection(UID16_START, UID16_STEP, (uid16_end - UID16_START) // UID16_STEP + 1))
+    bitsets = [bytearray((x.block_count + 7) // 8) for x in sections]
+
+    for uid in short_uids + uid16s:
+        for section, bitset in zip(sections, bitsets):
+            if section.start <= uid <= section.end:
+                block = (uid - section.start) // section.block_size
+                bitset[block // 8] |= 1 << (block % 8)
+                break
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    for section, bitset in zip(sections, bitsets):
+        section.offset = offset
+        offset += len(bitset)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as fp:
+        fp.write(_HEADER.pack(_MAGIC, _VERSION, len(sections)))
+        for section in sections:
+            fp.write(_SECTION.pack(section.start, section.block_size, section.block_count, section.offset))
+        for bitset in bitsets:
+            fp.write(bitset)
+    os.replace(temp_path, path)
+
+    return {
+        'uids': len(uids),
+        'ignored': len(uids) - len(short_uids) - len(uid16s),
+        'sections': [{
+            'start': section.start,
+            'end': section.end,
+            'block_size': section.block_size,
+            'block_count': section.block_count,
+            'occupied_blocks': sum([_POPCOUNT[x] for x in bitset]),
+        } for section, bitset in zip(sections, bitsets)],
+    }
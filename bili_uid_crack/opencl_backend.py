@@ -0,0 +1,381 @@
+"""
+使用PyOpenCL在OpenCL设备上运行内置MD5内核的破解后端。
+
+内核按md5_kernel模块的分片进行破解：先由prepare内核为每个分片计算前缀状态及逆推的
+目标状态，再由crack内核为分片内的每个候选UID计算w[j]，从第j步计算至reject_step步后
+比较一个32位字，匹配时再计算剩余的步骤确认。内核在每个进程中只编译一次，之后的破解
+直接复用，没有启动破解程序的耗时，在只有CPU的Linux上可以使用PoCL运行。
+
+内核的常量及步骤的参数均来自md5_kernel模块的参考实现，编译内核后会用参考实现的
+Md5ShardKernel.get_parameters()验证prepare内核的结果。
+
+PyOpenCL及numpy为可选依赖，仅在创建破解器时导入。计算设备由PyOpenCL选择，可通过
+PYOPENCL_CTX环境变量指定。
+"""
+
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .exceptions import OpenClNotAvailableException, FailedToRunOpenClException
+from .md5_kernel import MD5_K, MD5_S, MD5_G, MD5_IV, Md5ShardKernel, get_shard_span, get_target_state, iter_shards
+from .uid_range import UidRange
+
+
+# 每批破解的候选UID数量的上限，每批之间报告进度并检查是否已破解或会话是否已取消
+_BATCH_CANDIDATES = 1 << 22
+
+# prepare内核为每个分片输出的参数：16个消息字、前缀状态、目标和及目标状态
+_PARAMS_PER_SHARD = 25
+
+_KERNEL_SOURCE = '''
+__constant uint K[64] = {%(k)s};
+__constant uint S[64] = {%(s)s};
+__constant uint G[64] = {%(g)s};
+
+inline uint md5_f(uint i, uint b, uint c, uint d)
+{
+    if (i < 16) return bitselect(d, c, b);
+    if (i < 32) return bitselect(c, b, d);
+    if (i < 48) return b ^ c ^ d;
+    return c ^ (b | ~d);
+}
+
+#define MD5_STEP(i) { \\
+    uint t = b + rotate(a + md5_f(i, b, c, d) + K[i] + w[G[i]], S[i]); \\
+    a = d; d = c; c = b; b = t; \\
+}
+
+/* 为每个分片构造消息字，计算前word_index步，并将目标摘要逆推至最后一次使用w[j]的步骤 */
+__kernel void prepare(__global const ulong *bases, const uint shard_count, const uint digits,
+                      const uint is_standard, const uint word_index, const uint last_use,
+                      const uint4 target, __global uint *params)
+{
+    uint gid = get_global_id(0);
+    if (gid >= shard_count) return;
+
+    uint w[16];
+    for (uint k = 0; k < 16; k++) w[k] = 0;
+    ulong uid = bases[gid];
+    for (int k = digits - 1; k >= 0; k--) {
+        uint digit = (uint)(uid %% 10);
+        uid /= 10;
+        w[k >> 2] |= (is_standard ? digit + 0x30 : digit) << ((k & 3) << 3);
+    }
+    w[digits >> 2] |= 0x80u << ((digits & 3) << 3);
+    w[14] = digits << 3;
+
+    /* 清除w[j]中分片内不同的数字 */
+    uint varying = digits - word_index * 4;
+    w[word_index] &= varying == 4 ? 0 : ~((1u << (varying << 3)) - 1);
+
+    uint a = 0x%(a)08x, b = 0x%(b)08x, c = 0x%(c)08x, d = 0x%(d)08x;
+    for (uint i = 0; i < word_index; i++) MD5_STEP(i)
+
+    uint ta = target.x, tb = target.y, tc = target.z, td = target.w;
+    for (uint i = 63; i > last_use; i--) {
+        uint prev_d = ta;
+        ta = rotate(tb - tc, 32 - S[i]) - md5_f(i, tc, td, prev_d) - K[i] - w[G[i]];
+        tb = tc; tc = td; td = prev_d;
+    }
+
+    __global uint *p = params + (size_t)gid * %(params)d;
+    for (uint k = 0; k < 16; k++) p[k] = w[k];
+    p[16] = a; p[17] = b; p[18] = c; p[19] = d;
+    p[20] = rotate(tb - tc, 32 - S[last_use]) - md5_f(last_use, tc, td, ta) - K[last_use];
+    p[21] = ta; p[22] = tb; p[23] = tc; p[24] = td;
+}
+
+/* 每个工作项测试一个候选UID，width为每个分片的工作项数量 */
+__kernel void crack(__global const uint *params, __global const uint *lows, __global const uint *highs,
+                    const uint shard_count, const uint width, const uint digits, const uint is_standard,
+                    const uint word_index, const uint reject_step, const uint last_use,
+                    __global volatile uint *result)
+{
+    uint gid = get_global_id(0);
+    uint shard = gid / width;
+    if (shard >= shard_count || result[0] != 0) return;
+    uint low = lows[shard] + gid %% width;
+    if (low > highs[shard]) return;
+
+    __global const uint *p = params + (size_t)shard * %(params)d;
+    uint w[16];
+    for (uint k = 0; k < 16; k++) w[k] = p[k];
+
+    uint varying = digits - word_index * 4;
+    uint word = w[word_index];
+    uint x = low;
+    for (int k = varying - 1; k >= 0; k--) {
+        uint digit = x %% 10;
+        x /= 10;
+        word |= (is_standard ? digit + 0x30 : digit) << (k << 3);
+    }
+    w[word_index] = word;
+
+    uint a = p[16], b = p[17], c = p[18], d = p[19];
+    for (uint i = word_index; i <= reject_step; i++) MD5_STEP(i)
+    /* 早期排除：只比较第reject_step步的结果 */
+    if (b != p[20] - word) return;
+
+    for (uint i = reject_step + 1; i <= last_use; i++) MD5_STEP(i)
+    if (a == p[21] && b == p[22] && c == p[23] && d == p[24]) {
+        if (atomic_cmpxchg(&result[0], 0, 1) == 0) {
+            result[1] = shard;
+            result[2] = low;
+        }
+    }
+}
+''' % {
+    'k': ', '.join([f'0x{x:08x}u' for x in MD5_K]),
+    's': ', '.join([str(x) for x in MD5_S]),
+    'g': ', '.join([str(x) for x in MD5_G]),
+    'a': MD5_IV[0], 'b': MD5_IV[1], 'c': MD5_IV[2], 'd': MD5_IV[3],
+    'params': _PARAMS_PER_SHARD,
+}
+
+
+def iter_range_batches(uid_range: UidRange, batch_candidates: int = _BATCH_CANDIDATES) -> Iterator[Tuple[int, 'numpy.ndarray', 'numpy.ndarray', 'numpy.ndarray']]:
+    """将连续的UID范围划分为分片，并按批返回。
+
+    Args:
+        uid_range (UidRange): UID范围，UID为1至16位的正整数。
+        batch_candidates (int, optional): 每批最多包含的候选UID数量，至少包含一个分片。
+
+    Returns:
+        Iterator[Tuple[int, numpy.ndarray, numpy.ndarray, numpy.ndarray]]: 每批的UID位数、
+            分片的起点（对齐至分片大小）、分片内第一个及最后一个候选UID相对于起点的偏移。
+    """
+    import numpy as np
+
+    start = max(uid_range.start, 1)
+    while start <= uid_range.end:
+        digits = len(str(start))
+        span = get_shard_span(digits)
+        end = min(uid_range.end, 10 ** digits - 1)
+        first_base = start // span * span
+        shard_count = (end // span * span - first_base) // span + 1
+        batch_shards = max(batch_candidates // span, 1)
+        for i in range(0, shard_count, batch_shards):
+            bases = np.arange(i, min(i + batch_shards, shard_count), dtype=np.uint64) * np.uint64(span) + np.uint64(first_base)
+            lows = np.zeros(len(bases), dtype=np.uint32)
+            highs = np.full(len(bases), span - 1, dtype=np.uint32)
+            if i == 0:
+                lows[0] = start - first_base
+            if i + len(bases) == shard_count:
+                highs[-1] = end - int(bases[-1])
+            yield digits, bases, lows, highs
+        start = end + 1
+
+
+def iter_interval_batches(interval_starts: Iterable[int], interval_len: int,
+                          batch_candidates: int = _BATCH_CANDIDATES) -> Iterator[Tuple[int, 'numpy.ndarray', 'numpy.ndarray', 'numpy.ndarray']]:
+    """将16位UID分布区间划分为分片，并按批返回，用于按16位UID的分布规律破解。
+
+    Args:
+        interval_starts (Iterable[int]): 按顺序排列的16位UID分布区间的起点（已加上偏移量）。
+        interval_len (int): 每个UID分布区间的长度。
+        batch_candidates (int, optional): 每批最多包含的候选UID数量，至少包含一个分片。
+
+    Returns:
+        Iterator[Tuple[int, numpy.ndarray, numpy.ndarray, numpy.ndarray]]: 结构见iter_range_batches()。
+    """
+    import numpy as np
+
+    digits = 16
+    span = get_shard_span(digits)
+    starts = np.fromiter(interval_starts, dtype=np.uint64)
+    if len(starts) == 0:
+        return
+    # 超出16位的部分不属于任何16位UID范围
+    ends = np.minimum(starts + np.uint64(interval_len - 1), np.uint64(10 ** digits - 1))
+
+    # 每个UID分布区间覆盖的分片
+    first_shards = starts // np.uint64(span)
+    counts = (ends // np.uint64(span) - first_shards + np.uint64(1)).astype(np.int64)
+    index = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+    bases = (first_shards[index] + offsets.astype(np.uint64)) * np.uint64(span)
+    lows = (np.maximum(starts[index], bases) - bases).astype(np.uint32)
+    highs = (np.minimum(ends[index], bases + np.uint64(span - 1)) - bases).astype(np.uint32)
+
+    batch_shards = max(batch_candidates // min(interval_len, span), 1)
+    for i in range(0, len(bases), batch_shards):
+        yield digits, bases[i:i+batch_shards], lows[i:i+batch_shards], highs[i:i+batch_shards]
+
+
+class OpenClMd5Cracker:
+    """在OpenCL设备上运行内置MD5内核的破解器，创建时编译内核，之后的破解均复用。
+
+    通常使用get_opencl_cracker()获取进程内共用的实例。
+    """
+
+    def __init__(self, context: Optional['pyopencl.Context'] = None):
+        """
+        Args:
+            context (Optional[pyopencl.Context], optional): OpenCL上下文，为None时由PyOpenCL选择计算设备。
+
+        Raises:
+            OpenClNotAvailableException: 未安装PyOpenCL或numpy，或没有可用的OpenCL设备，或内核编译失败。
+        """
+        try:
+            import numpy as np
+            import pyopencl as cl
+            import pyopencl.cltypes
+        except ImportError as e:
+            raise OpenClNotAvailableException(f'未安装PyOpenCL: {e}')
+
+        try:
+            self.__context = cl.create_some_context(interactive=False) if context is None else context
+            self.__queue = cl.CommandQueue(self.__context)
+            self.__program = cl.Program(self.__context, _KERNEL_SOURCE).build()
+            self.__prepare = cl.Kernel(self.__program, 'prepare')
+            self.__crack = cl.Kernel(self.__program, 'crack')
+        except cl.Error as e:
+            raise OpenClNotAvailableException(str(e))
+
+        self.__np = np
+        self.__cl = cl
+        self.__lock = threading.Lock()
+
+        # 部分OpenCL实现（如PoCL）在首次运行内核时才生成设备代码，预先运行一次只包含一个UID的破解
+        try:
+            self.__check_prepare()
+            for is_standard_md5 in [True, False]:
+                self.crack_batch('0' * 32, is_standard_md5, *next(iter_range_batches(UidRange(1, 1))))
+        except FailedToRunOpenClException as e:
+            raise OpenClNotAvailableException(str(e))
+
+    @property
+    def device_name(self) -> str:
+        """计算设备的名称。
+        """
+        return ', '.join([x.name.strip() for x in self.__context.devices])
+
+    @property
+    def is_cpu(self) -> bool:
+        """计算设备是否均为CPU。
+        """
+        return all([x.type & self.__cl.device_type.CPU for x in self.__context.devices])
+
+    def crack_batch(self, md5: str, is_standard_md5: bool, digits: int, bases: 'numpy.ndarray', lows: 'numpy.ndarray', highs: 'numpy.ndarray') -> int:
+        """破解一批分片。
+
+        Args:
+            md5 (str): 16进制MD5值。
+            is_standard_md5 (bool): 是否为标准MD5。
+            digits (int): 分片中的UID的位数。
+            bases (numpy.ndarray): 分片的起点，uint64。
+            lows (numpy.ndarray): 分片内第一个候选UID相对于起点的偏移，uint32。
+            highs (numpy.ndarray): 分片内最后一个候选UID相对于起点的偏移，uint32。
+
+        Returns:
+            int: MD5对应的UID，若不在这批分片中则返回-1。
+
+        Raises:
+            FailedToRunOpenClException: 运行内核失败。
+        """
+        np, cl = self.__np, self.__cl
+        shard_count = len(bases)
+        if shard_count == 0:
+            return -1
+
+        # 步骤的参数对位数相同的分片均相同，由参考实现按第一个分片计算，各分片的前缀状态及目标状态由prepare内核计算
+        base = int(bases[0])
+        parameters = Md5ShardKernel(md5, is_standard_md5, UidRange(base + int(lows[0]), base + int(highs[0]))).get_parameters()
+        width = int((highs.astype(np.int64) - lows + 1).max())
+
+        with self.__lock:
+            try:
+                params_buffer = self.__run_prepare(md5, is_standard_md5, digits, bases, parameters)
+                result = self.__run_crack(params_buffer, is_standard_md5, digits, lows, highs, width, parameters)
+            except cl.Error as e:
+                raise FailedToRunOpenClException(str(e))
+
+        if result[0] == 0:
+            return -1
+        return int(bases[result[1]]) + int(result[2])
+
+    def __run_prepare(self, md5: str, is_standard_md5: bool, digits: int, bases: 'numpy.ndarray', parameters: Dict) -> 'pyopencl.Buffer':
+        """运行prepare内核，返回每个分片的消息字、前缀状态、目标和及目标状态。
+        """
+        np, cl = self.__np, self.__cl
+        mf = cl.mem_flags
+        shard_count = len(bases)
+        target = np.array(get_target_state(md5), dtype=np.uint32).view(cl.cltypes.uint4)[0]
+        bases_buffer = cl.Buffer(self.__context, mf.READ_ONLY | mf.COPY_HOST_PTR, hostbuf=np.ascontiguousarray(bases))
+        params_buffer = cl.Buffer(self.__context, mf.READ_WRITE, shard_count * _PARAMS_PER_SHARD * 4)
+        self.__prepare(self.__queue, (shard_count,), None, bases_buffer, np.uint32(shard_count), np.uint32(digits),
+                       np.uint32(is_standard_md5), np.uint32(parameters['word_index']), np.uint32(parameters['last_use']),
+                       target, params_buffer)
+        return params_buffer
+
+    def __run_crack(self, params_buffer: 'pyopencl.Buffer', is_standard_md5: bool, digits: int, lows: 'numpy.ndarray',
+                    highs: 'numpy.ndarray', width: int, parameters: Dict) -> 'numpy.ndarray':
+        """运行crack内核，返回的数组依次为是否已破解、分片的序号及分片内的偏移。
+        """
+        np, cl = self.__np, self.__cl
+        mf = cl.mem_flags
+        shard_count = len(lows)
+        lows_buffer = cl.Buffer(self.__context, mf.READ_ONLY | mf.COPY_HOST_PTR, hostbuf=np.ascontiguousarray(lows))
+        highs_buffer = cl.Buffer(self.__context, mf.READ_ONLY | mf.COPY_HOST_PTR, hostbuf=np.ascontiguousarray(highs))
+        result = np.zeros(3, dtype=np.uint32)
+        result_buffer = cl.Buffer(self.__context, mf.READ_WRITE | mf.COPY_HOST_PTR, hostbuf=result)
+
+        self.__crack(self.__queue, (shard_count * width,), None, params_buffer, lows_buffer, highs_buffer,
+                     np.uint32(shard_count), np.uint32(width), np.uint32(digits), np.uint32(is_standard_md5),
+                     np.uint32(parameters['word_index']), np.uint32(parameters['reject_step']),
+                     np.uint32(parameters['last_use']), result_buffer)
+        cl.enqueue_copy(self.__queue, result, result_buffer)
+        self.__queue.finish()
+        return result
+
+    def __check_prepare(self):
+        """用参考实现的内核参数验证prepare内核对每种位数及MD5类型计算的结果。
+
+        Raises:
+            FailedToRunOpenClException: 运行内核失败，或结果与参考实现不一致。
+        """
+        np, cl = self.__np, self.__cl
+        md5 = '0123456789abcdef0123456789abcdef'
+        for is_standard_md5 in [True, False]:
+            for digits in range(1, 17):
+                shard = next(iter_shards(UidRange(10 ** (digits - 1), 10 ** digits - 1)))
+                parameters = Md5ShardKernel(md5, is_standard_md5, shard).get_parameters()
+                words = parameters['words']
+                words[parameters['word_index']] = parameters['word_base']
+                expected = words + parameters['prefix_state'] + [parameters['target_sum']] + parameters['target_state']
+
+                span = get_shard_span(digits)
+                bases = np.array([shard.start // span * span], dtype=np.uint64)
+                actual = np.zeros(_PARAMS_PER_SHARD, dtype=np.uint32)
+                try:
+                    params_buffer = self.__run_prepare(md5, is_standard_md5, digits, bases, parameters)
+                    cl.enqueue_copy(self.__queue, actual, params_buffer)
+                    self.__queue.finish()
+                except cl.Error as e:
+                    raise FailedToRunOpenClException(str(e))
+
+                if [int(x) for x in actual] != expected:
+                    raise FailedToRunOpenClException(f'prepare内核计算{digits}位UID的参数与参考实现不一致')
+
+    def __repr__(self):
+        return f'OpenClMd5Cracker({self.device_name!r})'
+
+
+_cracker = None
+_cracker_lock = threading.Lock()
+
+
+def get_opencl_cracker() -> OpenClMd5Cracker:
+    """返回进程内共用的破解器，首次调用时选择计算设备并编译内核。
+
+    Returns:
+        OpenClMd5Cracker: 破解器。
+
+    Raises:
+        OpenClNotAvailableException: 未安装PyOpenCL或numpy，或没有可用的OpenCL设备，或内核编译失败。
+    """
+    global _cracker
+    with _cracker_lock:
+        if _cracker is None:
+            _cracker = OpenClMd5Cracker()
+        return _cracker
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional
+
+from .uid_range import UidRange
+
+
+class RangePlan:
+    """破解一个UID范围的计划。
+
+    Attributes:
+        uid_range (UidRange): UID范围。
+        is_uid16 (bool): 是否利用16位UID的分布规律生成字典进行破解，否则使用掩码破解。
+        candidates (int): 需要测试的候选UID数量。
+        startups (int): 破解程序的启动次数。
+        seconds (Optional[float]): 根据本机的校准结果预计的耗时，未校准时为None。
+    """
+
+    def __init__(self, uid_range: UidRange, is_uid16: bool, candidates: int, startups: int, seconds: Optional[float] = None):
+        self.uid_range = uid_range
+        self.is_uid16 = is_uid16
+        self.candidates = candidates
+        self.startups = startups
+        self.seconds = seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            'uid_range': [self.uid_range.start, self.uid_range.end],
+            'is_uid16': self.is_uid16,
+            'candidates': self.candidates,
+            'startups': self.startups,
+            'seconds': self.seconds,
+        }
+
+    def __repr__(self):
+        return f'RangePlan({self.uid_range!r}, candidates={self.candidates}, startups={self.startups}, seconds={self.seconds})'
+
+
+class CrackPlan:
+    """使用一个破解后端破解MD5的计划。
+
+    Attributes:
+        backend (str): 破解后端的名称，如hashcat、john。
+        is_standard_md5 (bool): 是否为标准MD5。
+        ranges (List[RangePlan]): 每个UID范围的破解计划，按破解的先后排列。
+    """
+
+    def __init__(self, backend: str, is_standard_md5: bool, ranges: List[RangePlan]):
+        self.backend = backend
+        self.is_standard_md5 = is_standard_md5
+        self.ranges = ranges
+
+    @property
+    def candidates(self) -> int:
+        """需要测试的候选UID总数。
+        """
+        return sum([x.candidates for x in self.ranges])
+
+    @property
+    def startups(self) -> int:
+        """破解程序的总启动次数。
+        """
+        return sum([x.startups for x in self.ranges])
+
+    @property
+    def seconds(self) -> Optional[float]:
+        """预计的总耗时，若有UID范围无法预计耗时则为None。
+        """
+        if any([x.seconds is None for x in self.ranges]):
+            return None
+        return sum([x.seconds for x in self.ranges])
+
+    def to_dict(self) -> Dict:
+        return {
+            'backend': self.backend,
+            'is_standard_md5': self.is_standard_md5,
+            'candidates': self.candidates,
+            'startups': self.startups,
+            'seconds': self.seconds,
+            'ranges': [x.to_dict() for x in self.ranges],
+        }
+
+    def __repr__(self):
+        return f'CrackPlan({self.backend!r}, is_standard_md5={self.is_standard_md5}, candidates={self.candidates}, startups={self.startups}, seconds={self.seconds})'
+
+
+def get_era_key(uid_range: UidRange) -> str:
+    """返回UID号段在校准结果中的键。
+    """
+    return f'{uid_range.start}-{uid_range.end}'
+
+
+def find_calibration(calibrations: Dict[str, Dict], uid_range: UidRange, is_uid16: bool) -> Optional[Dict]:
+    """查找适用于UID范围的校准结果。
+
+    优先使用与UID范围重叠最多的UID号段的校准结果，若没有重叠的号段，则使用破解方式
+    （16位UID字典或掩码）相同且起点最接近的号段的校准结果。
+
+    Args:
+        calibrations (Dict[str, Dict]): 一个破解后端及MD5类型的校准结果，键为get_era_key()的返回值。
+        uid_range (UidRange): UID范围。
+        is_uid16 (bool): 是否利用16位UID的分布规律进行破解。
+
+    Returns:
+        Optional[Dict]: 校准结果，包含startup_seconds和hashes_per_second，若无则返回None。
+    """
+    best = None
+    best_overlap = 0
+    nearest = None
+    nearest_distance = None
+    for key, calibration in calibrations.items():
+        start, end = [int(x) for x in key.split('-')]
+        overlap = min(end, uid_range.end) - max(start, uid_range.start) + 1
+        if overlap > best_overlap:
+            best = calibration
+            best_overlap = overlap
+
+        if calibration.get('is_uid16') == is_uid16:
+            distance = abs(start - uid_range.start)
+            if nearest_distance is None or distance < nearest_distance:
+                nearest = calibration
+                nearest_distance = distance
+
+    return best if best is not None else nearest
+
+
+def estimate_seconds(calibration: Optional[Dict], candidates: int, startups: int) -> Optional[float]:
+    """根据校准结果预计破解的耗时。
+
+    Args:
+        calibration (Optional[Dict]): find_calibration()返回的校准结果。
+        candidates (int): 候选UID数量。
+        startups (int): 破解程序的启动次数。
+
+    Returns:
+        Optional[float]: 预计的耗时（秒），无校准结果时返回None。
+    """
+    if calibration is None or calibration.get('hashes_per_second', 0) <= 0:
+        return None
+    return startups * calibration['startup_seconds'] + candidates / calibration['hashes_per_second']
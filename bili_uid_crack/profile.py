@@ -0,0 +1,143 @@
+import os
+import json
+import socket
+import platform
+from contextlib import contextmanager
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+def get_data_dir() -> str:
+    """返回保存本机配置和缓存的目录。
+
+    优先使用环境变量BILI_UID_CRACK_HOME指定的目录，否则在Windows下为
+    %LOCALAPPDATA%\\bili_uid_crack，在其它系统下为~/.cache/bili_uid_crack。
+
+    Returns:
+        str: 目录的绝对路径，目录不一定存在。
+    """
+    data_dir = os.environ.get('BILI_UID_CRACK_HOME')
+    if data_dir:
+        return os.path.abspath(data_dir)
+
+    if platform.system() == 'Windows' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'bili_uid_crack')
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'bili_uid_crack')
+
+
+def _get_hostname() -> str:
+    """返回可用于文件名的主机名。
+    """
+    return ''.join([x if x.isalnum() or x in '-_.' else '_' for x in socket.gethostname()]) or 'localhost'
+
+
+def get_host_profile_path() -> str:
+    """返回本机配置文件的路径，每台主机使用各自的配置文件。
+
+    Returns:
+        str: 配置文件的绝对路径。
+    """
+    return os.path.join(get_data_dir(), f'profile-{_get_hostname()}.json')
+
+
+def get_host_lock_dir() -> str:
+    """返回本机的计算设备锁文件所在的目录，数据目录位于多台主机共享的文件系统中时各主机互不影响。
+
+    Returns:
+        str: 目录的绝对路径，目录不一定存在。
+    """
+    return os.path.join(get_data_dir(), f'locks-{_get_hostname()}')
+
+
+def load_host_profile() -> Dict:
+    """读取本机配置。
+
+    Returns:
+        Dict: 本机配置，配置文件不存在或无法解析时返回空字典。
+    """
+    try:
+        with open(get_host_profile_path(), 'r', encoding='utf-8') as fp:
+            profile = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+    return profile if isinstance(profile, dict) else {}
+
+
+def save_host_profile(profile: Dict):
+    """保存本机配置，先写入临时文件再替换，避免中途退出时损坏配置文件。
+
+    Args:
+        profile (Dict): 本机配置。
+    """
+    path = get_host_profile_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as fp:
+        json.dump(profile, fp, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def _lock_host_profile():
+    """在读取、合并及保存本机配置期间对配置的锁文件加排它锁，避免本机同时运行的多个进程互相覆盖更新。
+    """
+    path = f'{get_host_profile_path()}.lock'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+') as fp:
+        if fcntl is not None:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        else:
+            fp.seek(0)
+            msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+            else:
+                fp.seek(0)
+                msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _merge_dicts(base: Dict, update: Dict) -> Dict:
+    """递归地将update合并到base的副本中，两者中同名的项均为字典时合并，否则使用update中的值。
+    """
+    merged = dict(base)
+    for key, value in update.items():
+        if isinstance(merged.get(key), dict) and isinstance(value, dict):
+            merged[key] = _merge_dicts(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def update_host_profile(key: str, value, merge: bool = True) -> Dict:
+    """更新本机配置中的一项并保存。
+
+    读取、合并及保存期间对配置加文件锁，本机的多个进程同时更新时不会丢失其它进程的更新。
+
+    Args:
+        key (str): 配置项的名称。
+        value: 配置项的值，需要可以序列化为JSON。
+        merge (bool, optional): 配置项原有的值与value均为字典时，是否将value递归合并到原有的值中，
+            为True时value只需包含更新的部分，为False时用value替换原有的值。
+
+    Returns:
+        Dict: 更新后的本机配置。
+    """
+    with _lock_host_profile():
+        profile = load_host_profile()
+        if merge and isinstance(profile.get(key), dict) and isinstance(value, dict):
+            value = _merge_dicts(profile[key], value)
+        profile[key] = value
+        save_host_profile(profile)
+    return profile
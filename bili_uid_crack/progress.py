@@ -0,0 +1,238 @@
+import re
+import json
+from typing import Callable, Dict, Optional
+
+from .uid_range import UidRange
+
+
+class CrackProgress:
+    """破解进度事件，由破解后端在破解过程中传给progress_callback回调函数。
+
+    Attributes:
+        backend (str): 破解后端的名称，如hashcat、john。
+        uid_range (Optional[UidRange]): 当前正在破解的UID范围。
+        segment (int): 当前UID范围中正在破解的UID段或掩码的序号，从1开始。
+        segment_count (int): 当前UID范围中UID段或掩码的数量。
+        tested (int): 整个破解计划中已测试的候选UID数量。
+        total (int): 整个破解计划中候选UID的总数。
+        speed (float): 每秒测试的候选UID数量（H/s），未知时为0。
+        eta (Optional[float]): 整个破解计划预计剩余的秒数，未知时为None。
+        offset (int): 破解会话中在本次破解之前已测试的候选UID数量，已计入tested。
+    """
+
+    def __init__(self,
+                 backend: str,
+                 uid_range: Optional[UidRange],
+                 segment: int,
+                 segment_count: int,
+                 tested: int,
+                 total: int,
+                 speed: float,
+                 eta: Optional[float],
+                 offset: int = 0):
+        self.backend = backend
+        self.uid_range = uid_range
+        self.segment = segment
+        self.segment_count = segment_count
+        self.tested = tested
+        self.total = total
+        self.speed = speed
+        self.eta = eta
+        self.offset = offset
+
+    @property
+    def percent(self) -> float:
+        """整个破解计划的完成百分比。
+        """
+        return self.tested / self.total * 100 if self.total > 0 else 0.0
+
+    def __repr__(self):
+        return (f'CrackProgress(backend={self.backend!r}, uid_range={self.uid_range!r}, '
+                f'segment={self.segment}/{self.segment_count}, tested={self.tested}/{self.total}, '
+                f'speed={self.speed}, eta={self.eta}, offset={self.offset})')
+
+
+class ProgressTracker:
+    """汇总各个破解任务的进度，换算为整个破解计划的进度后通过回调函数报告。
+
+    一次破解会按顺序执行多个任务（例如一个掩码文件或一个16位UID字典文件对应一次
+    hashcat运行），破解后端在开始任务时调用start_task()，在解析到破解程序输出的
+    状态时调用update()，在任务结束时调用finish_task()。
+
+    一个破解计划可以由多次破解组成（例如依次破解多个UID范围及两种MD5，或破解后端运行
+    失败后换用其它破解后端），此时由offset指定之前的各次破解已测试的候选UID数量，
+    由plan_total指定整个计划的候选UID总数，报告的进度均为整个计划的进度。
+    """
+
+    def __init__(self, backend: str, total: int, callback: Optional[Callable[[CrackProgress], None]] = None,
+                 offset: int = 0, plan_total: Optional[int] = None):
+        """
+        Args:
+            backend (str): 破解后端的名称。
+            total (int): 本次破解的候选UID总数。
+            callback (Optional[Callable[[CrackProgress], None]], optional): 报告进度的回调函数。
+            offset (int, optional): 破解计划中在本次破解之前已测试的候选UID数量。
+            plan_total (Optional[int], optional): 整个破解计划的候选UID总数，为None时为offset与total之和。
+        """
+        self.__backend = backend
+        self.__total = total
+        self.__callback = callback
+        self.__offset = offset
+        self.__plan_total = plan_total
+        self.__done = 0
+        self.__task_total = 0
+        self.__task_tested = 0
+        self.__uid_range = None
+        self.__segment = 0
+        self.__segment_count = 0
+        self.__speed = 0.0
+
+    @property
+    def tested(self) -> int:
+        """本次破解中已测试的候选UID数量。
+        """
+        return min(self.__done + self.__task_tested, self.__total)
+
+    @property
+    def task_total(self) -> int:
+        """当前任务的候选UID数量。
+        """
+        return self.__task_total
+
+    @property
+    def task_tested(self) -> int:
+        """当前任务中已测试的候选UID数量。
+        """
+        return self.__task_tested
+
+    @property
+    def uid_range(self) -> Optional[UidRange]:
+        """当前任务所属的UID范围。
+        """
+        return self.__uid_range
+
+    @property
+    def segment(self) -> int:
+        """当前任务在UID范围中的序号，从1开始。
+        """
+        return self.__segment
+
+    @property
+    def segment_count(self) -> int:
+        """UID范围中的任务数量。
+        """
+        return self.__segment_count
+
+    def start_task(self, uid_range: UidRange, segment: int, segment_count: int, task_total: int):
+        """开始一个新的破解任务。
+
+        Args:
+            uid_range (UidRange): 任务所属的UID范围。
+            segment (int): 任务在UID范围中的序号，从1开始。
+            segment_count (int): UID范围中的任务数量。
+            task_total (int): 任务的候选UID数量。
+        """
+        self.__uid_range = uid_range
+        self.__segment = segment
+        self.__segment_count = segment_count
+        self.__task_total = task_total
+        self.__task_tested = 0
+        self.__emit()
+
+    def update(self, task_tested: int, speed: float, segment: Optional[int] = None, segment_count: Optional[int] = None):
+        """更新当前任务的进度。
+
+        Args:
+            task_tested (int): 当前任务中已测试的候选UID数量。
+            speed (float): 当前每秒测试的候选UID数量。
+            segment (Optional[int], optional): 破解程序报告的当前UID段或掩码的序号。
+            segment_count (Optional[int], optional): 破解程序报告的UID段或掩码的数量。
+        """
+        self.__task_tested = max(0, min(task_tested, self.__task_total))
+        self.__speed = speed
+        if segment is not None:
+            self.__segment = segment
+        if segment_count is not None:
+            self.__segment_count = segment_count
+        self.__emit()
+
+    def finish_task(self):
+        """结束当前破解任务，将其全部候选UID计为已测试。
+        """
+        self.__done += self.__task_total
+        self.__task_total = 0
+        self.__task_tested = 0
+
+    def __emit(self):
+        if self.__callback is None:
+            return
+
+        tested = self.__offset + self.tested
+        total = self.__offset + self.__total
+        if self.__plan_total is not None:
+            # 破解后端的候选UID数量可能与计算计划时的不同，总数至少包含本次破解的全部候选UID
+            total = max(self.__plan_total, total)
+        eta = (total - tested) / self.__speed if self.__speed > 0 else None
+        self.__callback(CrackProgress(self.__backend, self.__uid_range, self.__segment, self.__segment_count,
+                                      tested, total, self.__speed, eta, self.__offset))
+
+
+def parse_hashcat_status(line: str) -> Optional[Dict]:
+    """解析hashcat在使用`--status --status-json`参数时输出的一行状态。
+
+    Args:
+        line (str): hashcat输出的一行文本。
+
+    Returns:
+        Optional[Dict]: 状态字典，包含键mask_index（当前掩码序号，从1开始）、mask_count
+            （掩码数量）、progress（当前掩码或字典中已测试的候选数量）和speed（所有
+            计算设备每秒测试的候选数量之和），若不是状态行则返回None。
+    """
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+
+    try:
+        status = json.loads(line)
+    except ValueError:
+        return None
+
+    if not isinstance(status, dict) or 'progress' not in status:
+        return None
+
+    guess = status.get('guess') or {}
+    return {
+        'mask_index': int(guess.get('guess_base_offset', 1)),
+        'mask_count': int(guess.get('guess_base_count', 1)),
+        'progress': int(status['progress'][0]),
+        'speed': float(sum(device.get('speed', 0) for device in status.get('devices', []))),
+    }
+
+
+# john的状态行，例如：0g 0:00:00:02 45.45% (ETA: 12:00:00) 0g/s 5023Kp/s 5023Kc/s 5023KC/s 12345..67890
+_JOHN_STATUS_PATTERN = re.compile(r'^\d+g \d+:\d{2}:\d{2}:\d{2}\b')
+_JOHN_PERCENT_PATTERN = re.compile(r'\s(\d+(?:\.\d+)?)%')
+_JOHN_SPEED_PATTERN = re.compile(r'\s(\d+(?:\.\d+)?)([KMGT]?)p/s')
+_SPEED_UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+
+
+def parse_john_status(line: str) -> Optional[Dict]:
+    """解析john在使用`--progress-every`参数时输出的一行状态。
+
+    Args:
+        line (str): john输出的一行文本。
+
+    Returns:
+        Optional[Dict]: 状态字典，包含键fraction（当前任务的完成比例，未知时为None）和
+            speed（每秒测试的候选数量），若不是状态行则返回None。
+    """
+    line = line.strip()
+    if _JOHN_STATUS_PATTERN.match(line) is None:
+        return None
+
+    percent = _JOHN_PERCENT_PATTERN.search(line)
+    speed = _JOHN_SPEED_PATTERN.search(line)
+    return {
+        'fraction': float(percent.group(1)) / 100 if percent else None,
+        'speed': float(speed.group(1)) * _SPEED_UNITS[speed.group(2)] if speed else 0.0,
+    }
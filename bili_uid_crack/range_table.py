@@ -0,0 +1,348 @@
+import os
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import *
+from .exceptions import InvalidRangeTableException
+from .uid_range import UidRange
+
+
+# UID号段表文件的格式版本
+_VERSION = 1
+
+
+class Uid16Model:
+    """16位UID的分布规律：16位UID分布在起点为start+k*step（k为非负整数）的区间中，
+    每个区间内只有从起点偏移offset开始的interval_len个数可能是UID。
+
+    默认值即constants.py中的UID16_START、UID16_STEP和UID16_INTERVAL_LEN。
+
+    Attributes:
+        start (int): 第一个UID分布区间的起点。
+        step (int): 相邻UID分布区间起点的距离。
+        interval_len (int): 每个UID分布区间包含的候选UID数量。
+        offset (int): 候选UID相对于UID分布区间起点的偏移。
+    """
+
+    def __init__(self, start: int = UID16_START, step: int = UID16_STEP, interval_len: int = UID16_INTERVAL_LEN, offset: int = 0):
+        self.start = start
+        self.step = step
+        self.interval_len = interval_len
+        self.offset = offset
+
+    def get_interval_start(self, uid: int) -> int:
+        """返回UID所在的UID分布区间的起点。
+
+        Args:
+            uid (int): 16位UID。
+
+        Returns:
+            int: 不大于UID的最后一个UID分布区间的起点。
+        """
+        return self.start + (uid - self.start) // self.step * self.step
+
+    def count_intervals(self, uid_range: UidRange) -> int:
+        """计算UID范围内的UID分布区间的数量。
+
+        Args:
+            uid_range (UidRange): 16位UID范围。
+
+        Returns:
+            int: UID分布区间的数量。
+        """
+        return (self.get_interval_start(uid_range.end) - self.get_interval_start(uid_range.start)) // self.step + 1
+
+    def count_candidates(self, uid_range: UidRange) -> int:
+        """计算UID范围内的候选UID数量。
+
+        Args:
+            uid_range (UidRange): 16位UID范围。
+
+        Returns:
+            int: 候选UID数量。
+        """
+        return self.count_intervals(uid_range) * self.interval_len
+
+    def to_dict(self) -> Dict:
+        return {
+            'start': self.start,
+            'step': self.step,
+            'interval_len': self.interval_len,
+            'offset': self.offset,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Uid16Model):
+            return False
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.start, self.step, self.interval_len, self.offset))
+
+    def __repr__(self):
+        return f'Uid16Model(start={self.start}, step={self.step}, interval_len={self.interval_len}, offset={self.offset})'
+
+
+class UidEra:
+    """UID号段。
+
+    Attributes:
+        uid_range (UidRange): 号段的UID范围。
+        uid16_model (Optional[Uid16Model]): 16位UID号段的分布规律，其它号段为None。
+    """
+
+    def __init__(self, uid_range: UidRange, uid16_model: Optional[Uid16Model] = None):
+        self.uid_range = uid_range
+        self.uid16_model = uid16_model
+
+    def count_candidates(self) -> int:
+        """计算号段的候选UID数量，非16位UID号段按号段包含的UID数量计算。
+
+        Returns:
+            int: 候选UID数量。
+        """
+        if self.uid16_model is None:
+            return self.uid_range.end - self.uid_range.start + 1
+        return self.uid16_model.count_candidates(self.uid_range)
+
+    def to_dict(self) -> Dict:
+        return {
+            'start': self.uid_range.start,
+            'end': self.uid_range.end,
+            'uid16': None if self.uid16_model is None else self.uid16_model.to_dict(),
+        }
+
+    def __repr__(self):
+        return f'UidEra({self.uid_range!r}, uid16_model={self.uid16_model!r})'
+
+
+class RangeTable:
+    """UID号段表，可代替constants.py中的UID号段及16位UID分布规律用于破解。
+
+    Attributes:
+        eras (List[UidEra]): 按起始UID排列且互不重叠的UID号段。
+    """
+
+    def __init__(self, eras: List[UidEra]):
+        self.eras = sorted(eras, key=lambda x: x.uid_range.start)
+
+    def get_uid_ranges(self) -> List[UidRange]:
+        """返回所有号段的UID范围，用于代替UID_RANGES_ALL。
+
+        Returns:
+            List[UidRange]: UID范围的列表。
+        """
+        return [x.uid_range for x in self.eras]
+
+    def get_uid16_model(self, uid_range: UidRange) -> Optional[Uid16Model]:
+        """查找适用于16位UID范围的分布规律。
+
+        Args:
+            uid_range (UidRange): 16位UID范围。
+
+        Returns:
+            Optional[Uid16Model]: 包含UID范围起点的16位UID号段的分布规律，若无则返回None。
+        """
+        for era in self.eras:
+            if era.uid16_model is not None and era.uid_range.start <= uid_range.start <= era.uid_range.end:
+                return era.uid16_model
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': _VERSION,
+            'eras': [x.to_dict() for x in self.eras],
+        }
+
+    def save(self, path: str):
+        """保存为JSON格式的号段表文件，先写入临时文件再替换。
+
+        Args:
+            path (str): 号段表文件的保存路径。
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(self.to_dict(), fp, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'RangeTable':
+        """根据to_dict()的返回值创建号段表。
+
+        Args:
+            data (Dict): 号段表的字典。
+
+        Raises:
+            InvalidRangeTableException: 号段表的格式或内容无效。
+
+        Returns:
+            RangeTable: 号段表。
+        """
+        if not isinstance(data, dict) or data.get('version') != _VERSION or not isinstance(data.get('eras'), list):
+            raise InvalidRangeTableException('不支持的号段表格式')
+
+        eras = []
+        try:
+            for item in data['eras']:
+                uid_range = UidRange(int(item['start']), int(item['end']))
+                model = item.get('uid16')
+                if model is not None:
+                    model = Uid16Model(int(model['start']), int(model['step']), int(model['interval_len']), int(model['offset']))
+                    if model.step <= 0 or model.interval_len <= 0 or model.offset < 0 or model.offset + model.interval_len > model.step:
+                        raise InvalidRangeTableException(f'无效的16位UID分布规律: {model!r}')
+                # 破解时以起始UID是否不小于UID16_START区分16位UID号段
+                if (model is not None) != (uid_range.start >= UID16_START):
+                    raise InvalidRangeTableException(f'号段与16位UID分布规律不匹配: {uid_range!r}')
+                eras.append(UidEra(uid_range, model))
+        except (TypeError, KeyError, ValueError) as e:
+            raise InvalidRangeTableException(f'无效的号段: {e}')
+
+        table = RangeTable(eras)
+        for previous, era in zip(table.eras, table.eras[1:]):
+            if era.uid_range.start <= previous.uid_range.end:
+                raise InvalidRangeTableException(f'号段重叠: {previous.uid_range!r}, {era.uid_range!r}')
+        return table
+
+    @staticmethod
+    def load(path: str) -> 'RangeTable':
+        """读取JSON格式的号段表文件。
+
+        Args:
+            path (str): 号段表文件的路径。
+
+        Raises:
+            InvalidRangeTableException: 文件无法解析或号段表无效。
+
+        Returns:
+            RangeTable: 号段表。
+        """
+        with open(path, 'r', encoding='utf-8') as fp:
+            try:
+                data = json.load(fp)
+            except ValueError as e:
+                raise InvalidRangeTableException(f'无法解析号段表: {e}')
+        return RangeTable.from_dict(data)
+
+    def __repr__(self):
+        return f'RangeTable({self.eras!r})'
+
+
+def get_default_range_table() -> RangeTable:
+    """返回由constants.py中的UID号段及16位UID分布规律组成的号段表。
+
+    Returns:
+        RangeTable: 默认的号段表。
+    """
+    return RangeTable([UidEra(x, Uid16Model() if x in UID_RANGES_16_DIGITS else None) for x in UID_RANGES_ALL])
+
+
+def _is_uid16(uid: int) -> bool:
+    return uid >= UID16_START and len(str(uid)) == 16
+
+
+def fit_range_table(uids: Iterable[int], base: Optional[RangeTable] = None, min_samples: int = 100) -> Tuple[RangeTable, Dict]:
+    """根据已注册账号的UID样本拟合UID号段的边界及16位UID的分布规律。
+
+    每个UID归入包含它的号段，若没有则归入距离最近的同类号段（16位UID号段或10位以内的号段），
+    其它UID被忽略。对于样本数量不少于min_samples的号段：号段的边界收缩（或扩展）至样本的
+    最小和最大UID；16位UID号段还以样本所在区间起点的差值的最大公约数作为步长，以样本在区间
+    内的最小和最大偏移确定偏移及区间长度。样本不足的号段保持不变。
+
+    注意，拟合结果完全取决于样本，不在拟合后的号段及区间内的UID将无法破解，因此样本应尽可能完整。
+
+    Args:
+        uids (Iterable[int]): 已注册账号的UID。
+        base (Optional[RangeTable], optional): 作为初值的号段表，默认为get_default_range_table()。
+        min_samples (int, optional): 拟合一个号段所需的最少样本数量。
+
+    Returns:
+        Tuple[RangeTable, Dict]: 拟合后的号段表及统计信息。统计信息包含uids（样本数量）、
+            ignored（被忽略的UID数量）、candidates_before和candidates_after（拟合前后的候选UID
+            总数）以及eras（每个号段的统计），号段的统计包含拟合前后的UID范围、样本数量、
+            是否拟合、拟合后的步长、区间长度和偏移，以及边界、步长和区间长度的改变分别去除的
+            候选UID数量（removed，号段扩展时为负数）。
+    """
+    if base is None:
+        base = get_default_range_table()
+    eras = base.eras
+
+    samples = [[] for _ in eras]
+    total = 0
+    ignored = 0
+    for uid in uids:
+        total += 1
+        is_uid16 = _is_uid16(uid)
+        if not is_uid16 and uid >= 10 ** 10:
+            ignored += 1
+            continue
+
+        nearest = None
+        nearest_distance = None
+        for i, era in enumerate(eras):
+            if (era.uid16_model is not None) != is_uid16:
+                continue
+            distance = max(era.uid_range.start - uid, uid - era.uid_range.end, 0)
+            if nearest_distance is None or distance < nearest_distance:
+                nearest = i
+                nearest_distance = distance
+                if distance == 0:
+                    break
+
+        if nearest is None:
+            ignored += 1
+        else:
+            samples[nearest].append(uid)
+
+    fitted_eras = []
+    era_stats = []
+    for era, era_uids in zip(eras, samples):
+        before = era.count_candidates()
+        removed = {'bounds': 0, 'step': 0, 'interval_len': 0}
+        fitted = era
+        if len(era_uids) >= min_samples:
+            if era.uid16_model is None:
+                fitted = UidEra(UidRange(min(era_uids), max(era_uids)))
+                removed['bounds'] = before - fitted.count_candidates()
+            else:
+                model = era.uid16_model
+                interval_starts = sorted(set([model.get_interval_start(x) for x in era_uids]))
+                offsets = [x - model.get_interval_start(x) for x in era_uids]
+
+                step = 0
+                for interval_start in interval_starts[1:]:
+                    step = math.gcd(step, interval_start - interval_starts[0])
+                step = step or model.step
+                offset = min(offsets)
+                interval_len = max(offsets) - offset + 1
+                uid_range = UidRange(interval_starts[0] + offset, interval_starts[-1] + offset + interval_len - 1)
+
+                # 依次改变边界、步长及区间长度，统计每项改变去除的候选UID数量
+                bounds_candidates = model.count_candidates(uid_range)
+                step_candidates = Uid16Model(interval_starts[0], step, model.interval_len).count_candidates(uid_range)
+                fitted = UidEra(uid_range, Uid16Model(interval_starts[0], step, interval_len, offset))
+                removed['bounds'] = before - bounds_candidates
+                removed['step'] = bounds_candidates - step_candidates
+                removed['interval_len'] = step_candidates - fitted.count_candidates()
+
+        fitted_eras.append(fitted)
+        era_stats.append({
+            'range_before': [era.uid_range.start, era.uid_range.end],
+            'range_after': [fitted.uid_range.start, fitted.uid_range.end],
+            'samples': len(era_uids),
+            'fitted': fitted is not era,
+            'uid16': None if fitted.uid16_model is None else fitted.uid16_model.to_dict(),
+            'candidates_before': before,
+            'candidates_after': fitted.count_candidates(),
+            'removed': removed,
+        })
+
+    stats = {
+        'uids': total,
+        'ignored': ignored,
+        'candidates_before': sum([x['candidates_before'] for x in era_stats]),
+        'candidates_after': sum([x['candidates_after'] for x in era_stats]),
+        'eras': era_stats,
+    }
+    return RangeTable(fitted_eras), stats
@@ -0,0 +1,265 @@
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# 优先使用的内存文件系统目录
+_RAM_DIRS = ['/dev/shm']
+
+# 使用内存文件系统所需的最小可用空间，16位UID字典文件默认可达数百MB，
+# 而容器中的/dev/shm通常只有64MB
+_MIN_RAM_FREE_BYTES = 1 << 30
+
+
+def get_workspace_root(min_free_bytes: int = _MIN_RAM_FREE_BYTES) -> Optional[str]:
+    """返回创建破解会话工作目录的位置，优先使用内存文件系统以减少磁盘读写。
+
+    Args:
+        min_free_bytes (int, optional): 内存文件系统所需的最小可用空间。
+
+    Returns:
+        Optional[str]: 可写且可用空间足够的内存文件系统目录，若无则返回None，表示使用系统的临时目录。
+    """
+    for ram_dir in _RAM_DIRS:
+        if not os.path.isdir(ram_dir) or not os.access(ram_dir, os.W_OK | os.X_OK):
+            continue
+        try:
+            if shutil.disk_usage(ram_dir).free >= min_free_bytes:
+                return ram_dir
+        except OSError:
+            pass
+    return None
+
+
+class CrackSession:
+    """破解会话，在多次破解之间复用工作目录、掩码文件及16位UID的分段计划。
+
+    会话拥有一个工作目录（优先位于/dev/shm等内存文件系统中），破解时的临时文件均创建在
+    其中。每个UID范围的掩码、掩码文件及UID段只在第一次破解时生成，之后的破解直接复用，
+    适用于在同一进程中破解多个MD5或依次破解多个UID范围。会话可作为上下文管理器使用，
+    退出时删除工作目录。
+
+    会话可以在其它线程中调用cancel()取消，正在运行的破解程序会被结束，使用该会话的
+    破解方法抛出CrackCancelledException。
+
+    会话还记录其中各次破解已测试的候选UID数量，破解方法据此报告整个破解计划的进度，
+    依次破解多个UID范围或换用其它破解后端时进度不会从头开始。
+    """
+
+    def __init__(self, workspace: Optional[str] = None):
+        """
+        Args:
+            workspace (Optional[str], optional): 工作目录，为None时自动创建，关闭会话时删除。
+                指定的目录在关闭会话时不会被删除。
+        """
+        if workspace is None:
+            self.__workspace = tempfile.mkdtemp(prefix='bili_uid_crack_', dir=get_workspace_root())
+            self.__owns_workspace = True
+        else:
+            os.makedirs(workspace, exist_ok=True)
+            self.__workspace = os.path.abspath(workspace)
+            self.__owns_workspace = False
+
+        self.__lock = threading.Lock()
+        self.__plans = {}
+        self.__files = {}
+        self.__file_count = 0
+        self.__stats = {'plan_hits': 0, 'plan_misses': 0, 'file_hits': 0, 'file_misses': 0}
+        self.__processes = set()
+        self.__cancelled = False
+        self.__closed = False
+        self.__progress_done = 0
+        self.__progress_total = None
+
+    @property
+    def workspace(self) -> str:
+        """工作目录的绝对路径。
+        """
+        return self.__workspace
+
+    @property
+    def closed(self) -> bool:
+        """会话是否已关闭。
+        """
+        return self.__closed
+
+    @property
+    def cancelled(self) -> bool:
+        """会话是否已取消。
+        """
+        return self.__cancelled
+
+    def cancel(self):
+        """取消会话，结束正在运行的破解程序，之后使用该会话的破解方法均会抛出CrackCancelledException。
+        """
+        with self.__lock:
+            self.__cancelled = True
+            processes = list(self.__processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    def add_process(self, process: subprocess.Popen):
+        """登记正在运行的破解程序，会话取消时将其结束，若会话已取消则立即结束。
+
+        Args:
+            process (subprocess.Popen): 破解程序的进程。
+        """
+        with self.__lock:
+            self.__processes.add(process)
+            cancelled = self.__cancelled
+        if cancelled and process.poll() is None:
+            process.kill()
+
+    def remove_process(self, process: subprocess.Popen):
+        """取消登记已退出的破解程序。
+
+        Args:
+            process (subprocess.Popen): 破解程序的进程。
+        """
+        with self.__lock:
+            self.__processes.discard(process)
+
+    def set_progress_total(self, total: Optional[int]):
+        """设置整个破解计划的候选UID总数，并将已测试的候选UID数量清零。
+
+        Args:
+            total (Optional[int]): 使用该会话的各次破解的候选UID总数之和，可由
+                BiliUidCrack.count_crack_candidates()计算，为None时总数为已进行的各次破解之和。
+        """
+        with self.__lock:
+            self.__progress_done = 0
+            self.__progress_total = total
+
+    def get_progress(self) -> Tuple[int, Optional[int]]:
+        """返回会话中已结束的各次破解已测试的候选UID数量及整个破解计划的候选UID总数。
+
+        Returns:
+            Tuple[int, Optional[int]]: 已测试的候选UID数量及候选UID总数，未设置总数时为None。
+        """
+        with self.__lock:
+            return self.__progress_done, self.__progress_total
+
+    def add_progress(self, tested: int, retried: int = 0):
+        """记录一次破解结束时已测试的候选UID数量。
+
+        Args:
+            tested (int): 本次破解已测试的候选UID数量。
+            retried (int, optional): 需要重新测试的候选UID数量，例如破解后端运行失败后换用其它
+                破解后端重新破解时为失败前已测试的数量，计入整个破解计划的候选UID总数。
+        """
+        with self.__lock:
+            self.__progress_done += tested
+            if self.__progress_total is not None:
+                self.__progress_total += retried
+
+    def get_plan(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """返回缓存的计划，若无则调用factory生成并缓存。
+
+        Args:
+            key (Hashable): 计划的键，应包含影响计划的所有参数。
+            factory (Callable[[], Any]): 生成计划的函数，返回值不应被修改。
+
+        Returns:
+            Any: 计划。
+        """
+        with self.__lock:
+            if key in self.__plans:
+                self.__stats['plan_hits'] += 1
+                return self.__plans[key]
+
+        plan = factory()
+        with self.__lock:
+            self.__stats['plan_misses'] += 1
+            return self.__plans.setdefault(key, plan)
+
+    def get_file(self, key: Hashable, prefix: str, factory: Callable[[], str]) -> str:
+        """返回缓存的文件的路径，若无则将factory生成的文本写入工作目录中的新文件。
+
+        Args:
+            key (Hashable): 文件的键，应包含影响文件内容的所有参数。
+            prefix (str): 文件名的前缀。
+            factory (Callable[[], str]): 生成文件内容的函数。
+
+        Returns:
+            str: 文件的绝对路径，文件在会话关闭前不会被删除，不应被修改。
+        """
+        with self.__lock:
+            if key in self.__files:
+                self.__stats['file_hits'] += 1
+                return self.__files[key]
+
+        path = self.create_file(prefix, factory())
+        with self.__lock:
+            self.__stats['file_misses'] += 1
+            if key in self.__files:
+                os.remove(path)
+            return self.__files.setdefault(key, path)
+
+    def create_file(self, prefix: str, text: str = '') -> str:
+        """在工作目录中创建一个新文件，用于单次破解的哈希文件、输出文件及字典文件等。
+
+        Args:
+            prefix (str): 文件名的前缀。
+            text (str, optional): 文件的内容。
+
+        Returns:
+            str: 文件的绝对路径，使用后应调用remove_file()删除。
+        """
+        if self.__closed:
+            raise ValueError('破解会话已关闭')
+
+        with self.__lock:
+            self.__file_count += 1
+            path = os.path.join(self.__workspace, f'{prefix}{os.getpid()}_{self.__file_count}.txt')
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        return path
+
+    def remove_file(self, path: str):
+        """删除create_file()创建的文件。
+
+        Args:
+            path (str): 文件的路径。
+        """
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_stats(self) -> Dict[str, int]:
+        """返回计划及文件缓存的命中次数。
+
+        Returns:
+            Dict[str, int]: 包含plan_hits、plan_misses、file_hits和file_misses。
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def close(self):
+        """关闭会话，清空缓存，若工作目录为自动创建的则删除工作目录，否则只删除缓存的文件。
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+
+        with self.__lock:
+            files = list(self.__files.values())
+            self.__files.clear()
+            self.__plans.clear()
+
+        if self.__owns_workspace:
+            shutil.rmtree(self.__workspace, ignore_errors=True)
+        else:
+            for path in files:
+                self.remove_file(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f'CrackSession({self.__workspace!r})'
@@ -0,0 +1,218 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class Span:
+    """一个破解阶段的耗时记录。
+
+    Attributes:
+        name (str): 阶段名称，如plan、generate、write、startup、crack、parse、task。
+        attrs (Dict): 阶段的附加信息，如UID范围、UID段序号、候选UID数量等。
+        start (float): 阶段开始时间，为time.perf_counter()的值。
+        duration (float): 阶段耗时，单位为秒。
+        peak_memory (Optional[int]): 阶段内Python分配内存的峰值，单位为字节，未开启内存追踪时为None。
+    """
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+        self.peak_memory = None
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'duration': self.duration}
+        data.update(self.attrs)
+        if self.peak_memory is not None:
+            data['peak_memory'] = self.peak_memory
+        return data
+
+    def __repr__(self):
+        return f'Span({self.name!r}, duration={self.duration:.6f}, attrs={self.attrs!r})'
+
+
+class Tracer:
+    """记录破解过程中各个阶段耗时的追踪器。
+
+    阶段的划分如下：
+        plan: 生成掩码、划分16位UID段等破解计划的计算。
+        generate: 生成16位UID字典。
+        write: 写入字典文件、掩码文件等临时文件。
+        startup: 启动破解程序至破解程序输出首个状态行，包括计算设备及内核的初始化。
+        crack: 破解程序输出首个状态行至破解程序退出。
+        parse: 读取并解析破解程序的输出文件。
+        task: 一次破解程序的运行，包含startup、crack和parse，附带UID范围、UID段
+            序号、候选UID数量及破解后端等信息。
+        prewarm: 在后台运行的一次hashcat预热，附带攻击模式、MD5类型及返回码。
+        prewarm_wait: 破解前等待预热结束。
+        first_candidate: 调用破解方法至首次运行的破解程序输出首个状态行，即开始测试
+            候选UID的耗时。
+        query: 同时查询和本地破解时，使用aicu.cc查询的耗时，附带查询得到的UID及错误信息。
+        queue: 使用设备仲裁器时，运行破解程序前排队等待计算设备的耗时，附带资源名称及
+            分配到的槽位。
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        Args:
+            trace_memory (bool, optional): 是否使用tracemalloc记录每个阶段的内存峰值，开启后会降低运行速度。
+        """
+        self.__trace_memory = trace_memory
+        self.__spans = []
+        self.__stack = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def spans(self) -> List[Span]:
+        """已结束的阶段记录，按结束的先后排列。
+        """
+        return list(self.__spans)
+
+    def clear(self):
+        """清除所有阶段记录。
+        """
+        self.__spans.clear()
+
+    def record(self, name: str, start: float, duration: float, **attrs) -> Span:
+        """添加一个已结束的阶段记录，用于无法用with语句块包裹的阶段。
+
+        Args:
+            name (str): 阶段名称。
+            start (float): 阶段开始时间，为time.perf_counter()的值。
+            duration (float): 阶段耗时，单位为秒。
+            **attrs: 阶段的附加信息。
+
+        Returns:
+            Span: 阶段记录。
+        """
+        span = Span(name, attrs)
+        span.start = start
+        span.duration = duration
+        self.__spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """记录with语句块的耗时，可以嵌套使用。
+
+        Args:
+            name (str): 阶段名称。
+            **attrs: 阶段的附加信息，也可以在with语句块中通过Span.attrs添加。
+
+        Yields:
+            Span: 阶段记录。
+        """
+        span = Span(name, attrs)
+        self.__update_peak_memory()
+        self.__stack.append(span)
+        span.start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self.__update_peak_memory()
+            self.__stack.pop()
+            self.__spans.append(span)
+
+    def __update_peak_memory(self):
+        """将当前内存峰值计入所有未结束的阶段，并重置内存峰值以便分别统计嵌套的阶段。
+        """
+        if not self.__trace_memory or not tracemalloc.is_tracing():
+            return
+
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self.__stack:
+            span.peak_memory = max(span.peak_memory or 0, peak)
+
+        # Python 3.9之前没有reset_peak()，此时内存峰值为开始追踪以来的峰值
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def get_stage_summary(self) -> Dict[str, Dict]:
+        """按阶段名称汇总耗时。
+
+        Returns:
+            Dict[str, Dict]: 键为阶段名称，值包含count（次数）、seconds（总耗时）和
+                peak_memory（内存峰值，未开启内存追踪时为None）。
+        """
+        summary = {}
+        for span in self.__spans:
+            stage = summary.setdefault(span.name, {'count': 0, 'seconds': 0.0, 'peak_memory': None})
+            stage['count'] += 1
+            stage['seconds'] += span.duration
+            if span.peak_memory is not None:
+                stage['peak_memory'] = max(stage['peak_memory'] or 0, span.peak_memory)
+        return summary
+
+    def get_tasks(self) -> List[Dict]:
+        """返回每次运行破解程序的记录。
+
+        Returns:
+            List[Dict]: 每次运行的UID范围、UID段序号、候选UID数量、已测试的UID数量、
+                破解后端、耗时及有效破解速度（hashes_per_second）。
+        """
+        tasks = []
+        for span in self.__spans:
+            if span.name != 'task':
+                continue
+            task = span.to_dict()
+            del task['name']
+            tested = span.attrs.get('tested', span.attrs.get('candidates', 0))
+            task['hashes_per_second'] = tested / span.duration if span.duration > 0 else None
+            tasks.append(task)
+        return tasks
+
+    def get_ranges(self) -> List[Dict]:
+        """按UID范围汇总每次运行破解程序的记录。
+
+        Returns:
+            List[Dict]: 每个UID范围的破解后端、运行次数、耗时、候选UID数量、已测试的UID数量
+                及有效破解速度（hashes_per_second）。
+        """
+        ranges = {}
+        for task in self.get_tasks():
+            key = (task['backend'], tuple(task['uid_range']))
+            item = ranges.setdefault(key, {
+                'uid_range': task['uid_range'],
+                'backend': task['backend'],
+                'tasks': 0,
+                'duration': 0.0,
+                'candidates': 0,
+                'tested': 0,
+            })
+            item['tasks'] += 1
+            item['duration'] += task['duration']
+            item['candidates'] += task.get('candidates', 0)
+            item['tested'] += task.get('tested', task.get('candidates', 0))
+
+        for item in ranges.values():
+            item['hashes_per_second'] = item['tested'] / item['duration'] if item['duration'] > 0 else None
+        return list(ranges.values())
+
+    def get_time_to_first_candidate(self) -> Optional[float]:
+        """返回首次调用破解方法至开始测试候选UID的耗时。
+
+        Returns:
+            Optional[float]: 首个first_candidate阶段的耗时（秒），若无则返回None。
+        """
+        for span in self.__spans:
+            if span.name == 'first_candidate':
+                return span.duration
+        return None
+
+    def get_report(self) -> Dict:
+        """生成可以序列化为JSON的运行报告。
+
+        Returns:
+            Dict: 包含time_to_first_candidate（开始测试候选UID的耗时）、stages（各阶段
+                耗时汇总）、ranges（每个UID范围的记录）和tasks（每次运行破解程序的记录）。
+        """
+        return {
+            'time_to_first_candidate': self.get_time_to_first_candidate(),
+            'stages': self.get_stage_summary(),
+            'ranges': self.get_ranges(),
+            'tasks': self.get_tasks(),
+        }
@@ -6,10 +6,13 @@ import platform
 from typing import List, Optional
 from urllib.parse import urlparse, parse_qs
 
-from curl_cffi import requests
-
 from .exceptions import *
 from .uid_range import UidRange
+from .profile import load_host_profile, update_host_profile
+
+
+# 破解程序探测结果的进程内缓存，键为探测命令，值为(程序文件的修改时间和大小, 输出)
+_probe_memo = {}
 
 
 def check_md5(md5: Optional[str]) -> bool:
@@ -53,6 +56,52 @@ def check_is_url_shared_from_web(url: str) -> bool:
     return share_source == 'copy_web'
 
 
+def probe_executable(executable: str, args: str = '', all_lines: bool = False) -> str:
+    """运行可执行程序并返回其输出的第一行，用于判断程序类型及获取版本。
+
+    探测结果按程序的路径、修改时间及大小缓存在进程内和本机配置中，程序文件未改变时
+    不会再次运行程序，因而每个程序至多被探测一次。
+
+    Args:
+        executable (str): 可执行程序的绝对路径。
+        args (str, optional): 运行程序时的参数。
+        all_lines (bool, optional): 是否返回全部输出而不只是第一行。
+
+    Returns:
+        str: 程序输出的第一行（或全部输出），程序不存在时返回空字符串。
+    """
+    try:
+        stat = os.stat(executable)
+    except OSError:
+        return ''
+
+    command = f'"{executable}" {args}'.strip()
+    memo_key = f'{command}\n' if all_lines else command
+    signature = [stat.st_mtime_ns, stat.st_size]
+    memo = _probe_memo.get(memo_key)
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+
+    probes = load_host_profile().get('probes', {})
+    cached = probes.get(memo_key)
+    if isinstance(cached, dict) and cached.get('signature') == signature:
+        output = cached.get('output', '')
+    else:
+        output = os.popen(command).read().strip()
+        if not all_lines:
+            output = output.split('\n')[0]
+        # 探测失败时不缓存，以免程序临时无法运行导致之后一直被认为不可用
+        if output != '':
+            try:
+                update_host_profile('probes', {memo_key: {'signature': signature, 'output': output}})
+            except OSError:
+                pass
+
+    if output != '':
+        _probe_memo[memo_key] = (signature, output)
+    return output
+
+
 def get_hashcat_executable(hashcat: Optional[str] = None) -> str:
     """获取hashcat的可执行程序的绝对路径。
 
@@ -75,11 +124,24 @@ def get_hashcat_executable(hashcat: Optional[str] = None) -> str:
         if hashcat:
             hashcat_abspath = os.path.abspath(hashcat)
 
-    if hashcat_abspath is None or not os.popen(f'{hashcat_abspath} --version').read().startswith('v'):
+    if hashcat_abspath is None or not probe_executable(hashcat_abspath, '--version').startswith('v'):
         raise HashcatNotFoundException('未找到hashcat程序' + str(hashcat))
 
     return hashcat_abspath
 
+
+def get_hashcat_device_types(hashcat: str) -> List[str]:
+    """返回hashcat -I列出的计算设备的类型，结果与probe_executable()一样被缓存。
+
+    Args:
+        hashcat (str): hashcat可执行程序的绝对路径。
+
+    Returns:
+        List[str]: 按设备序号排列的设备类型，例如GPU或CPU，无法获取时为空列表。
+    """
+    output = probe_executable(hashcat, '-I --quiet', all_lines=True)
+    return re.findall(r'^\s*Type\.*:\s*(\S+)', output, re.MULTILINE)
+
     
 def get_john_executable(john: Optional[str] = None) -> str:
     """获取John the Ripper的可执行程序的绝对路径。
@@ -101,7 +163,7 @@ def get_john_executable(john: Optional[str] = None) -> str:
         if john:
             john_abspath = os.path.abspath(john)
 
-    if john_abspath is None or not os.popen(john_abspath).read().startswith('John the Ripper'):
+    if john_abspath is None or not probe_executable(john_abspath).startswith('John the Ripper'):
         raise JohnNotFoundException('未找到john程序' + str(john))
 
     return john_abspath
@@ -162,6 +224,48 @@ def merge_uid_ranges(uid_ranges: List[UidRange]) -> List[UidRange]:
     return merged
 
 
+def get_available_memory() -> Optional[int]:
+    """获取本机当前可用的物理内存。
+
+    Returns:
+        Optional[int]: 可用内存的字节数，无法获取时返回None。
+    """
+    try:
+        with open('/proc/meminfo', 'r', encoding='utf-8') as fp:
+            for line in fp:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if platform.system() == 'Windows':
+        import ctypes
+
+        class MemoryStatusEx(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatusEx()
+        status.dwLength = ctypes.sizeof(MemoryStatusEx)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
 def query_uid_with_md5(md5: str, **kwargs) -> int:
     """使用aicu.cc查询MD5对应的UID。
 
@@ -175,6 +279,9 @@ def query_uid_with_md5(md5: str, **kwargs) -> int:
     Returns:
         int: 返回查询得到的UID，若无则返回-1。
     """
+    # curl_cffi的导入耗时较长，仅在需要查询时导入
+    from curl_cffi import requests
+
     uid = -1
     url = f'https://api.aicu.cc/api/v3/tool/hash2uid?hash={md5}'
     response = requests.get(url, impersonate='chrome110', **kwargs)
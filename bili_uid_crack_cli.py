@@ -37,19 +37,22 @@ hashcat和（或）John the Ripper，并且添加进PATH环境变量， 或者
 项目地址：https://github.com/jiarandiana0307/bili-uid-crack
 """
 
+import json
 import time
+import shutil
 import argparse
 from typing import Optional
 
 from bili_uid_crack import *
+from bili_uid_crack.profile import get_data_dir, get_host_profile_path
 
 
-def get_uid_ranges_from_args(args: Optional[argparse.Namespace]) -> List[UidRange]:
-    """从命令行参数中获取指定的UID范围，若命令行参数没有提供UID范围则使用默认的UID范围。
+def get_uid_ranges_from_args(args: Optional[argparse.Namespace], range_table: Optional[RangeTable] = None) -> List[UidRange]:
+    """从命令行参数中获取指定的UID范围，若命令行参数没有提供UID范围则使用号段表或默认的UID范围。
     """
     uid_ranges = []
     if args.range is None:
-        uid_ranges.extend(UID_RANGES_ALL)
+        uid_ranges.extend(UID_RANGES_ALL if range_table is None else range_table.get_uid_ranges())
     else:
         for uid_range in args.range:
             uid_range = UidRange(*uid_range)
@@ -67,8 +70,96 @@ def get_readable_time(total_seconds: float) -> str:
     hours = int((total_seconds) / 3600)
     return f"耗时: {hours:02d}:{minutes:02d}:{seconds:06.3f}"
 
+
+def get_readable_speed(speed: float) -> str:
+    for unit in ['', 'k', 'M', 'G', 'T']:
+        if speed < 1000 or unit == 'T':
+            break
+        speed /= 1000
+    return f'{speed:.2f} {unit}H/s'
+
+
+def print_progress(event: CrackProgress):
+    """在同一行中刷新显示破解进度。
+    """
+    if event.eta is None:
+        eta = '--:--:--'
+    else:
+        eta = f'{int(event.eta / 3600):02d}:{int(event.eta / 60) % 60:02d}:{int(event.eta) % 60:02d}'
+
+    uid_range = '' if event.uid_range is None else f'[{event.uid_range.start}, {event.uid_range.end}]'
+    line = (f'[{event.backend}] {uid_range} {event.segment}/{event.segment_count} | '
+            f'{event.tested}/{event.total} ({event.percent:.2f}%) | {get_readable_speed(event.speed)} | 剩余: {eta}')
+    width = shutil.get_terminal_size().columns - 4
+    print('\r' + line[:width].ljust(width), end='', flush=True)
+
+
+def print_plan(plan: CrackPlan):
+    """显示一个破解后端的破解计划。
+    """
+    print(f"破解计划（{plan.backend}，{'标准' if plan.is_standard_md5 else '非标准'}MD5）：")
+    for range_plan in plan.ranges:
+        seconds = '预计耗时: 未知' if range_plan.seconds is None else '预计' + get_readable_time(range_plan.seconds)
+        print(f'[{range_plan.uid_range.start}, {range_plan.uid_range.end}] 候选UID: {range_plan.candidates} 启动次数: {range_plan.startups} {seconds}')
+
+    seconds = '预计耗时: 未知，请先使用--calibrate参数校准' if plan.seconds is None else '预计' + get_readable_time(plan.seconds)
+    print(f'合计 候选UID: {plan.candidates} 启动次数: {plan.startups} {seconds}')
+    print()
+
+
+def print_tuning(tuning: dict):
+    """显示自动调优的结果。
+    """
+    print('调优结果：')
+    print(f"负载模式(-w): {tuning['workload_profile']}")
+    print(f"优化内核(-O): {'是' if tuning['optimized_kernel'] else '否'}")
+    print(f"内核参数(-n -u): {tuning['kernel_accel'] or '自动'} {tuning['kernel_loops'] or '自动'}")
+    print(f"16位UID每段的区间数量: {tuning['uid16_max_interval_num']}")
+    print(f"启动耗时: {tuning['startup_seconds']:.3f} 秒，破解速度: {get_readable_speed(tuning['hashes_per_second'])}")
+    print()
+
     
-def save_result(outfile: str, md5: str, uid: int, method: str, is_standard_md5: Optional[bool] = None, uid_ranges: Optional[List[UidRange]] = None):
+def print_fit_stats(stats: dict):
+    print(f'已读取UID: {stats["uids"]}，忽略UID: {stats["ignored"]}')
+    for era in stats['eras']:
+        start, end = era['range_before']
+        if not era['fitted']:
+            print(f'[{start}, {end}] 样本: {era["samples"]}，样本不足，保持不变')
+            continue
+        new_start, new_end = era['range_after']
+        removed = era['removed']
+        line = f'[{start}, {end}] -> [{new_start}, {new_end}] 样本: {era["samples"]} 候选UID: {era["candidates_before"]} -> {era["candidates_after"]}'
+        line += f' 边界去除: {removed["bounds"]}'
+        if era['uid16'] is not None:
+            uid16 = era['uid16']
+            line += f' 步长: {uid16["step"]} 去除: {removed["step"]} 区间: [+{uid16["offset"]}, +{uid16["offset"] + uid16["interval_len"]}) 去除: {removed["interval_len"]}'
+        print(line)
+
+    before = stats['candidates_before']
+    after = stats['candidates_after']
+    print(f'合计 候选UID: {before} -> {after}，减少 {(before - after) / before * 100 if before > 0 else 0:.2f}%')
+
+
+def save_result(outfile: Optional[str], md5: str, uid: int, method: str, is_standard_md5: Optional[bool] = None, uid_ranges: Optional[List[UidRange]] = None,
+                report: Optional[str] = None, tracer: Optional[Tracer] = None, cost_seconds: Optional[float] = None):
+    if report is not None:
+        data = {
+            'md5': md5,
+            'uid': uid if uid > 0 else None,
+            'is_standard_md5': is_standard_md5,
+            'method': method,
+            'uid_ranges': None if uid_ranges is None else [[x.start, x.end] for x in uid_ranges],
+            'seconds': cost_seconds,
+        }
+        if tracer is not None:
+            data.update(tracer.get_report())
+
+        with open(report, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp, ensure_ascii=False, indent=2)
+
+    if outfile is None:
+        return
+
     text = ''
     if uid > 0:
         text = f"MD5: {md5}\nUID: {uid}\nIsStandardMD5: {'Unknown' if is_standard_md5 is None else is_standard_md5}\n"
@@ -97,8 +188,25 @@ def main():
     parser.add_argument('--hashcat', help='使用指定的hashcat破解程序。')
     parser.add_argument('--backend-ignore-cuda', action='store_true', help='在运行hashcat时忽略CUDA。当使用CUDA导致hashcat运行失败，报错"Kernel ./OpenCL/shared.cl build failed."时可以使用此参数解决。')
     parser.add_argument('--john', help='使用指定的John the Ripper破解程序，注意，若john只能破解标准MD5，无法破解非标准的MD5，也就是说john只能破解在网页端点击视频分享按钮得到的视频分享链接。')
+    parser.add_argument('--opencl', action='store_true', help='启用OpenCL破解后端，使用PyOpenCL在OpenCL设备上运行内置的MD5内核进行破解，支持标准和非标准MD5，在hashcat不可用或运行失败时使用。需要安装pyopencl，只有CPU时可安装pocl-binary-distribution，可通过PYOPENCL_CTX环境变量选择计算设备。')
     parser.add_argument('--aicu', action='store_true', help='指定直接调用aicu.cc网站的接口查询MD5或URL对应的UID，使用此参数时仅需提供--url或--md5参数即可。通过此方法仅能查询已存在账号的UID，若查询的MD5对应的UID是一个不存在的B站账号则返回结果为空。')
+    parser.add_argument('--hedge', action='store_true', help='同时调用aicu.cc网站的接口查询和本地破解，使用先得到的UID并停止另一方。aicu.cc没有记录或查询出错时本地破解继续进行。')
+    parser.add_argument('--hedge-timeout', type=float, default=10.0, help='使用--hedge参数时aicu.cc查询的超时时间（秒），本地破解结束后最多等待查询结果的时间也不超过此值，默认为10秒。')
     parser.add_argument('-o', '--outfile', help='指定结果的保存路径。')
+    parser.add_argument('--plan', action='store_true', help='仅显示破解计划而不进行破解，包括每个UID范围需要测试的候选UID数量、破解程序的启动次数，以及根据校准结果预计的耗时。未提供--url和--md5参数时显示标准和非标准MD5的破解计划。')
+    parser.add_argument('--calibrate', action='store_true', help='校准本机的破解速度并保存，用于--plan参数预计破解耗时。在每个UID号段（或--range参数指定的范围）中随机选取子范围进行短时的破解，测量破解程序的启动耗时及破解速度。')
+    parser.add_argument('--autotune', action='store_true', help='根据本机的情况自动选取hashcat的负载模式（-w）、是否使用优化内核（-O）、内核参数（-n和-u）以及16位UID每段的大小并保存，之后的破解会自动使用。调优后应重新使用--calibrate参数校准。')
+    parser.add_argument('--prewarm', action='store_true', help='找到hashcat后立即在后台运行极小的破解任务预热hashcat，使计算设备的初始化及内核的编译或加载与程序的其它准备工作同时进行。')
+    parser.add_argument('--priority', type=int, default=0, help='指定本次破解在本机排队使用计算设备的优先级，数值越大越优先，默认为0。本机同时运行的多个破解任务会依次使用计算设备而不是同时运行互相争抢，优先级相同时先到先得，排队时间较长的任务优先级会逐渐提高。')
+    parser.add_argument('--device-slots', type=int, default=1, help='指定排队使用计算设备时本机可同时分配的计算设备数量，默认为1。大于1时每个hashcat任务只使用分配到的一个设备（hashcat的-d参数）。')
+    parser.add_argument('--cpu-slots', type=int, default=1, help='指定排队使用CPU时本机可同时分配的CPU槽位数量，默认为1。john、只有CPU设备的hashcat及CPU上的OpenCL设备各占用一个槽位，它们通常会使用所有CPU核心，因此只在这些任务限制了使用的核心数时才应增大此值。')
+    parser.add_argument('--no-queue', action='store_true', help='不与本机同时运行的其它破解任务排队，直接使用计算设备。')
+    parser.add_argument('--occupancy', nargs='?', const='', help='使用UID块占用索引，破解时跳过索引中没有账号的UID块，不指定路径时使用默认位置的索引。注意，不在构建索引的UID样本中的块内的UID将无法破解。')
+    parser.add_argument('--build-occupancy', metavar='UID_FILE', help='根据每行一个UID的文件构建UID块占用索引，保存至--occupancy参数指定的路径或默认位置。指定此参数时忽略其它参数。')
+    parser.add_argument('--range-table', nargs='?', const='', help='使用UID号段表代替内置的UID号段及16位UID分布规律，不指定路径时使用默认位置的号段表。')
+    parser.add_argument('--fit-ranges', metavar='UID_FILE', help='根据每行一个UID的文件拟合每个UID号段的边界以及16位UID的步长和区间长度，将号段表保存至--range-table参数指定的路径或默认位置，并显示每项改变去除的候选UID数量。指定此参数时忽略其它参数。')
+    parser.add_argument('--report', help='指定JSON格式的运行报告的保存路径，报告包含开始测试候选UID的耗时、各个破解阶段的耗时以及每个UID范围和UID段的耗时、候选UID数量、破解程序及有效破解速度。')
+    parser.add_argument('--trace-memory', action='store_true', help='在运行报告中记录各个破解阶段的Python内存峰值，会降低运行速度。')
     args = parser.parse_args()
 
     if args.uid is not None:
@@ -107,9 +215,50 @@ def main():
         print(f'非标准MD5: {uid_to_md5(args.uid, False)}')
         return
 
+    occupancy_path = None
+    if args.occupancy is not None:
+        occupancy_path = os.path.abspath(args.occupancy) if args.occupancy != '' else os.path.join(get_data_dir(), 'occupancy.idx')
+
+    range_table_path = None
+    if args.range_table is not None:
+        range_table_path = os.path.abspath(args.range_table) if args.range_table != '' else os.path.join(get_data_dir(), 'range_table.json')
+
+    if args.fit_ranges is not None:
+        if range_table_path is None:
+            range_table_path = os.path.join(get_data_dir(), 'range_table.json')
+        print('开始拟合UID号段:', args.fit_ranges)
+        try:
+            range_table, stats = fit_range_table(read_uid_file(args.fit_ranges))
+            range_table.save(range_table_path)
+        except OSError as e:
+            print(e)
+            return
+        print_fit_stats(stats)
+        print('已保存UID号段表至', f'"{range_table_path}"')
+        return
+
+    if args.build_occupancy is not None:
+        if occupancy_path is None:
+            occupancy_path = os.path.join(get_data_dir(), 'occupancy.idx')
+        print('开始构建UID块占用索引:', args.build_occupancy)
+        try:
+            stats = build_occupancy_index(read_uid_file(args.build_occupancy), occupancy_path)
+        except (OSError, MemoryError, OverflowError, ValueError) as e:
+            print('无法构建UID块占用索引:', repr(e) if isinstance(e, MemoryError) else e)
+            return
+        print(f'已读取UID: {stats["uids"]}，忽略无效UID: {stats["ignored"]}')
+        for section in stats['sections']:
+            print(f'UID范围: [{section["start"]}, {section["end"]}]，块大小: {section["block_size"]}，有账号的块: {section["occupied_blocks"]}/{section["block_count"]}')
+        if not any([x['block_size'] == UID16_STEP for x in stats['sections']]):
+            print('注意：UID文件中没有有效的16位UID，索引不包含16位UID，破解16位UID时不会跳过任何UID块。')
+        if not any([x['start'] == 0 for x in stats['sections']]):
+            print('注意：UID文件中没有10位以内的UID，索引不包含10位以内的UID，破解10位以内的UID时不会跳过任何UID块。')
+        print('已保存UID块占用索引至', f'"{occupancy_path}"')
+        return
+
     url = args.url
     md5 = args.md5
-    if url is None and md5 is None:
+    if url is None and md5 is None and not args.plan and not args.calibrate and not args.autotune:
         parser.print_help()
         return
     
@@ -131,9 +280,19 @@ def main():
             print('无效的输出文件，存在同名文件夹', os.path.abspath(args.outfile))
             return
 
+    report = None
+    if args.report is not None:
+        report = os.path.abspath(args.report)
+        if os.path.isdir(report):
+            print('无效的报告文件，存在同名文件夹', report)
+            return
+
+    tracer = Tracer(args.trace_memory)
+
     uid = -1
+    method = 'Query' if args.aicu and not args.hedge else 'Crack'
 
-    if args.aicu:
+    if args.aicu and not args.hedge and not args.plan and not args.calibrate and not args.autotune:
         try:
             start = time.time()
             if url:
@@ -146,9 +305,18 @@ def main():
             return
 
     else:
+        range_table = None
+        if range_table_path is not None:
+            try:
+                range_table = RangeTable.load(range_table_path)
+            except (OSError, InvalidRangeTableException) as e:
+                print('无法读取UID号段表:', e)
+                return
+            print('已加载UID号段表:', range_table_path)
+
         uid_ranges = []
         try:
-            uid_ranges = get_uid_ranges_from_args(args)
+            uid_ranges = get_uid_ranges_from_args(args, range_table)
             uid_ranges = merge_uid_ranges(uid_ranges)
         except Exception as e:
             print(e)
@@ -172,12 +340,42 @@ def main():
             else:
                 print('未找到指定的john程序:', args.john)
 
+        occupancy = None
+        if occupancy_path is not None:
+            try:
+                occupancy = OccupancyIndex(occupancy_path)
+            except (OSError, InvalidOccupancyIndexException) as e:
+                print('无法读取UID块占用索引:', e)
+                return
+            print('已加载UID块占用索引:', occupancy_path)
+
+        arbiter = None
+        if not args.no_queue:
+            arbiter = DeviceArbiter(priority=args.priority, device_slots=args.device_slots, cpu_slots=args.cpu_slots)
+            try:
+                os.makedirs(arbiter.lock_dir, exist_ok=True)
+            except OSError as e:
+                print('无法创建计算设备的锁目录，不与本机的其它破解任务排队:', e)
+                arbiter = None
+            if arbiter is not None and args.priority != 0:
+                print(f'本机排队使用计算设备的优先级: {arbiter.priority}')
+
         try:
-            cracker = BiliUidCrack(hashcat, john, args.backend_ignore_cuda)
+            cracker = BiliUidCrack(hashcat, john, args.backend_ignore_cuda, print_progress, tracer, args.prewarm, occupancy, range_table, args.opencl,
+                                   arbiter, arbiter is not None)
         except NoAvailableCrackerException:
             print('未找到可用的hashcat或John the Ripper破解程序，请将hashcat或john程序所在目录添加至PATH系统环境变量，或使用--hashcat或--john参数分别指定破解程序的位置。')
+            if args.opencl:
+                print('OpenCL破解后端不可用，请确认已安装pyopencl及OpenCL驱动。')
             return
 
+        opencl_device = cracker.get_opencl_device()
+        if args.opencl:
+            if opencl_device is None:
+                print('OpenCL破解后端不可用，请确认已安装pyopencl及OpenCL驱动。')
+            else:
+                print('已启用OpenCL破解后端:', opencl_device)
+
         if hashcat:
             hashcat_version = cracker.get_hashcat_version().base_version
             print(f'已找到hashcat v{hashcat_version}:', hashcat)
@@ -186,6 +384,40 @@ def main():
             john_version = cracker.get_john_version().base_version
             print(f'已找到john v{john_version}:', john)
 
+        if args.autotune:
+            if not hashcat:
+                print('自动调优需要使用hashcat。')
+                return
+            print('开始自动调优，需要较长时间，请耐心等待。')
+            tuning = cracker.autotune()
+            print()
+            print_tuning(tuning)
+            print('已保存调优结果至', f'"{get_host_profile_path()}"')
+            if not args.calibrate:
+                return
+            print()
+
+        if args.calibrate:
+            print('开始校准本机的破解速度，需要较长时间，请耐心等待。')
+            cracker.calibrate(uid_ranges)
+            print()
+            print('已保存校准结果至', f'"{get_host_profile_path()}"')
+            return
+
+        if url is not None:
+            md5_types = [check_is_url_shared_from_web(url)]
+        elif args.standard != args.non_standard:
+            md5_types = [args.standard]
+        else:
+            md5_types = [True, False]
+
+        if args.plan:
+            print()
+            for is_standard_md5 in md5_types:
+                for plan in cracker.plan_crack(is_standard_md5, uid_ranges):
+                    print_plan(plan)
+            return
+
         print(f'开始破解MD5: {md5}')
 
         print('尝试破解的UID范围：')
@@ -193,40 +425,88 @@ def main():
             print(f'[{uid_range.start}, {uid_range.end}]')
         print()
 
+        # 每次调用crack_from_md5()时的进度只针对该次调用，换算为整个破解计划的进度后再显示，
+        # 使依次破解多个UID范围及两种MD5时剩余时间不会在每个范围重新开始计算
+        def count_plan_candidates(is_standard_md5: bool, ranges: List[UidRange]) -> int:
+            return BiliUidCrack.count_candidates(is_standard_md5, ranges, occupancy, range_table)
+
+        if url is not None:
+            plan_total = count_plan_candidates(check_is_url_shared_from_web(url), uid_ranges)
+        elif args.standard != args.non_standard:
+            plan_total = count_plan_candidates(args.standard, uid_ranges)
+        else:
+            plan_total = count_plan_candidates(True, uid_ranges) + count_plan_candidates(False, uid_ranges)
+        plan_done = 0
+
+        def on_progress(event: CrackProgress):
+            tested = min(plan_done + event.tested, plan_total)
+            eta = (plan_total - tested) / event.speed if event.speed > 0 else None
+            print_progress(CrackProgress(event.backend, event.uid_range, event.segment, event.segment_count,
+                                         tested, plan_total, event.speed, eta))
+
+        cracker.set_progress_callback(on_progress)
+
         start = time.time()
 
         is_standard_md5 = None
 
-        try:
+        def crack(session: CrackSession) -> int:
+            nonlocal is_standard_md5
+            uid = -1
             if url is not None:
-                uid = cracker.crack_from_url(url, uid_ranges)
+                uid = cracker.crack_from_url(url, uid_ranges, session)
                 is_standard_md5 = check_is_url_shared_from_web(url)
 
             else:
                 if args.standard and not args.non_standard:
-                    uid = cracker.crack_from_md5(md5, args.standard, uid_ranges)
+                    uid = cracker.crack_from_md5(md5, args.standard, uid_ranges, session)
                     is_standard_md5 = True
 
                 elif not args.standard and args.non_standard:
-                    uid = cracker.crack_from_md5(md5, args.standard, uid_ranges)
+                    uid = cracker.crack_from_md5(md5, args.standard, uid_ranges, session)
                     is_standard_md5 = False
 
                 else:
-                    if hashcat is None and john is not None:
+                    if hashcat is None and opencl_device is None and john is not None:
                         raise JohnCrackNonStandardMd5Exception()
 
                     for uid_range in uid_ranges:
                         count = uid_range.end - uid_range.start + 1
                         print(f'正在尝试{uid_range.start}到{uid_range.end}共{count}个UID\n')
 
-                        uid = cracker.crack_from_md5(md5, True, [uid_range])
+                        uid = cracker.crack_from_md5(md5, True, [uid_range], session)
                         is_standard_md5 = True
                         if uid == -1:
-                            uid = cracker.crack_from_md5(md5, False, [uid_range])
+                            uid = cracker.crack_from_md5(md5, False, [uid_range], session)
                             is_standard_md5 = False
+                        print()
 
                         if uid > 0:
                             break
+            return uid
+
+        def on_query(query_uid: int, error: Optional[Exception]):
+            if error is not None:
+                print(f'\n请求api.aicu.cc接口错误，继续本地破解: {error}')
+            elif query_uid > 0:
+                print('\naicu.cc已查询到UID，停止本地破解。')
+            else:
+                print('\naicu.cc没有记录，继续本地破解。')
+
+        # 依次破解多个UID范围及两种MD5时复用同一个会话中的工作目录、掩码文件及UID段
+        session = CrackSession()
+        # 依次破解的各个UID范围及MD5类型共同组成破解计划，显示的进度及剩余时间均针对整个计划
+        session.set_progress_total(sum([cracker.count_crack_candidates(x, uid_ranges, session) for x in md5_types]))
+        try:
+            if args.hedge:
+                print('同时使用aicu.cc查询及本地破解。\n')
+                # 本地破解结束后仍需等待查询的结果，因此限制查询的耗时
+                uid, source = run_hedged(lambda: query_uid_with_md5(md5, timeout=args.hedge_timeout), crack, session, tracer, on_query,
+                                         args.hedge_timeout)
+                if source == 'query':
+                    method = 'Query'
+            else:
+                uid = crack(session)
 
             print()
 
@@ -240,16 +520,21 @@ def main():
         except NoAvailableCrackerException:
             if hashcat:
                 print('hashcat运行失败。')
+            if opencl_device:
+                print('OpenCL破解后端运行失败。')
             if john:
                 print('John the Ripper运行失败。')
             print('破解程序运行失败，退出程序。')
             return
+
+        finally:
+            session.close()
     
     end = time.time()
 
     if uid > 0:
         print('已破解MD5:', md5)
-        if not args.aicu:
+        if method == 'Crack':
             print(f"MD5为{'标准' if is_standard_md5 else '非标准'}MD5，来自于网页端{'视频分享链接' if is_standard_md5 else '视频链接'}")
         print(f'UID为: {uid}')
 
@@ -259,17 +544,17 @@ def main():
     cost_time = get_readable_time(end - start)
     print(cost_time)
 
-    if outfile is not None:
-        if args.aicu:
-            method = 'Query'
+    if outfile is not None or report is not None:
+        if method == 'Query':
             is_standard_md5 = None
             uid_ranges = None
-        else:
-            method = 'Crack'
 
-        save_result(outfile, md5, uid, method, is_standard_md5, uid_ranges)
+        save_result(outfile, md5, uid, method, is_standard_md5, uid_ranges, report, tracer, end - start)
 
-        print('已保存结果至', f'"{outfile}"')
+        if outfile is not None:
+            print('已保存结果至', f'"{outfile}"')
+        if report is not None:
+            print('已保存运行报告至', f'"{report}"')
 
 if __name__ == '__main__':
     try: